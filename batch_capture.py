@@ -0,0 +1,111 @@
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from capture_writer import write_json_atomic
+from file_id_allocator import FileIdAllocator
+from image_store import HASH_KEY, blob_path, pixel_hash, store_file, with_image_hash
+from pptx_shape_extractor import PptxPresentation
+from slide_annotator import annotate_slide
+from slide_rasterizer import DEFAULT_DPI, SlideRasterizer
+
+
+def find_decks(deck_dir):
+    """All .pptx files under deck_dir (skipping Office lock files)"""
+    decks = []
+    for dirpath, _, filenames in os.walk(deck_dir):
+        for filename in filenames:
+            if filename.lower().endswith('.pptx') and not filename.startswith('~$'):
+                decks.append(os.path.join(dirpath, filename))
+    return sorted(decks)
+
+
+def capture_deck(deck_path, name, images=False, dpi=DEFAULT_DPI):
+    """Worker: return [(slide_number, records, shape_count, png_bytes)] for every slide of a deck"""
+    # With images, records already point at the render's pixel hash
+    path = os.path.abspath(deck_path)
+    results = []
+    with PptxPresentation(deck_path) as presentation:
+        rasterizer = None
+        if images:
+            rasterizer = SlideRasterizer(presentation, dpi)
+        for slide_number in range(1, presentation.slide_count + 1):
+            # Every shape (group members included) and table cell/row/column, with on_ok's bbox rules
+            annotation = annotate_slide(presentation.extract_slide(slide_number), name, path)
+            records = annotation.records
+            png_bytes = None
+            if rasterizer is not None:
+                image = rasterizer.render(slide_number)
+                buffer = io.BytesIO()
+                image.save(buffer, "PNG")
+                png_bytes = buffer.getvalue()
+                records = with_image_hash(records, pixel_hash(image))
+            results.append((slide_number, records, annotation.shape_count, png_bytes))
+    return results
+
+
+def run_batch(deck_dir, output_root, name, workers=None, images=False, dpi=DEFAULT_DPI):
+    """Capture every slide of every deck in deck_dir; return throughput statistics"""
+    decks = find_decks(deck_dir)
+    json_dir = os.path.join(output_root, "json")
+    os.makedirs(json_dir, exist_ok=True)
+    allocator = FileIdAllocator(output_root)
+    stats = {"decks": 0, "failed": 0, "slides": 0, "shapes": 0, "records": 0, "captures": 0}
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {deck: pool.submit(capture_deck, deck, name, images, dpi) for deck in decks}
+        for deck, future in futures.items():
+            try:
+                results = future.result()
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"{os.path.basename(deck)}: {str(e)}")
+                continue
+
+            stats["decks"] += 1
+            for slide_number, records, shape_count, png_bytes in results:
+                stats["slides"] += 1
+                stats["shapes"] += shape_count
+                stats["records"] += len(records)
+                if not records:
+                    continue
+                # One capture (JSON file) per slide, same schema as the GUI writes
+                file_id = allocator.allocate()
+                if png_bytes is not None:
+                    # Slides that render identically (e.g. across deck versions) share one stored PNG
+                    digest = records[0][HASH_KEY]
+                    if not os.path.exists(blob_path(output_root, digest)):
+                        tmp_path = os.path.join(json_dir, f"{file_id}.png.tmp")
+                        with open(tmp_path, "wb") as f:
+                            f.write(png_bytes)
+                        store_file(output_root, tmp_path, digest)
+                write_json_atomic(os.path.join(json_dir, f"{file_id}.json"), records)
+                stats["captures"] += 1
+
+    stats["elapsed"] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture every shape of every slide of a folder of decks")
+    parser.add_argument("deck_dir", help="Directory containing .pptx files")
+    parser.add_argument("--output", default=os.path.join("resources", "batch"),
+                        help="Root directory for json/ (and img_store/) output")
+    parser.add_argument("--name", default="batch", help="Value of the name field in every record")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--images", action="store_true", help="Also render each slide into the image store")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI, help="Resolution of rendered slide images")
+    args = parser.parse_args()
+
+    stats = run_batch(args.deck_dir, args.output, args.name, args.workers, args.images, args.dpi)
+    elapsed = max(stats["elapsed"], 1e-9)
+    print(f"{stats['decks']} decks ({stats['failed']} failed), {stats['slides']} slides, "
+          f"{stats['shapes']} shapes -> {stats['records']} records in {stats['captures']} captures")
+    print(f"{elapsed:.2f}s, {stats['shapes'] / elapsed:.0f} shapes/s, {stats['records'] / elapsed:.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from capture_archive import DEFAULT_ARCHIVE_PATH
+from capture_reader import MappedCaptureArchive
+from file_id_allocator import list_capture_ids
+
+
+NODE_SIZE = 16
+HILBERT_BITS = 16
+# Overlap pairs are generated in chunks of at most this many candidates
+PAIR_CHUNK = 4_000_000
+
+
+def hilbert_index(x, y):
+    """Hilbert curve position of 16-bit integer coordinates (vectorized)"""
+    x = x.astype(np.int64)
+    y = y.astype(np.int64)
+    mask = 0xFFFF
+    a = x ^ y
+    b = mask ^ a
+    c = mask ^ (x | y)
+    d = x & (y ^ mask)
+
+    A = a | (b >> 1)
+    B = (a >> 1) ^ a
+    C = ((c >> 1) ^ (b & (d >> 1))) ^ c
+    D = ((a & (c >> 1)) ^ (d >> 1)) ^ d
+    a, b, c, d = A, B, C, D
+
+    A = (a & (a >> 2)) ^ (b & (b >> 2))
+    B = (a & (b >> 2)) ^ (b & ((a ^ b) >> 2))
+    C = c ^ ((a & (c >> 2)) ^ (b & (d >> 2)))
+    D = d ^ ((b & (c >> 2)) ^ ((a ^ b) & (d >> 2)))
+    a, b, c, d = A, B, C, D
+
+    A = (a & (a >> 4)) ^ (b & (b >> 4))
+    B = (a & (b >> 4)) ^ (b & ((a ^ b) >> 4))
+    C = c ^ ((a & (c >> 4)) ^ (b & (d >> 4)))
+    D = d ^ ((b & (c >> 4)) ^ ((a ^ b) & (d >> 4)))
+    a, b, c, d = A, B, C, D
+
+    C = c ^ ((a & (c >> 8)) ^ (b & (d >> 8)))
+    D = d ^ ((b & (c >> 8)) ^ ((a ^ b) & (d >> 8)))
+
+    a = C ^ (C >> 1)
+    b = D ^ (D >> 1)
+    i0 = x ^ y
+    i1 = b | (mask ^ (i0 | a))
+
+    def spread(v):
+        v = (v | (v << 8)) & 0x00FF00FF
+        v = (v | (v << 4)) & 0x0F0F0F0F
+        v = (v | (v << 2)) & 0x33333333
+        return (v | (v << 1)) & 0x55555555
+
+    return (spread(i1) << 1) | spread(i0)
+
+
+class BBoxIndex:
+    """Packed Hilbert R-tree over every captured bbox, plus per-slide ranges"""
+
+    def __init__(self, boxes, capture_ids, item_indices, bbox_indices, slide_ids, slides,
+                 node_size=NODE_SIZE):
+        # boxes are relative [left, top, width, height]; the index works on corners
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.rel_boxes = boxes
+        self.corners = np.column_stack([boxes[:, 0], boxes[:, 1],
+                                        boxes[:, 0] + boxes[:, 2], boxes[:, 1] + boxes[:, 3]])
+        self.capture_ids = np.asarray(capture_ids, dtype=np.int64)
+        self.item_indices = np.asarray(item_indices, dtype=np.int64)
+        self.bbox_indices = np.asarray(bbox_indices, dtype=np.int64)
+        self.slide_ids = np.asarray(slide_ids, dtype=np.int64)
+        self.slides = slides
+        self.slide_lookup = {slide: i for i, slide in enumerate(slides)}
+        self.node_size = node_size
+        self._build_tree()
+        self._build_slide_ranges()
+
+    def __len__(self):
+        return len(self.corners)
+
+    def _build_tree(self):
+        # Leaves are the boxes in Hilbert order of their centres; each level above
+        # holds the bounding box of node_size consecutive nodes of the level below
+        scale = (1 << HILBERT_BITS) - 1
+        centers = (self.corners[:, :2] + self.corners[:, 2:]) / 2
+        cells = np.clip(np.round(centers * scale), 0, scale)
+        self.tree_order = np.argsort(hilbert_index(cells[:, 0], cells[:, 1]), kind='stable')
+
+        level = self.corners[self.tree_order]
+        self.levels = [level]
+        while len(level) > 1:
+            starts = np.arange(0, len(level), self.node_size)
+            level = np.column_stack([np.minimum.reduceat(level[:, 0], starts),
+                                     np.minimum.reduceat(level[:, 1], starts),
+                                     np.maximum.reduceat(level[:, 2], starts),
+                                     np.maximum.reduceat(level[:, 3], starts)])
+            self.levels.append(level)
+
+    def _build_slide_ranges(self):
+        # Boxes of one slide are contiguous in slide_order, sorted by left edge
+        self.slide_order = np.lexsort((self.corners[:, 0], self.slide_ids))
+        counts = np.bincount(self.slide_ids, minlength=len(self.slides))
+        self.slide_start = np.zeros(len(self.slides) + 1, dtype=np.int64)
+        self.slide_start[1:] = np.cumsum(counts)
+
+    @classmethod
+    def from_archive(cls, archive, node_size=NODE_SIZE):
+        """Build from a compiled archive using its columns only (no JSON parsing)"""
+        item_boxes = np.asarray(archive.column("item_boxes"), dtype=np.int64)
+        capture_items = np.asarray(archive.capture_items, dtype=np.int64)
+        boxes_per_item = np.diff(item_boxes)
+        item_capture = np.repeat(np.asarray(archive.capture_ids, dtype=np.int64), np.diff(capture_items))
+        item_index = np.arange(len(boxes_per_item)) - np.repeat(capture_items[:-1], np.diff(capture_items))
+        bbox_index = np.arange(int(item_boxes[-1])) - np.repeat(item_boxes[:-1], boxes_per_item)
+
+        # A slide is (path, slide number); paths are string table indices in the archive
+        item_path = np.asarray(archive.column("item_path"), dtype=np.int64)
+        item_slide = np.asarray(archive.column("item_slide_number"), dtype=np.int64)
+        pairs, item_slide_id = np.unique(np.column_stack([item_path, item_slide]), axis=0, return_inverse=True)
+        paths = archive._strings(pairs[:, 0])
+        slides = [(path, int(number)) for path, number in zip(paths, pairs[:, 1])]
+
+        return cls(np.asarray(archive.column("bbox")),
+                   np.repeat(item_capture, boxes_per_item),
+                   np.repeat(item_index, boxes_per_item),
+                   bbox_index,
+                   np.repeat(item_slide_id.reshape(-1), boxes_per_item),
+                   slides, node_size)
+
+    @classmethod
+    def from_directory(cls, json_dir, node_size=NODE_SIZE):
+        """Build by reading every capture JSON file"""
+        boxes, capture_ids, item_indices, bbox_indices, slide_ids = [], [], [], [], []
+        slides = []
+        slide_lookup = {}
+        for capture_id in list_capture_ids(json_dir):
+            with open(os.path.join(json_dir, f"{capture_id}.json"), 'r', encoding='utf-8') as f:
+                items = json.load(f)
+            for item_index, item in enumerate(items):
+                slide = (item.get("path", ""), item.get("slide_number", 0))
+                if slide not in slide_lookup:
+                    slide_lookup[slide] = len(slides)
+                    slides.append(slide)
+                for bbox_index, bbox in enumerate(item.get("bbox", [])):
+                    if len(bbox) != 4:
+                        continue
+                    boxes.append(bbox)
+                    capture_ids.append(capture_id)
+                    item_indices.append(item_index)
+                    bbox_indices.append(bbox_index)
+                    slide_ids.append(slide_lookup[slide])
+        return cls(boxes, capture_ids, item_indices, bbox_indices, slide_ids, slides, node_size)
+
+    def slide_id(self, path, slide_number):
+        """Index of a slide in this index, or None if no capture was taken on it"""
+        return self.slide_lookup.get((path, slide_number))
+
+    def _search(self, x1, y1, x2, y2, slide=None):
+        """Indices of boxes whose corners intersect a window"""
+        if slide is not None:
+            # Within one slide the boxes are a short contiguous run; test them all
+            members = self.slide_order[self.slide_start[slide]:self.slide_start[slide + 1]]
+            c = self.corners[members]
+            return members[(c[:, 0] <= x2) & (c[:, 2] >= x1) & (c[:, 1] <= y2) & (c[:, 3] >= y1)]
+
+        if not len(self.corners):
+            return np.zeros(0, dtype=np.int64)
+        nodes = np.zeros(1, dtype=np.int64)
+        for depth in range(len(self.levels) - 1, -1, -1):
+            c = self.levels[depth][nodes]
+            nodes = nodes[(c[:, 0] <= x2) & (c[:, 2] >= x1) & (c[:, 1] <= y2) & (c[:, 3] >= y1)]
+            if depth == 0 or not len(nodes):
+                break
+            # Expand surviving nodes into their children on the level below
+            below = len(self.levels[depth - 1])
+            first = nodes * self.node_size
+            counts = np.minimum(first + self.node_size, below) - first
+            nodes = np.repeat(first, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+        if depth != 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.tree_order[nodes]
+
+    def point(self, x, y, slide=None):
+        """Boxes containing a point (relative coordinates), optionally on one slide"""
+        return np.sort(self._search(x, y, x, y, slide))
+
+    def window(self, x1, y1, x2, y2, slide=None, contained=False):
+        """Boxes intersecting (or, with contained, lying inside) a window"""
+        hits = self._search(x1, y1, x2, y2, slide)
+        if contained:
+            c = self.corners[hits]
+            hits = hits[(c[:, 0] >= x1) & (c[:, 2] <= x2) & (c[:, 1] >= y1) & (c[:, 3] <= y2)]
+        return np.sort(hits)
+
+    def overlaps(self, slide=None, min_area=0.0):
+        """Pairs (i, j), i < j, of boxes on the same slide whose intersection exceeds min_area"""
+        if slide is None:
+            order = self.slide_order
+        else:
+            order = self.slide_order[self.slide_start[slide]:self.slide_start[slide + 1]]
+        if len(order) < 2:
+            return np.zeros((0, 2), dtype=np.int64)
+
+        # Sweep along x within each slide: in (slide, left) order, the boxes that can
+        # overlap box k are the ones after it whose left edge is <= its right edge
+        slides = self.slide_ids[order].astype(np.float64)
+        c = self.corners[order].astype(np.float64)
+        span = max(4.0, float(np.abs(c).max()) * 2 + 2)
+        keys = slides * span + c[:, 0]
+        ends = np.searchsorted(keys, slides * span + c[:, 2], side='right')
+        counts = np.maximum(ends - np.arange(len(order)) - 1, 0)
+
+        pairs = []
+        first = 0
+        while first < len(order):
+            # Bound memory: take as many sweep positions as fit in one chunk
+            total = np.cumsum(counts[first:])
+            last = first + max(1, int(np.searchsorted(total, PAIR_CHUNK, side='right')))
+            chunk_counts = counts[first:last]
+            a = np.repeat(np.arange(first, last), chunk_counts)
+            b = a + 1 + (np.arange(chunk_counts.sum()) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts))
+            ix = np.minimum(c[a, 2], c[b, 2]) - np.maximum(c[a, 0], c[b, 0])
+            iy = np.minimum(c[a, 3], c[b, 3]) - np.maximum(c[a, 1], c[b, 1])
+            keep = (ix >= 0) & (iy >= 0) & (np.clip(ix, 0, None) * np.clip(iy, 0, None) > min_area)
+            i, j = order[a[keep]], order[b[keep]]
+            pairs.append(np.column_stack([np.minimum(i, j), np.maximum(i, j)]))
+            first = last
+        return np.concatenate(pairs)
+
+    def describe(self, index):
+        """Where a box came from"""
+        path, slide_number = self.slides[self.slide_ids[index]]
+        return {
+            "capture_id": int(self.capture_ids[index]),
+            "item": int(self.item_indices[index]),
+            "bbox_index": int(self.bbox_indices[index]),
+            "bbox": [round(float(v), 4) for v in self.rel_boxes[index]],
+            "path": path,
+            "slide_number": slide_number,
+        }
+
+
+def load_index(root="resources", node_size=NODE_SIZE):
+    """Index over the compiled archive when present, else over the loose JSON files"""
+    archive_path = os.path.join(root, os.path.basename(DEFAULT_ARCHIVE_PATH))
+    if os.path.exists(archive_path):
+        with MappedCaptureArchive(archive_path) as archive:
+            return BBoxIndex.from_archive(archive, node_size)
+    return BBoxIndex.from_directory(os.path.join(root, "json"), node_size)
+
+
+def scan_window(json_dir, x1, y1, x2, y2):
+    """Linear scan: (capture_id, item, bbox_index) of every box intersecting a window"""
+    hits = []
+    for capture_id in list_capture_ids(json_dir):
+        with open(os.path.join(json_dir, f"{capture_id}.json"), 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        for item_index, item in enumerate(items):
+            for bbox_index, bbox in enumerate(item.get("bbox", [])):
+                if len(bbox) != 4:
+                    continue
+                left, top, width, height = bbox
+                if left <= x2 and left + width >= x1 and top <= y2 and top + height >= y1:
+                    hits.append((capture_id, item_index, bbox_index))
+    return hits
+
+
+def synthetic_index(box_count, slide_count, node_size=NODE_SIZE, seed=0):
+    """Random boxes spread over slides, for benchmarking at scale"""
+    rng = np.random.default_rng(seed)
+    left = rng.random(box_count) * 0.9
+    top = rng.random(box_count) * 0.9
+    width = rng.random(box_count) * (1.0 - left) * 0.3
+    height = rng.random(box_count) * (1.0 - top) * 0.3
+    slide_ids = rng.integers(0, slide_count, box_count)
+    slides = [(f"deck{i // 20}.pptx", i % 20 + 1) for i in range(slide_count)]
+    return BBoxIndex(np.column_stack([left, top, width, height]), slide_ids, np.zeros(box_count),
+                     np.arange(box_count), slide_ids, slides, node_size)
+
+
+def benchmark(args):
+    rng = random.Random(0)
+    windows = []
+    for _ in range(args.queries):
+        x, y = rng.random() * 0.9, rng.random() * 0.9
+        windows.append((x, y, x + rng.random() * 0.1, y + rng.random() * 0.1))
+
+    if args.synthetic:
+        start = time.perf_counter()
+        index = synthetic_index(args.synthetic, max(1, args.synthetic // 20), args.node_size)
+        build = time.perf_counter() - start
+        print(f"Synthetic index: {len(index)} boxes, built in {build * 1000:.1f} ms")
+    else:
+        json_dir = os.path.join(args.root, "json")
+        start = time.perf_counter()
+        for window in windows[:args.scan_queries]:
+            scan_window(json_dir, *window)
+        scan = (time.perf_counter() - start) / min(args.scan_queries, len(windows))
+        start = time.perf_counter()
+        index = load_index(args.root, args.node_size)
+        build = time.perf_counter() - start
+        print(f"Index: {len(index)} boxes, built in {build * 1000:.1f} ms")
+        print(f"JSON linear scan: {scan * 1000:.2f} ms per window query")
+
+        # Same answers as the scan
+        for window in windows[:args.scan_queries]:
+            expected = sorted(scan_window(json_dir, *window))
+            found = sorted((int(index.capture_ids[i]), int(index.item_indices[i]), int(index.bbox_indices[i]))
+                           for i in index.window(*window))
+            if expected != found:
+                print(f"MISMATCH for window {window}: scan {len(expected)}, index {len(found)}")
+
+    # Brute force over the same in-memory arrays, to separate the tree's gain from loading
+    c = index.corners
+    start = time.perf_counter()
+    for x1, y1, x2, y2 in windows:
+        np.nonzero((c[:, 0] <= x2) & (c[:, 2] >= x1) & (c[:, 1] <= y2) & (c[:, 3] >= y1))
+    brute = (time.perf_counter() - start) / len(windows)
+
+    start = time.perf_counter()
+    for window in windows:
+        index.window(*window)
+    tree = (time.perf_counter() - start) / len(windows)
+
+    start = time.perf_counter()
+    for x1, y1, _, _ in windows:
+        index.point(x1, y1)
+    point = (time.perf_counter() - start) / len(windows)
+
+    start = time.perf_counter()
+    pairs = index.overlaps()
+    overlap = time.perf_counter() - start
+
+    print(f"In-memory linear scan: {brute * 1e6:.1f} us per window query")
+    print(f"R-tree: {tree * 1e6:.1f} us per window query, {point * 1e6:.1f} us per point query")
+    print(f"Overlapping pairs on the same slide: {len(pairs)} in {overlap * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spatial queries over every captured bbox")
+    parser.add_argument("--root", default="resources")
+    parser.add_argument("--node-size", type=int, default=NODE_SIZE, help="Children per R-tree node")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    point_parser = subparsers.add_parser("point", help="Boxes containing a point")
+    point_parser.add_argument("x", type=float)
+    point_parser.add_argument("y", type=float)
+
+    window_parser = subparsers.add_parser("window", help="Boxes intersecting a window")
+    window_parser.add_argument("coords", type=float, nargs=4, metavar=("X1", "Y1", "X2", "Y2"))
+    window_parser.add_argument("--contained", action="store_true", help="Only boxes fully inside the window")
+
+    overlap_parser = subparsers.add_parser("overlaps", help="Overlapping boxes on the same slide")
+    overlap_parser.add_argument("--min-area", type=float, default=0.0, help="Minimum relative intersection area")
+
+    for sub in (point_parser, window_parser, overlap_parser):
+        sub.add_argument("--path", help="Restrict to one deck (as stored in the capture's path)")
+        sub.add_argument("--slide", type=int, help="Slide number (with --path)")
+
+    bench_parser = subparsers.add_parser("bench", help="Compare index queries with a linear scan")
+    bench_parser.add_argument("--queries", type=int, default=1000)
+    bench_parser.add_argument("--scan-queries", type=int, default=20, help="Queries run against the JSON files")
+    bench_parser.add_argument("--synthetic", type=int, default=0, help="Benchmark on N random boxes instead")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        benchmark(args)
+        return
+
+    index = load_index(args.root, args.node_size)
+    slide = None
+    if args.path:
+        slide = index.slide_id(args.path, args.slide or 1)
+        if slide is None:
+            print(f"No captures on slide {args.slide or 1} of {args.path}")
+            return
+
+    if args.command == "point":
+        hits = index.point(args.x, args.y, slide)
+    elif args.command == "window":
+        hits = index.window(*args.coords, slide=slide, contained=args.contained)
+    else:
+        pairs = index.overlaps(slide, args.min_area)
+        for i, j in pairs:
+            a, b = index.describe(i), index.describe(j)
+            print(f"{a['path']} slide {a['slide_number']}: capture {a['capture_id']} item {a['item']} {a['bbox']} "
+                  f"overlaps capture {b['capture_id']} item {b['item']} {b['bbox']}")
+        print(f"{len(pairs)} overlapping pairs")
+        return
+
+    for i in hits:
+        print(json.dumps(index.describe(i)))
+    print(f"{len(hits)} boxes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from file_id_allocator import list_capture_ids
+from image_store import HASH_KEY as IMAGE_HASH_KEY, capture_image_path
+
+
+ARCHIVE_MAGIC = b"LSRCAP1\0"
+ARCHIVE_VERSION = 1
+DEFAULT_ARCHIVE_PATH = os.path.join("resources", "captures.archive")
+
+SELECTION_TYPES = ["shape", "table_cells", "table_rows", "table_cols", "rectangle"]
+
+# item_flags bits, so records round-trip with the same keys they were captured with
+FLAG_SCALAR_SHAPE_ID = 1  # table records store shape_ids as a single int
+FLAG_HAS_COLORS = 2
+FLAG_HAS_TEXT = 4
+FLAG_HAS_SLIDE_SIZE = 8
+FLAG_HAS_IMAGE_HASH = 16  # screenshot kept in the content-addressed image store
+
+ALIGNMENT = 8
+
+
+class _StringTable:
+    """Interned UTF-8 strings addressed by index"""
+
+    def __init__(self):
+        self.index = {}
+        self.strings = []
+
+    def add(self, value):
+        value = "" if value is None else str(value)
+        if value not in self.index:
+            self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return self.index[value]
+
+    def columns(self):
+        encoded = [s.encode('utf-8') for s in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+        if encoded:
+            offsets[1:] = np.cumsum([len(e) for e in encoded])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return offsets, data
+
+
+def compile_archive(root="resources", output=DEFAULT_ARCHIVE_PATH):
+    """Pack resources/json/*.json and their screenshots into one columnar archive"""
+    json_dir = os.path.join(root, "json")
+    strings = _StringTable()
+
+    capture_ids = []
+    capture_items = [0]
+    image_paths = []
+
+    item_cols = {name: [] for name in (
+        "item_slide_number", "item_slide_size", "item_selection_type", "item_flags",
+        "item_name", "item_path", "item_table_rows", "item_table_cols", "item_table_cells", "item_image_hash")}
+    item_boxes = [0]
+    item_colors = [0]
+    item_shape_ids = [0]
+    item_texts = [0]
+    boxes = []
+    colors = []
+    shape_ids = []
+    text_refs = []
+
+    for capture_id in list_capture_ids(json_dir):
+        with open(os.path.join(json_dir, f"{capture_id}.json"), 'r', encoding='utf-8') as f:
+            items = json.load(f)
+
+        for item in items:
+            flags = 0
+            if "slide_width" in item:
+                flags |= FLAG_HAS_SLIDE_SIZE
+            ids = item.get("shape_ids", [])
+            if not isinstance(ids, list):
+                flags |= FLAG_SCALAR_SHAPE_ID
+                ids = [ids]
+            if "color_rgb" in item:
+                flags |= FLAG_HAS_COLORS
+            if "text" in item:
+                flags |= FLAG_HAS_TEXT
+            if IMAGE_HASH_KEY in item:
+                flags |= FLAG_HAS_IMAGE_HASH
+
+            selection_type = item.get("selection_type", "shape")
+            if selection_type not in SELECTION_TYPES:
+                raise ValueError(f"Capture {capture_id}: unknown selection type '{selection_type}'")
+
+            item_cols["item_slide_number"].append(item.get("slide_number", 0))
+            item_cols["item_slide_size"].append([item.get("slide_width", 0.0), item.get("slide_height", 0.0)])
+            item_cols["item_selection_type"].append(SELECTION_TYPES.index(selection_type))
+            item_cols["item_flags"].append(flags)
+            item_cols["item_name"].append(strings.add(item.get("name", "")))
+            item_cols["item_path"].append(strings.add(item.get("path", "")))
+            item_cols["item_table_rows"].append(strings.add(item.get("table_rows", "")))
+            item_cols["item_table_cols"].append(strings.add(item.get("table_cols", "")))
+            item_cols["item_table_cells"].append(strings.add(item.get("table_cells", "")))
+            item_cols["item_image_hash"].append(strings.add(item.get(IMAGE_HASH_KEY, "")))
+
+            boxes.extend(item.get("bbox", []))
+            colors.extend(item.get("color_rgb", []))
+            shape_ids.extend(ids)
+            text_refs.extend(strings.add(t) for t in item.get("text", []))
+            item_boxes.append(len(boxes))
+            item_colors.append(len(colors))
+            item_shape_ids.append(len(shape_ids))
+            item_texts.append(len(text_refs))
+
+        capture_ids.append(capture_id)
+        capture_items.append(len(item_cols["item_slide_number"]))
+
+        img_path = capture_image_path(root, capture_id, items)
+        image_paths.append(img_path if os.path.exists(img_path) else None)
+
+    # Captures sharing a stored screenshot share one copy of its bytes in the blob
+    image_ranges = np.zeros((len(image_paths), 2), dtype='<i8')
+    blob_paths = []
+    blob_ranges = {}
+    blob_size = 0
+    for pos, img_path in enumerate(image_paths):
+        if img_path is None:
+            continue
+        if img_path not in blob_ranges:
+            size = os.path.getsize(img_path)
+            blob_ranges[img_path] = (blob_size, blob_size + size)
+            blob_paths.append(img_path)
+            blob_size += size
+        image_ranges[pos] = blob_ranges[img_path]
+    string_offsets, string_data = strings.columns()
+
+    columns = {
+        "capture_id": np.array(capture_ids, dtype='<i4'),
+        "capture_items": np.array(capture_items, dtype='<i4'),
+        "image_ranges": image_ranges,
+        "item_slide_number": np.array(item_cols["item_slide_number"], dtype='<i4'),
+        "item_slide_size": np.array(item_cols["item_slide_size"], dtype='<f4').reshape(-1, 2),
+        "item_selection_type": np.array(item_cols["item_selection_type"], dtype=np.uint8),
+        "item_flags": np.array(item_cols["item_flags"], dtype=np.uint8),
+        "item_name": np.array(item_cols["item_name"], dtype='<i4'),
+        "item_path": np.array(item_cols["item_path"], dtype='<i4'),
+        "item_table_rows": np.array(item_cols["item_table_rows"], dtype='<i4'),
+        "item_table_cols": np.array(item_cols["item_table_cols"], dtype='<i4'),
+        "item_table_cells": np.array(item_cols["item_table_cells"], dtype='<i4'),
+        "item_image_hash": np.array(item_cols["item_image_hash"], dtype='<i4'),
+        "item_boxes": np.array(item_boxes, dtype='<i4'),
+        "item_colors": np.array(item_colors, dtype='<i4'),
+        "item_shape_ids": np.array(item_shape_ids, dtype='<i4'),
+        "item_texts": np.array(item_texts, dtype='<i4'),
+        "bbox": np.array(boxes, dtype='<f4').reshape(-1, 4),
+        "color_rgb": np.array(colors, dtype=np.uint8).reshape(-1, 3),
+        "shape_ids": np.array(shape_ids, dtype='<i4'),
+        "text_refs": np.array(text_refs, dtype='<i4'),
+        "string_offsets": string_offsets,
+        "string_data": string_data,
+    }
+
+    # Lay out the header first so every column (and the image blob) starts 8-byte aligned
+    header = {
+        "version": ARCHIVE_VERSION,
+        "capture_count": len(capture_ids),
+        "selection_types": SELECTION_TYPES,
+        "columns": {},
+        "images": {},
+    }
+    header_size = 4096
+    while True:
+        offset = _align(len(ARCHIVE_MAGIC) + 8 + header_size)
+        for name, array in columns.items():
+            header["columns"][name] = {
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+            }
+            offset = _align(offset + array.nbytes)
+        header["images"] = {"offset": offset, "size": blob_size}
+        encoded_header = json.dumps(header).encode('utf-8')
+        if len(encoded_header) <= header_size:
+            break
+        header_size = _align(len(encoded_header))
+
+    tmp_path = output + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(ARCHIVE_MAGIC)
+        f.write(struct.pack('<Q', header_size))
+        f.write(encoded_header.ljust(header_size, b' '))
+        for name, array in columns.items():
+            f.seek(header["columns"][name]["offset"])
+            f.write(array.tobytes())
+        f.seek(header["images"]["offset"])
+        for img_path in blob_paths:
+            with open(img_path, 'rb') as img:
+                f.write(img.read())
+    os.replace(tmp_path, output)
+
+    return {
+        "captures": len(capture_ids),
+        "items": len(item_cols["item_slide_number"]),
+        "boxes": len(boxes),
+        "strings": len(strings.strings),
+        "bytes": os.path.getsize(output),
+    }
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class CaptureArchive:
+    """Random access to a compiled capture archive; reads only the rows a capture needs"""
+
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH):
+        self.path = path
+        self.file = open(path, 'rb')
+        magic = self.file.read(len(ARCHIVE_MAGIC))
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError(f"{path} is not a capture archive")
+        header_size = struct.unpack('<Q', self.file.read(8))[0]
+        self.header = json.loads(self.file.read(header_size))
+        if self.header["version"] != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported capture archive version {self.header['version']}")
+        self.columns = self.header["columns"]
+        self.selection_types = self.header["selection_types"]
+
+        # Only the per-capture index is loaded up front
+        self.capture_ids = self._read("capture_id")
+        self.capture_items = self._read("capture_items")
+        if "image_ranges" in self.columns:
+            self.image_ranges = self._read("image_ranges")
+        else:
+            # Archives compiled before image deduplication store consecutive offsets
+            offsets = self._read("image_offsets")
+            self.image_ranges = np.column_stack((offsets[:-1], offsets[1:]))
+        self.positions = {int(capture_id): pos for pos, capture_id in enumerate(self.capture_ids)}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, capture_id):
+        return capture_id in self.positions
+
+    def ids(self):
+        """All capture ids in the archive"""
+        return [int(capture_id) for capture_id in self.capture_ids]
+
+    def _read(self, name, start=0, stop=None):
+        """Read rows [start, stop) of a column"""
+        column = self.columns[name]
+        dtype = np.dtype(column["dtype"])
+        shape = column["shape"]
+        row_items = int(np.prod(shape[1:])) if len(shape) > 1 else 1
+        if stop is None:
+            stop = shape[0]
+        count = max(0, stop - start) * row_items
+        self.file.seek(column["offset"] + start * row_items * dtype.itemsize)
+        data = np.frombuffer(self.file.read(count * dtype.itemsize), dtype=dtype)
+        return data.reshape((-1,) + tuple(shape[1:]))
+
+    def _strings(self, indices):
+        """Resolve string table indices"""
+        values = []
+        for index in indices:
+            start, stop = self._read("string_offsets", int(index), int(index) + 2)
+            values.append(self._read("string_data", int(start), int(stop)).tobytes().decode('utf-8'))
+        return values
+
+    def get(self, capture_id):
+        """Return the capture as the list of records stored in its JSON file"""
+        if capture_id not in self.positions:
+            raise KeyError(capture_id)
+        pos = self.positions[capture_id]
+        first, last = int(self.capture_items[pos]), int(self.capture_items[pos + 1])
+
+        slide_numbers = self._read("item_slide_number", first, last)
+        slide_sizes = self._read("item_slide_size", first, last)
+        selection_types = self._read("item_selection_type", first, last)
+        flags = self._read("item_flags", first, last)
+        string_columns = {
+            key: self._strings(self._read(f"item_{key}", first, last))
+            for key in ("name", "path", "table_rows", "table_cols", "table_cells")
+        }
+        # Archives compiled before the image store have no hash column
+        if "item_image_hash" in self.columns:
+            string_columns["image_hash"] = self._strings(self._read("item_image_hash", first, last))
+        box_ranges = self._read("item_boxes", first, last + 1)
+        color_ranges = self._read("item_colors", first, last + 1)
+        shape_ranges = self._read("item_shape_ids", first, last + 1)
+        text_ranges = self._read("item_texts", first, last + 1)
+
+        boxes = self._read("bbox", int(box_ranges[0]), int(box_ranges[-1]))
+        colors = self._read("color_rgb", int(color_ranges[0]), int(color_ranges[-1]))
+        shape_ids = self._read("shape_ids", int(shape_ranges[0]), int(shape_ranges[-1]))
+        texts = self._strings(self._read("text_refs", int(text_ranges[0]), int(text_ranges[-1])))
+
+        records = []
+        for i in range(last - first):
+            records.append(_build_record(
+                i, slide_numbers, slide_sizes, self.selection_types[selection_types[i]], int(flags[i]),
+                string_columns,
+                boxes[box_ranges[i] - box_ranges[0]:box_ranges[i + 1] - box_ranges[0]],
+                colors[color_ranges[i] - color_ranges[0]:color_ranges[i + 1] - color_ranges[0]],
+                shape_ids[shape_ranges[i] - shape_ranges[0]:shape_ranges[i + 1] - shape_ranges[0]],
+                texts[text_ranges[i] - text_ranges[0]:text_ranges[i + 1] - text_ranges[0]],
+            ))
+        return records
+
+    def image_bytes(self, capture_id):
+        """Raw PNG bytes of the capture's slide screenshot (b"" if none was stored)"""
+        pos = self.positions[capture_id]
+        start, stop = (int(v) for v in self.image_ranges[pos])
+        self.file.seek(self.header["images"]["offset"] + start)
+        return self.file.read(stop - start)
+
+
+def _build_record(i, slide_numbers, slide_sizes, selection_type, flags, string_columns,
+                  boxes, colors, shape_ids, texts):
+    """Rebuild one JSON record (same keys as on_ok writes) from column slices"""
+    record = {
+        "name": string_columns["name"][i],
+        "path": string_columns["path"][i],
+        "slide_number": int(slide_numbers[i]),
+    }
+    if flags & FLAG_HAS_SLIDE_SIZE:
+        record["slide_width"] = round(float(slide_sizes[i][0]), 4)
+        record["slide_height"] = round(float(slide_sizes[i][1]), 4)
+    record["selection_type"] = selection_type
+    ids = [int(s) for s in shape_ids]
+    record["shape_ids"] = ids[0] if flags & FLAG_SCALAR_SHAPE_ID and ids else ids
+    record["table_rows"] = string_columns["table_rows"][i]
+    record["table_cols"] = string_columns["table_cols"][i]
+    record["table_cells"] = string_columns["table_cells"][i]
+    # float32 storage: rounding restores the 4-decimal values written by bbox_to_relative
+    record["bbox"] = [[round(float(v), 4) for v in box] for box in boxes]
+    if flags & FLAG_HAS_COLORS:
+        record["color_rgb"] = [[int(c) for c in color] for color in colors]
+    if flags & FLAG_HAS_TEXT:
+        record["text"] = list(texts)
+    if flags & FLAG_HAS_IMAGE_HASH:
+        record[IMAGE_HASH_KEY] = string_columns["image_hash"][i]
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile captures into a single columnar archive")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = subparsers.add_parser("compile", help="Pack resources/json + screenshots")
+    compile_parser.add_argument("--root", default="resources")
+    compile_parser.add_argument("--output", default=DEFAULT_ARCHIVE_PATH)
+
+    show_parser = subparsers.add_parser("show", help="Print one capture from an archive")
+    show_parser.add_argument("capture_id", type=int)
+    show_parser.add_argument("--archive", default=DEFAULT_ARCHIVE_PATH)
+
+    verify_parser = subparsers.add_parser("verify", help="Check an archive against the JSON files")
+    verify_parser.add_argument("--root", default="resources")
+    verify_parser.add_argument("--archive", default=DEFAULT_ARCHIVE_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        start = time.perf_counter()
+        summary = compile_archive(args.root, args.output)
+        elapsed = time.perf_counter() - start
+        print(f"Compiled {summary['captures']} captures ({summary['items']} records, "
+              f"{summary['boxes']} boxes, {summary['strings']} strings) into {args.output} "
+              f"({summary['bytes'] / 1024:.0f} KB) in {elapsed:.2f}s")
+    elif args.command == "show":
+        with CaptureArchive(args.archive) as archive:
+            if args.capture_id not in archive:
+                print(f"capture {args.capture_id} not in archive")
+                sys.exit(1)
+            json.dump(archive.get(args.capture_id), sys.stdout, indent=2, ensure_ascii=False)
+            print()
+    elif args.command == "verify":
+        json_dir = os.path.join(args.root, "json")
+        mismatched = 0
+        with CaptureArchive(args.archive) as archive:
+            for capture_id in list_capture_ids(json_dir):
+                with open(os.path.join(json_dir, f"{capture_id}.json"), 'r', encoding='utf-8') as f:
+                    expected = json.load(f)
+                img_path = capture_image_path(args.root, capture_id, expected)
+                expected_image = open(img_path, 'rb').read() if os.path.exists(img_path) else b""
+                if capture_id not in archive or archive.get(capture_id) != expected \
+                        or archive.image_bytes(capture_id) != expected_image:
+                    mismatched += 1
+                    print(f"Capture {capture_id}: archive differs from JSON/PNG")
+            print(f"{len(archive)} captures in archive, {mismatched} mismatched")
+        sys.exit(1 if mismatched else 0)
+
+
+if __name__ == "__main__":
+    main()
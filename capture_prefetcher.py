@@ -0,0 +1,257 @@
+import argparse
+import threading
+import time
+from collections import OrderedDict
+
+from capture_reader import CaptureStore
+from capture_records import capture_prompt
+from overlay_renderer import capture_pixel_boxes
+from zoom_pyramid import ZoomPyramid
+
+
+DEFAULT_RADIUS = 3
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Tiles pre-rendered for a prefetched capture when the viewport is unknown
+DEFAULT_VIEWPORT = (0, 0, 960, 640)
+
+
+def cache_key(test_id, zoom, thickness):
+    """LRU key of a capture rendered at a zoom level and box thickness"""
+    return str(test_id), round(zoom, 4), int(thickness)
+
+
+class PreparedCapture:
+    """A capture loaded, decoded and laid out for one zoom level and box thickness"""
+
+    def __init__(self, test_id, records, image, pyramid, zoom, thickness):
+        self.test_id = test_id
+        self.key = cache_key(test_id, zoom, thickness)
+        self.records = records
+        self.image = image
+        self.pyramid = pyramid
+        self.zoom = zoom
+        self.thickness = thickness
+        self.prompt = capture_prompt(records)
+        self.tiles = {}
+        self.boxes = None
+        self.scaled_thickness = max(1, int(thickness * zoom))
+        if pyramid is not None:
+            img_width, img_height = pyramid.zoomed_size(zoom)
+            self.boxes = capture_pixel_boxes(records, img_width, img_height)
+
+    def tile(self, col, row):
+        """Tile with the overlay drawn, rendered once"""
+        key = (col, row)
+        if key not in self.tiles:
+            self.tiles[key] = self.pyramid.render_tile(self.zoom, col, row, self.boxes, self.scaled_thickness)
+        return self.tiles[key]
+
+    def render_viewport(self, left, top, right, bottom):
+        """Render every tile intersecting a viewport rectangle"""
+        if self.pyramid is None:
+            return
+        for col, row in self.pyramid.visible_tiles(self.zoom, left, top, right, bottom):
+            self.tile(col, row)
+
+    def tiles_nbytes(self):
+        return sum(tile.width * tile.height * len(tile.getbands()) for tile in self.tiles.values())
+
+
+class CapturePrefetcher:
+    """Memory-bounded LRU of prepared captures, filled ahead of navigation by a background thread"""
+
+    def __init__(self, store, radius=DEFAULT_RADIUS, max_bytes=DEFAULT_MAX_BYTES):
+        self.store = store
+        self.radius = radius
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.queue = []
+        self.in_flight = {}
+        self.stopped = False
+        self.stats = {"hits": 0, "misses": 0, "waits": 0, "prefetched": 0, "evictions": 0}
+        self.thread = threading.Thread(target=self._run, name="capture-prefetcher", daemon=True)
+        self.thread.start()
+
+    def _find_pyramid(self, test_id):
+        # Entries for the same capture at other zooms share one pyramid
+        for entry in self.entries.values():
+            if entry.test_id == test_id and entry.pyramid is not None:
+                return entry.pyramid
+        return None
+
+    def prepare(self, test_id, zoom, thickness, viewport=DEFAULT_VIEWPORT):
+        """Load and pre-render a capture; None if it does not exist"""
+        test_id = str(test_id)
+        capture = self.store.capture(test_id)
+        if capture is None:
+            return None
+        records = capture.records
+
+        image = None
+        pyramid = None
+        if capture.has_image:
+            with self.lock:
+                pyramid = self._find_pyramid(test_id)
+            if pyramid is None:
+                image = capture.image()
+                pyramid = ZoomPyramid(image)
+            else:
+                image = pyramid.levels[0][1]
+
+        entry = PreparedCapture(test_id, records, image, pyramid, zoom, thickness)
+        entry.render_viewport(*viewport)
+        return entry
+
+    def get(self, test_id, zoom, thickness, viewport=DEFAULT_VIEWPORT):
+        """Prepared capture from the cache, waiting for or doing the work if it is not there yet"""
+        key = cache_key(test_id, zoom, thickness)
+        with self.lock:
+            if key in self.entries:
+                self.stats["hits"] += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            pending = self.in_flight.get(key)
+            if pending is not None:
+                self.stats["waits"] += 1
+            else:
+                self.stats["misses"] += 1
+                # Keep the worker from starting the same capture while we load it here
+                done = threading.Event()
+                self.in_flight[key] = done
+
+        if pending is not None:
+            pending.wait()
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    return self.entries[key]
+            return self.prepare(test_id, zoom, thickness, viewport)
+
+        try:
+            entry = self.prepare(test_id, zoom, thickness, viewport)
+            if entry is not None:
+                self._store(key, entry)
+            return entry
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            done.set()
+
+    def prefetch_around(self, test_id, zoom, thickness, viewport=DEFAULT_VIEWPORT):
+        """Queue the neighbouring captures (nearest first), replacing any older requests"""
+        try:
+            center = int(test_id)
+        except (TypeError, ValueError):
+            return
+        jobs = []
+        for offset in range(1, self.radius + 1):
+            for neighbour in (center + offset, center - offset):
+                if neighbour >= 1:
+                    jobs.append((cache_key(neighbour, zoom, thickness), viewport))
+        with self.lock:
+            self.queue = [job for job in jobs if job[0] not in self.entries]
+            self.wakeup.notify()
+
+    def _store(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self._evict()
+
+    def nbytes(self):
+        """Approximate memory held by cached captures (pyramids counted once)"""
+        pyramids = {id(entry.pyramid): entry.pyramid for entry in self.entries.values() if entry.pyramid}
+        return (sum(pyramid.nbytes() for pyramid in pyramids.values()) +
+                sum(entry.tiles_nbytes() for entry in self.entries.values()))
+
+    def _evict(self):
+        # Always keep the most recently used entry, even if it alone exceeds the budget
+        while len(self.entries) > 1 and self.nbytes() > self.max_bytes:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not self.queue and not self.stopped:
+                    self.wakeup.wait()
+                if self.stopped:
+                    return
+                key, viewport = self.queue.pop(0)
+                if key in self.entries or key in self.in_flight:
+                    continue
+                done = threading.Event()
+                self.in_flight[key] = done
+
+            try:
+                test_id, zoom, thickness = key
+                entry = self.prepare(test_id, zoom, thickness, viewport)
+                if entry is not None:
+                    self._store(key, entry)
+                    with self.lock:
+                        self.stats["prefetched"] += 1
+            except Exception as e:
+                print(f"Prefetch of capture {key[0]} failed: {str(e)}")
+            finally:
+                with self.lock:
+                    del self.in_flight[key]
+                done.set()
+
+    def snapshot(self):
+        """Hit/miss counters plus current size"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+            stats["bytes"] = self.nbytes()
+        lookups = stats["hits"] + stats["misses"] + stats["waits"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self.lock:
+            self.stopped = True
+            self.queue = []
+            self.wakeup.notify()
+        self.thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step through captures like the viewer's Next button")
+    parser.add_argument("--root", default="resources")
+    parser.add_argument("--start", type=int, default=1)
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--zoom", type=float, default=0.6)
+    parser.add_argument("--thickness", type=int, default=5)
+    parser.add_argument("--radius", type=int, default=DEFAULT_RADIUS)
+    parser.add_argument("--think-ms", type=float, default=100.0, help="Pause between clicks")
+    args = parser.parse_args()
+
+    store = CaptureStore(args.root)
+    try:
+        for radius in (0, args.radius):
+            prefetcher = CapturePrefetcher(store, radius=radius)
+            latencies = []
+            for test_id in range(args.start, args.start + args.count):
+                start = time.perf_counter()
+                entry = prefetcher.get(test_id, args.zoom, args.thickness)
+                latencies.append(time.perf_counter() - start)
+                if entry is not None:
+                    prefetcher.prefetch_around(test_id, args.zoom, args.thickness)
+                time.sleep(args.think_ms / 1000.0)
+            stats = prefetcher.snapshot()
+            prefetcher.close()
+
+            latencies.sort()
+            median = latencies[len(latencies) // 2] * 1000.0
+            worst = latencies[-1] * 1000.0
+            print(f"radius {radius}: median {median:.1f} ms, max {worst:.1f} ms per step | "
+                  f"{stats['hits']} hits, {stats['waits']} waits, {stats['misses']} misses, "
+                  f"{stats['evictions']} evictions, {stats['bytes'] / 1e6:.0f} MB cached")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
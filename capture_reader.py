@@ -0,0 +1,212 @@
+import argparse
+import io
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+
+from capture_archive import CaptureArchive, DEFAULT_ARCHIVE_PATH
+from image_store import capture_image_path
+
+
+def png_size(data):
+    """Width and height from a PNG's IHDR chunk, without decoding pixels"""
+    if len(data) >= 24 and bytes(data[12:16]) == b'IHDR':
+        return struct.unpack('>II', bytes(data[16:24]))
+    return None
+
+
+class MappedCaptureArchive(CaptureArchive):
+    """Capture archive read through a memory map; columns are zero-copy views"""
+
+    mmap = None
+
+    def _read(self, name, start=0, stop=None):
+        """View rows [start, stop) of a column directly in the mapped file"""
+        if self.mmap is None:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        column = self.columns[name]
+        dtype = np.dtype(column["dtype"])
+        shape = column["shape"]
+        row_items = int(np.prod(shape[1:])) if len(shape) > 1 else 1
+        if stop is None:
+            stop = shape[0]
+        count = max(0, stop - start) * row_items
+        data = np.frombuffer(self.mmap, dtype=dtype, count=count,
+                             offset=column["offset"] + start * row_items * dtype.itemsize)
+        return data.reshape((-1,) + tuple(shape[1:]))
+
+    def close(self):
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                pass  # views are still alive; the map is released with them
+        super().close()
+
+    def column(self, name):
+        """Whole column as a lazy view (pages are read on first touch)"""
+        return self._read(name)
+
+    def bboxes(self, capture_id):
+        """float32 [n, 4] view of all relative bboxes of a capture"""
+        pos = self.positions[capture_id]
+        first, last = int(self.capture_items[pos]), int(self.capture_items[pos + 1])
+        box_ranges = self._read("item_boxes", first, last + 1)
+        return self._read("bbox", int(box_ranges[0]), int(box_ranges[-1]))
+
+    def image_bytes(self, capture_id):
+        """PNG bytes of a capture as a memoryview into the map (no copy)"""
+        pos = self.positions[capture_id]
+        base = self.header["images"]["offset"]
+        start, stop = (int(v) for v in self.image_ranges[pos])
+        return memoryview(self.mmap)[base + start:base + stop]
+
+    def capture(self, capture_id):
+        """Lazy view of one capture"""
+        if capture_id not in self.positions:
+            return None
+        return CaptureView(self, capture_id)
+
+    def iter_captures(self):
+        """Yield a lazy view per capture; memory stays flat however many are scanned"""
+        for capture_id in self.capture_ids:
+            yield CaptureView(self, int(capture_id))
+
+
+class CaptureView:
+    """One capture in a mapped archive; records and pixels are only built on demand"""
+
+    def __init__(self, archive, capture_id):
+        self.archive = archive
+        self.capture_id = capture_id
+        self._records = None
+
+    @property
+    def records(self):
+        if self._records is None:
+            self._records = self.archive.get(self.capture_id)
+        return self._records
+
+    @property
+    def bboxes(self):
+        return self.archive.bboxes(self.capture_id)
+
+    @property
+    def has_image(self):
+        return len(self.archive.image_bytes(self.capture_id)) > 0
+
+    @property
+    def image_size(self):
+        return png_size(self.archive.image_bytes(self.capture_id))
+
+    def image(self):
+        """Decode the slide screenshot (Pillow decodes pixels on first access)"""
+        from PIL import Image
+        return Image.open(io.BytesIO(self.archive.image_bytes(self.capture_id)))
+
+
+class DirectoryCaptureView:
+    """One capture stored as resources/json/{id}.json + its screenshot (image store or img/{id}.png)"""
+
+    def __init__(self, root, capture_id):
+        self.root = root
+        self.capture_id = capture_id
+        self.json_path = os.path.join(root, "json", f"{capture_id}.json")
+        self._records = None
+
+    @property
+    def img_path(self):
+        # Known only once the records say which stored screenshot they use
+        return capture_image_path(self.root, self.capture_id, self.records)
+
+    @property
+    def records(self):
+        if self._records is None:
+            with open(self.json_path, 'r', encoding='utf-8') as f:
+                self._records = json.load(f)
+        return self._records
+
+    @property
+    def bboxes(self):
+        boxes = [box for item in self.records for box in item.get("bbox", [])]
+        return np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+    @property
+    def has_image(self):
+        return os.path.exists(self.img_path)
+
+    @property
+    def image_size(self):
+        with open(self.img_path, 'rb') as f:
+            return png_size(f.read(24))
+
+    def image(self):
+        from PIL import Image
+        return Image.open(self.img_path)
+
+
+class CaptureStore:
+    """Captures from the compiled archive when present, else from the loose files"""
+
+    def __init__(self, root="resources", archive_path=None):
+        self.root = root
+        self.archive_path = archive_path or os.path.join(root, os.path.basename(DEFAULT_ARCHIVE_PATH))
+        self.archive = None
+        if os.path.exists(self.archive_path):
+            try:
+                self.archive = MappedCaptureArchive(self.archive_path)
+            except Exception as e:
+                print(f"Ignoring capture archive: {str(e)}")
+
+    def capture(self, capture_id):
+        """Lazy view of a capture, or None if it does not exist"""
+        try:
+            numeric_id = int(capture_id)
+        except (TypeError, ValueError):
+            numeric_id = None
+        if self.archive is not None and numeric_id in self.archive:
+            return self.archive.capture(numeric_id)
+
+        view = DirectoryCaptureView(self.root, capture_id)
+        if not os.path.exists(view.json_path):
+            return None
+        return view
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a capture archive through a memory map")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_PATH)
+    parser.add_argument("--decode-images", action="store_true",
+                        help="Also decode every screenshot (otherwise only PNG headers are read)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    captures = 0
+    boxes = 0
+    pixels = 0
+    with MappedCaptureArchive(args.archive) as archive:
+        for capture in archive.iter_captures():
+            captures += 1
+            boxes += len(capture.bboxes)
+            if args.decode_images:
+                with capture.image() as img:
+                    img.load()
+                    pixels += img.width * img.height
+            elif capture.has_image:
+                width, height = capture.image_size
+                pixels += width * height
+    elapsed = time.perf_counter() - start
+    print(f"Scanned {captures} captures ({boxes} boxes, {pixels / 1e6:.1f} Mpx) "
+          f"in {elapsed:.3f}s ({captures / max(elapsed, 1e-9):.0f} captures/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+def bbox_to_relative(bbox, slide_width, slide_height):
+    """Convert absolute bbox to relative coordinates (4 decimal points)"""
+    left, top, width, height = bbox
+    rel_left = round(left / slide_width, 4)
+    rel_top = round(top / slide_height, 4)
+    rel_width = round(width / slide_width, 4)
+    rel_height = round(height / slide_height, 4)
+    return [rel_left, rel_top, rel_width, rel_height]
+
+
+def shape_record(name, path, slide_number, slide_width, slide_height, shape_ids, bboxes, colors, texts):
+    """Record for a shape selection, as on_ok writes it"""
+    return {
+        "name": name,
+        "path": path,
+        "slide_number": slide_number,
+        "slide_width": slide_width,
+        "slide_height": slide_height,
+        "selection_type": "shape",
+        "shape_ids": shape_ids,
+        "table_rows": "",
+        "table_cols": "",
+        "table_cells": "",
+        "bbox": bboxes,
+        "color_rgb": colors,
+        "text": texts
+    }
+
+
+def table_record(name, path, slide_number, slide_width, slide_height, section_type, table_id, values, bboxes):
+    """Record for a table cells/rows/cols section, as on_ok writes it"""
+    joined = ",".join(map(str, values))
+    return {
+        "name": name,
+        "path": path,
+        "slide_number": slide_number,
+        "slide_width": slide_width,
+        "slide_height": slide_height,
+        "selection_type": f"table_{section_type}",
+        "shape_ids": table_id,
+        "table_rows": joined if section_type == "rows" else "",
+        "table_cols": joined if section_type == "cols" else "",
+        "table_cells": joined if section_type == "cells" else "",
+        "bbox": bboxes,
+        "color_rgb": [],
+        "text": []
+    }
+
+
+def table_section_records(name, path, slide_number, slide_width, slide_height, table):
+    """One record per cell, row and column of a TableSnapshot"""
+    records = []
+    for row_idx in range(1, table.rows + 1):
+        for col_idx in range(1, table.cols + 1):
+            rel_bbox = bbox_to_relative(table.cell_bbox(row_idx, col_idx), slide_width, slide_height)
+            records.append(table_record(name, path, slide_number, slide_width, slide_height,
+                                        "cells", table.table_id, [f"{row_idx}.{col_idx}"], [rel_bbox]))
+    for row_idx in range(1, table.rows + 1):
+        rel_bbox = bbox_to_relative(table.row_bbox(row_idx), slide_width, slide_height)
+        records.append(table_record(name, path, slide_number, slide_width, slide_height,
+                                    "rows", table.table_id, [row_idx], [rel_bbox]))
+    for col_idx in range(1, table.cols + 1):
+        rel_bbox = bbox_to_relative(table.col_bbox(col_idx), slide_width, slide_height)
+        records.append(table_record(name, path, slide_number, slide_width, slide_height,
+                                    "cols", table.table_id, [col_idx], [rel_bbox]))
+    return records
+
+
+def capture_prompt(records):
+    """Human-readable summary of a capture's records, as shown by the test viewer"""
+    prompt_lines = []
+    for idx, item in enumerate(records):
+        name = item.get('name', 'N/A')
+        selection_type = item.get('selection_type', 'N/A')
+        slide_num = item.get('slide_number', 'N/A')
+
+        prompt_lines.append(f"[{idx+1}] Name: {name} | Type: {selection_type} | Slide: {slide_num}")
+
+        if selection_type == "shape":
+            shape_ids = item.get('shape_ids', [])
+            texts = item.get('text', [])
+            prompt_lines.append(f"    Shape IDs: {shape_ids}")
+            if texts and any(texts):
+                prompt_lines.append(f"    Texts: {texts}")
+        elif selection_type == "table_cells":
+            cells = item.get('table_cells', '')
+            prompt_lines.append(f"    Table ID: {item.get('shape_ids', 'N/A')} | Cells: {cells}")
+        elif selection_type == "table_rows":
+            rows = item.get('table_rows', '')
+            prompt_lines.append(f"    Table ID: {item.get('shape_ids', 'N/A')} | Rows: {rows}")
+        elif selection_type == "table_cols":
+            cols = item.get('table_cols', '')
+            prompt_lines.append(f"    Table ID: {item.get('shape_ids', 'N/A')} | Cols: {cols}")
+
+        prompt_lines.append("")  # Empty line between items
+    return "\n".join(prompt_lines)
@@ -0,0 +1,116 @@
+import json
+import os
+import queue
+import threading
+
+from image_store import store_file, with_image_hash
+
+try:
+    import pythoncom
+except ImportError:  # headless use on Linux
+    pythoncom = None
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file next to path, then rename it into place"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CaptureWriter:
+    """Background stage that writes capture screenshots and JSON off the Tk thread"""
+
+    _STOP = object()
+
+    def __init__(self, max_pending=8, image_root=None):
+        # With image_root, screenshots go to its content-addressed store instead of img_path
+        self.image_root = image_root
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.written = 0
+        self.errors = []
+        self.thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, img_path, json_path, records, write_image, on_written=None):
+        """Queue a capture; blocks while max_pending captures are already waiting"""
+        # write_image(path) runs on the writer thread and must produce a PNG at path;
+        # on_written() runs there too, only once the JSON is in place
+        with self.lock:
+            self.pending += 1
+        self.queue.put((img_path, json_path, records, write_image, on_written))
+
+    def pending_count(self):
+        """Captures queued or being written"""
+        with self.lock:
+            return self.pending
+
+    def pop_errors(self):
+        """Return and clear the errors collected since the last call"""
+        with self.lock:
+            errors, self.errors = self.errors, []
+            return errors
+
+    def flush(self):
+        """Block until every queued capture has been written"""
+        self.queue.join()
+
+    def close(self):
+        """Flush and stop the writer thread"""
+        self.flush()
+        self.queue.put(self._STOP)
+        self.thread.join()
+
+    def _run(self):
+        if pythoncom is not None:
+            # The writer thread talks to PowerPoint through its own apartment
+            pythoncom.CoInitialize()
+        try:
+            while True:
+                job = self.queue.get()
+                try:
+                    if job is self._STOP:
+                        return
+                    self._write(*job)
+                finally:
+                    self.queue.task_done()
+        finally:
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+
+    def _write(self, img_path, json_path, records, write_image, on_written):
+        root, extension = os.path.splitext(img_path)
+        tmp_img_path = f"{root}.tmp{extension}"
+        try:
+            # Image first, so a JSON file never points at a missing screenshot
+            if write_image is not None:
+                write_image(tmp_img_path)
+                if self.image_root is not None:
+                    # Identical renders of a slide are stored once; the JSON refers to the pixel hash
+                    records = with_image_hash(records, store_file(self.image_root, tmp_img_path))
+                else:
+                    os.replace(tmp_img_path, img_path)
+            write_json_atomic(json_path, records)
+            with self.lock:
+                self.written += 1
+        except Exception as e:
+            print(f"Save error ({os.path.basename(json_path)}): {str(e)}")
+            with self.lock:
+                self.errors.append(f"{os.path.basename(json_path)}: {str(e)}")
+            if os.path.exists(tmp_img_path):
+                os.remove(tmp_img_path)
+            return
+        finally:
+            with self.lock:
+                self.pending -= 1
+        if on_written is not None:
+            try:
+                on_written()
+            except Exception as e:
+                # The capture is saved; a failing follow-up must not stop the writer thread
+                print(f"After-save error ({os.path.basename(json_path)}): {str(e)}")
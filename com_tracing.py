@@ -0,0 +1,326 @@
+import argparse
+import glob
+import inspect
+import itertools
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+DEFAULT_TRACE_DIR = os.path.join("resources", "com_trace")
+FOLDED_SUFFIX = ".folded"
+SUMMARY_SUFFIX = ".txt"
+TOP_MEMBERS = 15
+
+# Values PowerPoint hands back by value; anything else is an object worth following
+_PLAIN_TYPES = (int, float, str, bytes, bool, tuple, type(None))
+
+
+def unwrap(obj):
+    """The real COM object behind a traced one (for WithEvents, marshalling and the like)"""
+    while isinstance(obj, TracedObject):
+        obj = object.__getattribute__(obj, "_target")
+    return obj
+
+
+class TracedObject:
+    """Proxy that times every property get, put and method call on a COM object and its descendants"""
+
+    def __init__(self, target, tracer, label):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_tracer", tracer)
+        object.__setattr__(self, "_label", label)
+
+    def _wrap(self, value, label):
+        if isinstance(value, _PLAIN_TYPES):
+            return value
+        return TracedObject(value, object.__getattribute__(self, "_tracer"), label)
+
+    def __getattr__(self, name):
+        target = object.__getattribute__(self, "_target")
+        if name.startswith("_"):
+            # _oleobj_ and other Python-side attributes are not COM round trips
+            return getattr(target, name)
+        tracer = object.__getattribute__(self, "_tracer")
+        label = f"{object.__getattribute__(self, '_label')}.{name}"
+        start = time.perf_counter()
+        value = getattr(target, name)
+        if inspect.ismethod(value):
+            # Looking a method up is local; the round trip happens when it is called
+            return _TracedMethod(value, tracer, f"{label}()")
+        tracer.record(label, time.perf_counter() - start)
+        return self._wrap(value, label)
+
+    def __setattr__(self, name, value):
+        target = object.__getattribute__(self, "_target")
+        label = f"{object.__getattribute__(self, '_label')}.{name}="
+        start = time.perf_counter()
+        setattr(target, name, unwrap(value))
+        object.__getattribute__(self, "_tracer").record(label, time.perf_counter() - start)
+
+    def __call__(self, *args, **kwargs):
+        # Collections called like Windows(1) are an Item() round trip
+        label = f"{object.__getattribute__(self, '_label')}()"
+        start = time.perf_counter()
+        value = object.__getattribute__(self, "_target")(*args, **kwargs)
+        object.__getattribute__(self, "_tracer").record(label, time.perf_counter() - start)
+        return self._wrap(value, label)
+
+    def __iter__(self):
+        label = f"{object.__getattribute__(self, '_label')}[]"
+        tracer = object.__getattribute__(self, "_tracer")
+        iterator = iter(object.__getattribute__(self, "_target"))
+        while True:
+            start = time.perf_counter()
+            try:
+                value = next(iterator)
+            except StopIteration:
+                return
+            tracer.record(label, time.perf_counter() - start)
+            yield self._wrap(value, label)
+
+    def __len__(self):
+        return len(object.__getattribute__(self, "_target"))
+
+    def __bool__(self):
+        return bool(object.__getattribute__(self, "_target"))
+
+    def __eq__(self, other):
+        return unwrap(self) == unwrap(other)
+
+    def __hash__(self):
+        return hash(unwrap(self))
+
+    def __repr__(self):
+        return f"<traced {object.__getattribute__(self, '_label')}>"
+
+
+class _TracedMethod:
+
+    def __init__(self, method, tracer, label):
+        self.method = method
+        self.tracer = tracer
+        self.label = label
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        value = self.method(*[unwrap(a) for a in args], **{k: unwrap(v) for k, v in kwargs.items()})
+        self.tracer.record(self.label, time.perf_counter() - start)
+        if isinstance(value, _PLAIN_TYPES):
+            return value
+        return TracedObject(value, self.tracer, self.label)
+
+
+class ComTracer:
+    """Collects the COM calls of each capture by phase and writes them as collapsed stacks and a summary"""
+
+    def __init__(self, output_dir=DEFAULT_TRACE_DIR):
+        self.output_dir = output_dir
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.captures = {}
+        self.tokens = itertools.count(1)
+
+    def wrap(self, obj, label="Application"):
+        """Traced proxy for a COM object; calls are recorded only while a capture is active on the thread"""
+        return TracedObject(unwrap(obj), self, label)
+
+    def begin(self):
+        """Start recording a capture on this thread; returns its token"""
+        token = next(self.tokens)
+        with self.lock:
+            self.captures[token] = defaultdict(lambda: [0, 0.0])
+        self.local.token = token
+        self.local.phases = ()
+        return token
+
+    @contextmanager
+    def resume(self, token):
+        """Record calls on this thread (e.g. the writer's export) into an earlier capture"""
+        previous = getattr(self.local, "token", None), getattr(self.local, "phases", ())
+        self.local.token = token
+        self.local.phases = ()
+        try:
+            yield
+        finally:
+            self.local.token, self.local.phases = previous
+
+    def detach(self):
+        """Stop recording on this thread; the capture stays open for resume/finish"""
+        self.local.token = None
+        self.local.phases = ()
+
+    @contextmanager
+    def phase(self, name):
+        """Attribute the calls made inside the block to a (nested) phase"""
+        phases = getattr(self.local, "phases", ())
+        self.local.phases = phases + (name,)
+        try:
+            yield
+        finally:
+            self.local.phases = phases
+
+    def record(self, label, seconds):
+        token = getattr(self.local, "token", None)
+        if token is None:
+            return
+        key = (self.local.phases, label)
+        with self.lock:
+            calls = self.captures.get(token)
+            if calls is None:
+                return
+            entry = calls[key]
+            entry[0] += 1
+            entry[1] += seconds
+
+    def discard(self, token):
+        with self.lock:
+            self.captures.pop(token, None)
+
+    def finish(self, token, name):
+        """Write {name}.folded and {name}.txt for a capture and forget it; returns the summary text"""
+        with self.lock:
+            calls = self.captures.pop(token, None)
+        if calls is None:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, name)
+        write_collapsed(f"{base}{FOLDED_SUFFIX}", collapsed_lines(calls, name))
+        summary = format_summary(calls, name)
+        with open(f"{base}{SUMMARY_SUFFIX}", 'w', encoding='utf-8') as f:
+            f.write(summary)
+        return summary
+
+
+class NullTracer:
+    """Stand-in when tracing is off: no proxies, no bookkeeping"""
+
+    def wrap(self, obj, label="Application"):
+        return obj
+
+    def begin(self):
+        return None
+
+    def resume(self, token):
+        return nullcontext()
+
+    def detach(self):
+        pass
+
+    def phase(self, name):
+        return nullcontext()
+
+    def discard(self, token):
+        pass
+
+    def finish(self, token, name):
+        return None
+
+
+def collapsed_lines(calls, root):
+    """Flame-graph lines: root;phase...;member path frames, weighted by microseconds"""
+    lines = []
+    for (phases, label), (_, seconds) in sorted(calls.items()):
+        frames = [root] + list(phases) + label.split(".")
+        lines.append(f"{';'.join(frames)} {max(1, int(round(seconds * 1e6)))}")
+    return lines
+
+
+def write_collapsed(path, lines):
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(path + ".tmp", path)
+
+
+def format_summary(calls, title):
+    """Per-phase and per-member table of calls and time"""
+    by_phase = defaultdict(lambda: [0, 0.0])
+    by_member = defaultdict(lambda: [0, 0.0])
+    for (phases, label), (count, seconds) in calls.items():
+        phase = "/".join(phases) or "(no phase)"
+        by_phase[phase][0] += count
+        by_phase[phase][1] += seconds
+        # Members are grouped by their last two path segments, e.g. ForeColor.RGB
+        member = ".".join(label.split(".")[-2:])
+        by_member[member][0] += count
+        by_member[member][1] += seconds
+    total_calls = sum(count for count, _ in by_phase.values())
+    total_ms = sum(seconds for _, seconds in by_phase.values()) * 1000.0
+
+    lines = [f"{title}: {total_calls} COM calls, {total_ms:.1f} ms", "",
+             f"{'phase':<32} {'calls':>7} {'ms':>10} {'share':>6}"]
+    for phase, (count, seconds) in sorted(by_phase.items(), key=lambda item: -item[1][1]):
+        share = seconds * 1000.0 / total_ms if total_ms else 0.0
+        lines.append(f"{phase:<32} {count:>7} {seconds * 1000.0:>10.2f} {share:>6.0%}")
+    lines += ["", f"{'member':<32} {'calls':>7} {'ms':>10} {'ms/call':>8}"]
+    for member, (count, seconds) in sorted(by_member.items(), key=lambda item: -item[1][1])[:TOP_MEMBERS]:
+        lines.append(f"{member:<32} {count:>7} {seconds * 1000.0:>10.2f} {seconds * 1000.0 / count:>8.3f}")
+    return "\n".join(lines) + "\n"
+
+
+def merge_traces(trace_dir, output_path=None):
+    """Sum the per-capture profiles of a trace directory into one (optionally written) collapsed profile"""
+    merged = defaultdict(int)
+    paths = sorted(glob.glob(os.path.join(trace_dir, f"*{FOLDED_SUFFIX}")))
+    for path in paths:
+        if output_path and os.path.abspath(path) == os.path.abspath(output_path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                stack, _, weight = line.rstrip("\n").rpartition(" ")
+                if stack:
+                    # Drop the capture name, so the same phase of every capture stacks up
+                    merged["all;" + stack.split(";", 1)[-1]] += int(weight)
+    lines = [f"{stack} {weight}" for stack, weight in sorted(merged.items())]
+    if output_path:
+        write_collapsed(output_path, lines)
+    return len(paths), lines
+
+
+def _demo(output_dir, latency_ms, shapes):
+    """Trace the selection poll and slide snapshot against the fake PowerPoint"""
+    from fake_powerpoint import FakeApplication, synthetic_deck
+    from selection_tracker import ComSelectionSource
+    from slide_snapshot_cache import SlideSnapshot
+
+    app = FakeApplication(latency_ms / 1000.0)
+    app.add(synthetic_deck(1, shapes))
+    app.active_window.select(list(range(2, shapes + 3)))
+    tracer = ComTracer(output_dir)
+    ppt = tracer.wrap(app)
+    token = tracer.begin()
+    with tracer.phase("selection"):
+        ComSelectionSource(ppt).read_state()
+    with tracer.phase("tables"):
+        snapshot = SlideSnapshot(ppt.ActiveWindow.View.Slide)
+        for table_id in snapshot.table_shapes:
+            snapshot.get_table(table_id)
+    tracer.detach()
+    return tracer.finish(token, "demo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge COM call traces written by the capture tool, or trace a demo run")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    merge_parser = subparsers.add_parser("merge", help="Sum every capture of a trace directory into one profile")
+    merge_parser.add_argument("trace_dir", nargs="?", default=DEFAULT_TRACE_DIR)
+    merge_parser.add_argument("--output", help="Collapsed profile to write (default: {trace_dir}/all.folded)")
+    demo_parser = subparsers.add_parser("demo", help="Trace reads against the fake PowerPoint")
+    demo_parser.add_argument("--output-dir", default=DEFAULT_TRACE_DIR)
+    demo_parser.add_argument("--latency-ms", type=float, default=0.2)
+    demo_parser.add_argument("--shapes", type=int, default=40)
+    args = parser.parse_args()
+
+    if args.command == "merge":
+        output = args.output or os.path.join(args.trace_dir, f"all{FOLDED_SUFFIX}")
+        count, lines = merge_traces(args.trace_dir, output)
+        print(f"Merged {count} capture profiles into {len(lines)} stacks -> {output}")
+    else:
+        print(_demo(args.output_dir, args.latency_ms, args.shapes), end="")
+
+
+if __name__ == "__main__":
+    main()
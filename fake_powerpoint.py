@@ -0,0 +1,877 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+
+from PIL import Image
+
+from pptx_shape_extractor import (PptxPresentation, DEFAULT_FONT_SIZE, DEFAULT_INSETS, LINE_BREAK,
+                                  MSO_AUTO_SHAPE, MSO_CHART, MSO_GROUP, MSO_PICTURE, MSO_SMART_ART, MSO_TABLE,
+                                  MSO_TEXT_BOX, NO_FILL_FORE_COLOR, PARAGRAPH_SEPARATOR, iter_shapes)
+from selection_tracker import ComSelectionSource, PP_SELECTION_SHAPES
+from slide_rasterizer import DEFAULT_DPI, SlideRasterizer, _rgba
+from slide_snapshot_cache import SlideSnapshot
+from text_bounds import full_text, layout_bounds, lines_bounds, text_body_prefix, utf16_length
+from text_layout import layout_text
+
+
+MSO_TRUE = -1
+MSO_FALSE = 0
+MSO_COLOR_TYPE_RGB = 1
+MSO_COLOR_TYPE_SCHEME = 2
+PP_SELECTION_NONE = 0
+
+# COM reports these shape types' fill colour as something other than RGB (on_ok records black)
+NON_RGB_FILL_TYPES = (MSO_TABLE, MSO_GROUP, MSO_CHART, MSO_SMART_ART)
+
+DEFAULT_TEXT_STYLE = {"size": DEFAULT_FONT_SIZE, "rgb": [0, 0, 0], "bold": False, "italic": False}
+NO_FILL = {"visible": False, "rgb": None, "is_rgb": False, "transparency": 1.0}
+
+
+class FakeComError(Exception):
+    """Raised where PowerPoint would raise a com_error"""
+
+
+def _to_bgr(rgb):
+    # COM colours are 0x00BBGGRR
+    return int(rgb[0]) | (int(rgb[1]) << 8) | (int(rgb[2]) << 16)
+
+
+class CallStats:
+    """Counts every property get, put and method call on the fake, sleeping the configured latency for each"""
+
+    def __init__(self, latency=0.0, member_latency=None):
+        # latency is seconds per call; member_latency overrides it per member name (e.g. {"Export": 0.2})
+        self.latency = latency
+        self.member_latency = dict(member_latency or {})
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.mutations = 0
+        self.by_member = Counter()
+
+    def record(self, owner, member):
+        self.calls += 1
+        self.by_member[f"{owner}.{member}"] += 1
+        delay = self.member_latency.get(member, self.latency)
+        if delay <= 0:
+            return
+        if delay >= 0.002:
+            time.sleep(delay)
+            return
+        # Sub-millisecond sleeps overshoot; spin so short round trips stay accurate
+        end = time.perf_counter() + delay
+        while time.perf_counter() < end:
+            pass
+
+    def snapshot(self):
+        return {"calls": self.calls, "mutations": self.mutations, "by_member": dict(self.by_member)}
+
+
+class FakeComObject:
+    """Base of the fake object model: capitalised members are COM members and every access is counted"""
+
+    def __init__(self, app):
+        object.__setattr__(self, "_app", app)
+
+    def __getattribute__(self, name):
+        if name[:1].isupper():
+            object.__getattribute__(self, "_app").calls.record(type(self).__name__[4:], name)
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        if name[:1].isupper():
+            self._app.calls.record(type(self).__name__[4:], f"{name}=")
+        object.__setattr__(self, name, value)
+
+    @property
+    def _oleobj_(self):
+        # Stands in for the IDispatch pointer the capture tool marshals to its writer thread
+        return self
+
+
+class FakeCollection(FakeComObject):
+    """Shapes, ShapeRange, Slides, Presentations, Rows, Columns: Count, Item(i) and iteration"""
+
+    def __init__(self, app, items):
+        super().__init__(app)
+        self._items = list(items)
+
+    @property
+    def Count(self):
+        return len(self._items)
+
+    def Item(self, index):
+        if not 1 <= index <= len(self._items):
+            raise FakeComError(f"Index {index} out of range (1..{len(self._items)})")
+        return self._items[index - 1]
+
+    def __call__(self, index):
+        return self.Item(index)
+
+    def __iter__(self):
+        # Enumerating a COM collection fetches one item per round trip
+        for item in self._items:
+            self._app.calls.record(type(self).__name__[4:], "Next")
+            yield item
+
+    def __len__(self):
+        return len(self._items)
+
+
+class FakePresentations(FakeCollection):
+
+    def Open(self, FileName, ReadOnly=False, Untitled=False, WithWindow=True):
+        return self._app.open(FileName)
+
+
+class FakeColorFormat(FakeComObject):
+
+    def __init__(self, app, rgb, color_type):
+        super().__init__(app)
+        self._rgb = rgb
+        self._type = color_type
+
+    @property
+    def RGB(self):
+        return _to_bgr(self._rgb)
+
+    @property
+    def Type(self):
+        return self._type
+
+
+class FakeFillFormat(FakeComObject):
+    """Fill or LineFormat: Visible, Transparency, ForeColor (and Weight for lines)"""
+
+    def __init__(self, app, fill, rgb_type=True):
+        super().__init__(app)
+        self._fill = fill
+        self._rgb_type = rgb_type
+
+    @property
+    def Visible(self):
+        return MSO_TRUE if self._fill["visible"] else MSO_FALSE
+
+    @property
+    def Transparency(self):
+        return float(self._fill.get("transparency", 0.0))
+
+    @property
+    def ForeColor(self):
+        fill = self._fill
+        # A shape without a fill reports white RGB, like NO_FILL_FORE_COLOR in the extractor
+        is_rgb = fill["is_rgb"] or (not fill["visible"] and fill["rgb"] is None)
+        color_type = MSO_COLOR_TYPE_RGB if is_rgb and self._rgb_type else MSO_COLOR_TYPE_SCHEME
+        return FakeColorFormat(self._app, fill["rgb"] or NO_FILL_FORE_COLOR, color_type)
+
+    @property
+    def Weight(self):
+        return float(self._fill.get("width", 0.0))
+
+
+class FakeLineFormat(FakeFillFormat):
+    pass
+
+
+class FakeFont(FakeComObject):
+
+    def __init__(self, app, style):
+        super().__init__(app)
+        self._style = style
+
+    @property
+    def Color(self):
+        return FakeColorFormat(self._app, self._style["rgb"], MSO_COLOR_TYPE_RGB)
+
+    @property
+    def Size(self):
+        return float(self._style["size"])
+
+    @property
+    def Bold(self):
+        return MSO_TRUE if self._style["bold"] else MSO_FALSE
+
+
+def text_body_with_text(text_body, text):
+    """A text body holding new text, styled like the paragraphs and first runs it replaces"""
+    old = text_body["paragraphs"]
+    paragraphs = []
+    for idx, paragraph_text in enumerate(text.replace("\r\n", "\r").replace("\n", "\r").split(PARAGRAPH_SEPARATOR)):
+        template = old[min(idx, len(old) - 1)] if old else {"align": "l", "level": 0, "runs": [],
+                                                              "end_size": DEFAULT_FONT_SIZE}
+        style = template["runs"][0] if template["runs"] else dict(DEFAULT_TEXT_STYLE, size=template["end_size"])
+        runs = [dict(style, text=paragraph_text)] if paragraph_text else []
+        paragraphs.append(dict(template, runs=runs))
+    updated = dict(text_body, paragraphs=paragraphs)
+    updated["text"] = full_text(updated)
+    return updated
+
+
+class FakeTextFrame(FakeComObject):
+    """Text frame of a shape or table cell; holds the (editable) text body"""
+
+    def __init__(self, app, body, box):
+        super().__init__(app)
+        self._body = body if body is not None else make_text_body("")
+        self._box = box
+
+    @property
+    def HasText(self):
+        return MSO_TRUE if full_text(self._body) else MSO_FALSE
+
+    @property
+    def TextRange(self):
+        return FakeTextRange(self._app, self, 0, None)
+
+    @property
+    def MarginLeft(self):
+        return self._body["insets"][0]
+
+    @property
+    def MarginTop(self):
+        return self._body["insets"][1]
+
+    @property
+    def MarginRight(self):
+        return self._body["insets"][2]
+
+    @property
+    def MarginBottom(self):
+        return self._body["insets"][3]
+
+
+def _advance_utf16(text, index, units):
+    """Index in text reached by moving units UTF-16 code units forward from index"""
+    while units > 0 and index < len(text):
+        units -= 2 if ord(text[index]) > 0xFFFF else 1
+        index += 1
+    return index
+
+
+class FakeTextRange(FakeComObject):
+    """A character range of a text frame: Text (get and set), Length, Characters, Font and Bound*"""
+
+    def __init__(self, app, frame, start, length):
+        # start is 0-based; length None means to the end of the text
+        super().__init__(app)
+        object.__setattr__(self, "_frame", frame)
+        object.__setattr__(self, "_start", start)
+        object.__setattr__(self, "_length", length)
+
+    def _span(self):
+        text = full_text(self._frame._body)
+        end = len(text) if self._length is None else min(len(text), self._start + self._length)
+        return text, self._start, end
+
+    @property
+    def Text(self):
+        text, start, end = self._span()
+        return text[start:end]
+
+    @Text.setter
+    def Text(self, value):
+        text, start, end = self._span()
+        frame = self._frame
+        # Every write is a document edit: an undo entry and a re-layout in PowerPoint
+        self._app.calls.mutations += 1
+        object.__setattr__(frame, "_body", text_body_with_text(frame._body, text[:start] + value + text[end:]))
+
+    @property
+    def Length(self):
+        text, start, end = self._span()
+        return utf16_length(text[start:end])
+
+    def Characters(self, Start=1, Length=-1):
+        # Start and Length count UTF-16 code units, as in PowerPoint
+        text, start, end = self._span()
+        start = min(_advance_utf16(text, start, max(Start, 1) - 1), end)
+        length = None if Length < 0 else min(_advance_utf16(text, start, Length), end) - start
+        return FakeTextRange(self._app, self._frame, start, length)
+
+    @property
+    def Font(self):
+        for paragraph in self._frame._body["paragraphs"]:
+            for run in paragraph["runs"]:
+                if run["text"]:
+                    return FakeFont(self._app, run)
+        return FakeFont(self._app, DEFAULT_TEXT_STYLE)
+
+    def _bounds(self):
+        body = self._frame._body
+        _, start, end = self._span()
+        lines = layout_text(text_body_prefix(body, end), self._frame._box, 1.0)
+        if start > 0:
+            # Drop the lines that end before the range starts
+            lines = lines[max(0, len(layout_text(text_body_prefix(body, start), self._frame._box, 1.0)) - 1):]
+        if not lines or start >= end:
+            return layout_bounds(make_text_body("", insets=body["insets"]), self._frame._box)
+        return lines_bounds(lines)
+
+    @property
+    def BoundLeft(self):
+        return self._bounds()[0]
+
+    @property
+    def BoundTop(self):
+        return self._bounds()[1]
+
+    @property
+    def BoundWidth(self):
+        return self._bounds()[2]
+
+    @property
+    def BoundHeight(self):
+        return self._bounds()[3]
+
+
+class FakeCell(FakeComObject):
+
+    def __init__(self, app, shape):
+        super().__init__(app)
+        self._shape = shape
+
+    @property
+    def Shape(self):
+        return self._shape
+
+
+class FakeRow(FakeComObject):
+
+    def __init__(self, app, height):
+        super().__init__(app)
+        self._height = height
+
+    @property
+    def Height(self):
+        return self._height
+
+
+class FakeColumn(FakeComObject):
+
+    def __init__(self, app, width):
+        super().__init__(app)
+        self._width = width
+
+    @property
+    def Width(self):
+        return self._width
+
+
+class FakeTable(FakeComObject):
+
+    def __init__(self, app, table):
+        super().__init__(app)
+        self._cells = []
+        for row in table["cells"]:
+            self._cells.append([FakeCell(app, FakeShape(app, _cell_record(cell))) for cell in row])
+        self._rows = FakeCollection(app, [FakeRow(app, height) for height in table["row_heights"]])
+        self._columns = FakeCollection(app, [FakeColumn(app, width) for width in table["col_widths"]])
+
+    @property
+    def Rows(self):
+        return self._rows
+
+    @property
+    def Columns(self):
+        return self._columns
+
+    def Cell(self, Row, Column):
+        if not 1 <= Row <= len(self._cells) or not 1 <= Column <= len(self._cells[Row - 1]):
+            raise FakeComError(f"No cell {Row}.{Column}")
+        return self._cells[Row - 1][Column - 1]
+
+
+def _cell_record(cell):
+    record = make_shape(0, MSO_AUTO_SHAPE, cell["bbox"], fill=cell["fill"] or dict(NO_FILL))
+    record["text_body"] = cell["text_body"]
+    record["text"] = cell["text"]
+    return record
+
+
+class FakeShape(FakeComObject):
+    """A shape built from a pptx_shape_extractor record"""
+
+    def __init__(self, app, record):
+        super().__init__(app)
+        self._record = record
+        self._text_frame = None
+        self._table = None
+        self._group_items = None
+
+    @property
+    def Id(self):
+        return self._record["id"]
+
+    @property
+    def Name(self):
+        return self._record["name"]
+
+    @property
+    def Type(self):
+        return self._record["type"]
+
+    @property
+    def Left(self):
+        return self._record["bbox"][0]
+
+    @property
+    def Top(self):
+        return self._record["bbox"][1]
+
+    @property
+    def Width(self):
+        return self._record["bbox"][2]
+
+    @property
+    def Height(self):
+        return self._record["bbox"][3]
+
+    @property
+    def Rotation(self):
+        return self._record["rotation"]
+
+    @property
+    def HasTable(self):
+        return MSO_TRUE if self._record["table"] is not None else MSO_FALSE
+
+    @property
+    def Table(self):
+        if self._record["table"] is None:
+            raise FakeComError(f"Shape {self._record['id']} is not a table")
+        if self._table is None:
+            self._table = FakeTable(self._app, self._record["table"])
+        return self._table
+
+    @property
+    def HasTextFrame(self):
+        return MSO_TRUE if self._record["has_text_frame"] else MSO_FALSE
+
+    @property
+    def TextFrame(self):
+        if not self._record["has_text_frame"]:
+            raise FakeComError(f"Shape {self._record['id']} has no text frame")
+        if self._text_frame is None:
+            self._text_frame = FakeTextFrame(self._app, self._record["text_body"], self._record["bbox"])
+        return self._text_frame
+
+    @property
+    def Fill(self):
+        return FakeFillFormat(self._app, self._record["fill"], self._record["type"] not in NON_RGB_FILL_TYPES)
+
+    @property
+    def Line(self):
+        return FakeLineFormat(self._app, self._record["line"])
+
+    @property
+    def GroupItems(self):
+        if self._record["type"] != MSO_GROUP:
+            raise FakeComError(f"Shape {self._record['id']} is not a group")
+        if self._group_items is None:
+            self._group_items = FakeCollection(self._app, [FakeShape(self._app, child)
+                                                           for child in self._record["children"]])
+        return self._group_items
+
+
+class FakeSlide(FakeComObject):
+
+    def __init__(self, app, presentation, data):
+        super().__init__(app)
+        self._presentation = presentation
+        self._data = data
+        self._shapes = FakeCollection(app, [FakeShape(app, record) for record in data["shapes"]])
+
+    @property
+    def SlideIndex(self):
+        return self._data["slide_number"]
+
+    @property
+    def Shapes(self):
+        return self._shapes
+
+    def find_shapes(self, shape_ids):
+        """Top-level fake shapes with these ids, in the given order (not counted)"""
+        by_id = {shape._record["id"]: shape for shape in self._shapes._items}
+        return [by_id[shape_id] for shape_id in shape_ids if shape_id in by_id]
+
+    def render(self, dpi=DEFAULT_DPI):
+        """Draw the slide from its records with the offline rasterizer"""
+        scale = dpi / 72.0
+        size = (int(round(self._data["slide_width"] * scale)), int(round(self._data["slide_height"] * scale)))
+        image = Image.new("RGBA", size, _rgba(self._data.get("background") or [255, 255, 255]))
+        source = self._presentation._source_path
+        deck = PptxPresentation(source) if source else None
+        try:
+            # Without a source deck pictures are drawn as placeholder frames
+            rasterizer = SlideRasterizer(deck, dpi)
+            for record in self._data.get("background_shapes", []) + self._data["shapes"]:
+                rasterizer.draw_shape(image, record)
+        finally:
+            if deck is not None:
+                deck.close()
+        return image.convert("RGB")
+
+    def Export(self, FileName, FilterName="PNG", ScaleWidth=0, ScaleHeight=0):
+        dpi = DEFAULT_DPI
+        if ScaleWidth:
+            dpi = ScaleWidth * 72.0 / self._data["slide_width"]
+        self.render(dpi).save(FileName, FilterName.upper().replace("JPG", "JPEG"))
+
+
+class FakePageSetup(FakeComObject):
+
+    def __init__(self, app, width, height):
+        super().__init__(app)
+        self._width = width
+        self._height = height
+
+    @property
+    def SlideWidth(self):
+        return self._width
+
+    @property
+    def SlideHeight(self):
+        return self._height
+
+
+class FakeSelection(FakeComObject):
+
+    def __init__(self, app, shapes):
+        super().__init__(app)
+        self._shapes = shapes
+
+    @property
+    def Type(self):
+        return PP_SELECTION_SHAPES if self._shapes else PP_SELECTION_NONE
+
+    @property
+    def ShapeRange(self):
+        if not self._shapes:
+            raise FakeComError("Nothing is selected")
+        return FakeCollection(self._app, self._shapes)
+
+
+class FakeView(FakeComObject):
+
+    def __init__(self, app, window):
+        super().__init__(app)
+        self._window = window
+
+    @property
+    def Slide(self):
+        return self._window._slide()
+
+    def GotoSlide(self, Index):
+        self._window.goto_slide(Index)
+
+
+class FakeDocumentWindow(FakeComObject):
+
+    def __init__(self, app, presentation):
+        super().__init__(app)
+        self._presentation = presentation
+        self._slide_index = 1
+        self._selected = []
+        self._view = FakeView(app, self)
+
+    def _slide(self):
+        return self._presentation._slides.Item(self._slide_index)
+
+    def goto_slide(self, slide_number):
+        """Show another slide (drops the selection, as PowerPoint does)"""
+        self._presentation._slides.Item(slide_number)
+        self._slide_index = slide_number
+        self._selected = []
+
+    def select(self, shape_ids):
+        """Select shapes of the current slide by id (not counted)"""
+        self._selected = self._presentation._slides._items[self._slide_index - 1].find_shapes(shape_ids)
+
+    @property
+    def View(self):
+        return self._view
+
+    @property
+    def Selection(self):
+        return FakeSelection(self._app, list(self._selected))
+
+    @property
+    def Presentation(self):
+        return self._presentation
+
+
+class FakePresentation(FakeComObject):
+
+    def __init__(self, app, deck, full_name, source_path=None):
+        # deck is {"slide_width", "slide_height", "slides": extractor slide dicts}
+        super().__init__(app)
+        self._full_name = full_name
+        self._source_path = source_path
+        self._page_setup = FakePageSetup(app, deck["slide_width"], deck["slide_height"])
+        self._slides = FakeCollection(app, [FakeSlide(app, self, slide) for slide in deck["slides"]])
+        self._windows = FakeCollection(app, [FakeDocumentWindow(app, self)])
+
+    @property
+    def FullName(self):
+        return self._full_name
+
+    @property
+    def Name(self):
+        return os.path.basename(self._full_name.replace("\\", "/"))
+
+    @property
+    def PageSetup(self):
+        return self._page_setup
+
+    @property
+    def Slides(self):
+        return self._slides
+
+    @property
+    def Windows(self):
+        return self._windows
+
+    def SaveCopyAs(self, FileName):
+        if self._source_path is None:
+            raise FakeComError("Synthetic presentations cannot be saved")
+        shutil.copyfile(self._source_path, FileName)
+
+    def Close(self):
+        self._app.close(self)
+
+
+class FakeApplication(FakeComObject):
+    """In-process stand-in for win32com.client.Dispatch("PowerPoint.Application")"""
+
+    def __init__(self, latency=0.0, member_latency=None):
+        object.__setattr__(self, "_app", self)
+        object.__setattr__(self, "calls", CallStats(latency, member_latency))
+        self._presentations = FakePresentations(self, [])
+        self.Visible = MSO_TRUE
+        self.calls.reset()
+
+    def open(self, path):
+        """Load a .pptx through the offline extractor and make it the active presentation"""
+        with PptxPresentation(path) as presentation:
+            deck = {"slide_width": presentation.slide_width, "slide_height": presentation.slide_height,
+                    "slides": presentation.extract_all()}
+        return self.add(deck, os.path.abspath(path), source_path=path)
+
+    def add(self, deck, full_name="Synthetic.pptx", source_path=None):
+        """Add a presentation from deck data (e.g. synthetic_deck) and make it active"""
+        presentation = FakePresentation(self, deck, full_name, source_path)
+        self._presentations._items.append(presentation)
+        return presentation
+
+    def close(self, presentation):
+        self._presentations._items.remove(presentation)
+
+    def _active(self):
+        if not self._presentations._items:
+            raise FakeComError("No presentation is open")
+        return self._presentations._items[-1]
+
+    @property
+    def active_window(self):
+        """Window of the active presentation, for driving the fake (not counted)"""
+        return self._active()._windows._items[0]
+
+    @property
+    def Presentations(self):
+        return self._presentations
+
+    @property
+    def ActivePresentation(self):
+        return self._active()
+
+    @property
+    def ActiveWindow(self):
+        return self.active_window
+
+
+# -- synthetic decks ---------------------------------------------------------
+
+def make_text_body(text, size=DEFAULT_FONT_SIZE, rgb=(0, 0, 0), align='l', anchor='t', insets=None, bold=False):
+    """A parsed text body (as pptx_shape_extractor.parse_text_body returns) with one run per paragraph"""
+    paragraphs = []
+    for paragraph_text in text.split(PARAGRAPH_SEPARATOR) if text else []:
+        runs = [{"size": size, "rgb": list(rgb), "bold": bold, "italic": False, "text": paragraph_text}] \
+            if paragraph_text else []
+        paragraphs.append({"align": align, "level": 0, "runs": runs, "end_size": size})
+    return {"text": text, "paragraphs": paragraphs, "insets": list(insets or DEFAULT_INSETS), "anchor": anchor,
+            "wrap": True}
+
+
+def make_shape(shape_id, shape_type, bbox, fill=None, line=None, text=None, **text_style):
+    """A shape record in pptx_shape_extractor's format"""
+    has_text_frame = shape_type not in (MSO_PICTURE, MSO_TABLE, MSO_GROUP, MSO_CHART, MSO_SMART_ART)
+    text_body = make_text_body(text or "", **text_style) if has_text_frame else None
+    return {
+        "id": shape_id,
+        "name": f"Shape {shape_id}",
+        "type": shape_type,
+        "bbox": [float(v) for v in bbox],
+        "rotation": 0.0,
+        "geometry": "rect",
+        "fill": fill or dict(NO_FILL),
+        "line": line or dict(NO_FILL, width=0.0),
+        "has_text_frame": has_text_frame,
+        "text": text_body["text"] if text_body else "",
+        "text_body": text_body,
+        "image_part": None,
+        "table": None,
+        "children": [],
+    }
+
+
+def make_table(shape_id, bbox, texts):
+    """A table shape record with evenly sized cells holding texts (list of rows)"""
+    rows, cols = len(texts), len(texts[0])
+    row_height = bbox[3] / rows
+    col_width = bbox[2] / cols
+    record = make_shape(shape_id, MSO_TABLE, bbox)
+    cells = []
+    for row_idx, row in enumerate(texts):
+        cells.append([{
+            "bbox": [bbox[0] + col_idx * col_width, bbox[1] + row_idx * row_height, col_width, row_height],
+            "text": text,
+            "text_body": make_text_body(text, size=12),
+            "fill": None,
+            "span": [1, 1],
+            "merged": False,
+        } for col_idx, text in enumerate(row)])
+    record["table"] = {"rows": rows, "cols": cols, "row_heights": [row_height] * rows,
+                       "col_widths": [col_width] * cols, "cells": cells}
+    return record
+
+
+def _solid(rgb):
+    return {"visible": True, "rgb": list(rgb), "is_rgb": True, "transparency": 0.0}
+
+
+def synthetic_slide(slide_number, shapes=40, table_size=(6, 5), seed=0, slide_width=960.0, slide_height=540.0):
+    """A slide of random filled boxes, text boxes (some invisible with trailing blank paragraphs), pictures
+    and a table"""
+    rng = random.Random(seed * 1000 + slide_number)
+    records = []
+    next_id = 2
+    if table_size:
+        rows, cols = table_size
+        texts = [[f"r{r}c{c}" for c in range(1, cols + 1)] for r in range(1, rows + 1)]
+        records.append(make_table(next_id, [40.0, 300.0, 60.0 * cols, 24.0 * rows], texts))
+        next_id += 1
+    for _ in range(shapes):
+        width = rng.uniform(60, 300)
+        height = rng.uniform(24, 120)
+        bbox = [rng.uniform(0, slide_width - width), rng.uniform(0, slide_height - height), width, height]
+        kind = rng.random()
+        if kind < 0.1:
+            record = make_shape(next_id, MSO_PICTURE, bbox)
+        elif kind < 0.6:
+            # Text box without fill or outline; on_ok measures its text instead of the frame
+            text = " ".join(rng.choice(["Revenue", "Growth", "Q3", "Plan", "Margin", "Team"])
+                            for _ in range(rng.randint(1, 8)))
+            if rng.random() < 0.5:
+                text += PARAGRAPH_SEPARATOR * rng.randint(1, 3)
+            record = make_shape(next_id, MSO_TEXT_BOX, bbox, text=text, size=rng.choice([12, 14, 18, 24]))
+        else:
+            color = [rng.randrange(256) for _ in range(3)]
+            record = make_shape(next_id, MSO_AUTO_SHAPE, bbox, fill=_solid(color),
+                                line=dict(_solid([0, 0, 0]), width=0.75),
+                                text=rng.choice(["", "Label", f"Box {next_id}"]), rgb=(255, 255, 255))
+        records.append(record)
+        next_id += 1
+    return {"slide_number": slide_number, "slide_width": slide_width, "slide_height": slide_height,
+            "background": [255, 255, 255], "background_shapes": [], "shapes": records}
+
+
+def synthetic_deck(slides=1, shapes=40, table_size=(6, 5), seed=0, slide_width=960.0, slide_height=540.0):
+    """Deck data for FakeApplication.add"""
+    return {"slide_width": slide_width, "slide_height": slide_height,
+            "slides": [synthetic_slide(n, shapes, table_size, seed, slide_width, slide_height)
+                       for n in range(1, slides + 1)]}
+
+
+# -- command line --------------------------------------------------------------
+
+def _measure(app, action):
+    app.calls.reset()
+    start = time.perf_counter()
+    result = action()
+    return result, app.calls.calls, (time.perf_counter() - start) * 1000.0
+
+
+def _read_tables(slide):
+    snapshot = SlideSnapshot(slide)
+    return [snapshot.get_table(table_id) for table_id in snapshot.table_shapes]
+
+
+def benchmark(app, repeat=5):
+    """COM calls and time of the reads the capture tool makes, on the active slide of the fake"""
+    window = app.active_window
+    slide = window._slide()
+    window.select([shape._record["id"] for shape in slide._shapes._items])
+    selection_source = ComSelectionSource(app)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = os.path.join(tmp_dir, "slide.png")
+        rows = [("selection poll (all shapes selected)", selection_source.read_state),
+                ("slide snapshot with every table", lambda: _read_tables(slide)),
+                ("slide export", lambda: slide.Export(export_path, "PNG"))]
+        results = []
+        for label, action in rows:
+            timings = [_measure(app, action)[1:] for _ in range(repeat)]
+            results.append((label, timings[-1][0], sum(ms for _, ms in timings) / repeat))
+    window.select([])
+    return results
+
+
+def _print_slide(slide):
+    print(f"Slide {slide._data['slide_number']} ({slide._data['slide_width']:.0f} x {slide._data['slide_height']:.0f} pt)")
+    for record in iter_shapes(slide._data["shapes"]):
+        bbox = [round(v, 1) for v in record["bbox"]]
+        text = record["text"].strip().replace(PARAGRAPH_SEPARATOR, " / ").replace(LINE_BREAK, " ")
+        extra = f" table {record['table']['rows']}x{record['table']['cols']}" if record["table"] else ""
+        print(f"  {record['id']:>4} type {record['type']:>2} {bbox}{extra} {text[:40]!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake PowerPoint COM object model for headless runs")
+    parser.add_argument("--pptx", help="Load this deck (default: a synthetic deck)")
+    parser.add_argument("--slide", type=int, default=1)
+    parser.add_argument("--shapes", type=int, default=40, help="Shapes per synthetic slide")
+    parser.add_argument("--table", default="6x5", help="Table per synthetic slide, ROWSxCOLS or 'none'")
+    parser.add_argument("--seed", type=int, default=0)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("show", help="Print the shapes the fake exposes on a slide")
+    bench_parser = subparsers.add_parser("bench", help="Count COM calls and time the capture tool's reads")
+    bench_parser.add_argument("--latency-ms", type=float, default=0.2, help="Per-call round trip")
+    bench_parser.add_argument("--export-ms", type=float, default=150.0, help="Round trip of Slide.Export")
+    bench_parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000.0 if args.command == "bench" else 0.0
+    member_latency = {"Export": args.export_ms / 1000.0} if args.command == "bench" else None
+    app = FakeApplication(latency, member_latency)
+    if args.pptx:
+        app.open(args.pptx)
+    else:
+        table_size = None if args.table == "none" else tuple(int(v) for v in args.table.lower().split("x"))
+        app.add(synthetic_deck(args.slide, args.shapes, table_size, args.seed))
+    app.active_window.goto_slide(args.slide)
+
+    if args.command == "show":
+        _print_slide(app.active_window._slide())
+        return
+
+    print(f"{args.latency_ms:.2f} ms per call, {args.export_ms:.0f} ms per export")
+    for label, calls, ms in benchmark(app, args.repeat):
+        print(f"  {label:<40} {calls:>6} calls {ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import contextlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+COUNTER_FILENAME = ".next_id"
+
+
+def scan_max_id(root):
+    """Highest numeric id in root/img and root/json (full directory scan)"""
+    max_id = 0
+    for sub_dir, extension in (("img", ".png"), ("json", ".json")):
+        directory = os.path.join(root, sub_dir)
+        if not os.path.exists(directory):
+            continue
+        for filename in os.listdir(directory):
+            if filename.endswith(extension):
+                try:
+                    max_id = max(max_id, int(filename[:-len(extension)]))
+                except ValueError:
+                    pass
+    return max_id
+
+
+def list_capture_ids(json_dir):
+    """Numeric capture ids present in a json directory, sorted"""
+    ids = []
+    for filename in os.listdir(json_dir):
+        if filename.endswith('.json'):
+            try:
+                ids.append(int(filename[:-len('.json')]))
+            except ValueError:
+                pass
+    return sorted(ids)
+
+
+@contextlib.contextmanager
+def file_lock(lock_path):
+    """Exclusive inter-process lock on lock_path (blocks until acquired)"""
+    with open(lock_path, 'a+b') as lock_file:
+        if os.name == 'nt':
+            lock_file.seek(0)
+            while True:
+                try:
+                    # LK_LOCK itself retries for ~10s before giving up
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class FileIdAllocator:
+    """Hands out sequential capture ids from a lock-protected counter file"""
+
+    def __init__(self, root="resources"):
+        self.root = root
+        self.counter_path = os.path.join(root, COUNTER_FILENAME)
+        self.lock_path = self.counter_path + ".lock"
+
+    def _id_in_use(self, file_id):
+        """Whether either file of a capture id already exists"""
+        return os.path.exists(os.path.join(self.root, "json", f"{file_id}.json")) or \
+            os.path.exists(os.path.join(self.root, "img", f"{file_id}.png"))
+
+    def _read_counter(self):
+        try:
+            with open(self.counter_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            # First use (or a damaged counter): seed it with one directory scan
+            return scan_max_id(self.root) + 1
+
+    def _write_counter(self, next_id):
+        tmp_path = f"{self.counter_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(next_id))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.counter_path)
+
+    def allocate(self):
+        """Reserve and return the next free capture id (atomic across processes)"""
+        os.makedirs(self.root, exist_ok=True)
+        with file_lock(self.lock_path):
+            file_id = self._read_counter()
+            # A stale counter (e.g. files copied in by hand) skips ids already on disk
+            while self._id_in_use(file_id):
+                file_id += 1
+            self._write_counter(file_id + 1)
+        return file_id
+
+    def peek(self):
+        """Next id that allocate() would try, without reserving it"""
+        with file_lock(self.lock_path):
+            return self._read_counter()
+
+    def reset(self, next_id=None):
+        """Set the counter (re-scanning the directories when next_id is None)"""
+        os.makedirs(self.root, exist_ok=True)
+        with file_lock(self.lock_path):
+            if next_id is None:
+                next_id = scan_max_id(self.root) + 1
+            self._write_counter(next_id)
+
+
+def _stress_worker(root, count, results):
+    """Allocate ids and create their json file like a capture station would"""
+    allocator = FileIdAllocator(root)
+    ids = []
+    try:
+        for _ in range(count):
+            file_id = allocator.allocate()
+            with open(os.path.join(root, "json", f"{file_id}.json"), 'x', encoding='utf-8') as f:
+                f.write("[]")
+            ids.append(file_id)
+    except Exception as e:
+        # A duplicate id (the file already exists) is the failure this test looks for; report it, or the
+        # parent would wait for this worker's results forever
+        results.put((ids, f"{type(e).__name__}: {str(e)}"))
+        return
+    results.put((ids, None))
+
+
+def stress_test(workers, count):
+    """Run many concurrent writers against one counter; return (ok, elapsed, ids, errors)"""
+    root = tempfile.mkdtemp(prefix="id_allocator_")
+    try:
+        os.makedirs(os.path.join(root, "json"))
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_stress_worker, args=(root, count, results))
+                     for _ in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        ids = []
+        errors = []
+        for _ in processes:
+            worker_ids, error = results.get()
+            ids.extend(worker_ids)
+            if error:
+                errors.append(error)
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        expected = list(range(1, workers * count + 1))
+        ok = not errors and sorted(ids) == expected and all(p.exitcode == 0 for p in processes)
+        return ok, elapsed, ids, errors
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture id counter maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    show_parser = subparsers.add_parser("show", help="Print the next id")
+    show_parser.add_argument("--root", default="resources")
+
+    reset_parser = subparsers.add_parser("reset", help="Re-seed the counter from the directories")
+    reset_parser.add_argument("--root", default="resources")
+    reset_parser.add_argument("--next-id", type=int)
+
+    stress_parser = subparsers.add_parser("stress", help="Concurrent writers stress test")
+    stress_parser.add_argument("--workers", type=int, default=16)
+    stress_parser.add_argument("--count", type=int, default=100, help="Ids allocated per worker")
+
+    args = parser.parse_args()
+
+    if args.command == "show":
+        print(FileIdAllocator(args.root).peek())
+    elif args.command == "reset":
+        allocator = FileIdAllocator(args.root)
+        allocator.reset(args.next_id)
+        print(f"Next id: {allocator.peek()}")
+    elif args.command == "stress":
+        ok, elapsed, ids, errors = stress_test(args.workers, args.count)
+        for error in errors:
+            print(f"Writer error: {error}")
+        print(f"{args.workers} writers x {args.count} ids: {len(ids)} allocated, "
+              f"{len(set(ids))} unique, {len(ids) / elapsed:.0f} ids/s -> {'OK' if ok else 'FAILED'}")
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
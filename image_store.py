@@ -0,0 +1,195 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from file_id_allocator import list_capture_ids
+
+
+STORE_DIRNAME = "img_store"
+HASH_KEY = "image_sha256"
+
+
+def pixel_hash(image):
+    """SHA-256 of an image's decoded pixels (PNG metadata and compression do not change it)"""
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode} {image.width}x{image.height}\n".encode('ascii'))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def file_pixel_hash(path):
+    with Image.open(path) as image:
+        return pixel_hash(image)
+
+
+def blob_path(root, digest):
+    """Where the screenshot with this pixel hash is stored (sharded by the first two hex digits)"""
+    return os.path.join(root, STORE_DIRNAME, digest[:2], f"{digest}.png")
+
+
+def capture_image_path(root, capture_id, records):
+    """Screenshot of a capture: its content-addressed blob, or img/{id}.png for captures not migrated"""
+    for item in records or []:
+        if isinstance(item, dict) and item.get(HASH_KEY):
+            return blob_path(root, item[HASH_KEY])
+    return os.path.join(root, "img", f"{capture_id}.png")
+
+
+def store_file(root, png_path, digest=None):
+    """Move a PNG into the store under its pixel hash; an identical render already stored wins"""
+    digest = digest or file_pixel_hash(png_path)
+    target = blob_path(root, digest)
+    if os.path.exists(target):
+        os.remove(png_path)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(png_path, target)
+    return digest
+
+
+def with_image_hash(records, digest):
+    """Copies of a capture's records pointing at a stored screenshot"""
+    return [dict(item, **{HASH_KEY: digest}) for item in records]
+
+
+def _hash_file(path):
+    return path, os.path.getsize(path), file_pixel_hash(path)
+
+
+def migrate(root="resources", workers=None):
+    """Move every img/{id}.png into the store and point its JSON at the hash; safe to re-run"""
+    # capture_writer imports this module for its own dedup step
+    from capture_writer import write_json_atomic
+    json_dir = os.path.join(root, "json")
+    img_dir = os.path.join(root, "img")
+    stats = {"migrated": 0, "unique": 0, "bytes_before": 0}
+    if not os.path.exists(img_dir):
+        return stats
+    capture_ids = [capture_id for capture_id in list_capture_ids(json_dir)
+                   if os.path.exists(os.path.join(img_dir, f"{capture_id}.png"))]
+    paths = [os.path.join(img_dir, f"{capture_id}.png") for capture_id in capture_ids]
+
+    # Decoding and hashing dominate, so they run across processes; moves and JSON writes stay here
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        hashed = pool.map(_hash_file, paths, chunksize=16)
+        for capture_id, (path, size, digest) in zip(capture_ids, hashed):
+            json_path = os.path.join(json_dir, f"{capture_id}.json")
+            with open(json_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            new_blob = not os.path.exists(blob_path(root, digest))
+            if new_blob:
+                os.makedirs(os.path.dirname(blob_path(root, digest)), exist_ok=True)
+                # Copy first: the PNG is only removed once the JSON points at the blob
+                with open(path, 'rb') as src, open(blob_path(root, digest) + ".tmp", 'wb') as dst:
+                    dst.write(src.read())
+                os.replace(blob_path(root, digest) + ".tmp", blob_path(root, digest))
+            write_json_atomic(json_path, with_image_hash(records, digest))
+            os.remove(path)
+            stats["migrated"] += 1
+            stats["unique"] += new_blob
+            stats["bytes_before"] += size
+    return stats
+
+
+def referenced_hashes(root="resources"):
+    """Pixel hash -> number of captures pointing at it"""
+    json_dir = os.path.join(root, "json")
+    counts = {}
+    for capture_id in list_capture_ids(json_dir):
+        with open(os.path.join(json_dir, f"{capture_id}.json"), 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        for item in records:
+            if isinstance(item, dict) and item.get(HASH_KEY):
+                counts[item[HASH_KEY]] = counts.get(item[HASH_KEY], 0) + 1
+                break
+    return counts
+
+
+def stored_blobs(root="resources"):
+    """Pixel hash -> size in bytes of every blob in the store"""
+    blobs = {}
+    store_dir = os.path.join(root, STORE_DIRNAME)
+    if not os.path.exists(store_dir):
+        return blobs
+    for shard in os.listdir(store_dir):
+        shard_dir = os.path.join(store_dir, shard)
+        if not os.path.isdir(shard_dir):
+            continue
+        with os.scandir(shard_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".png"):
+                    blobs[entry.name[:-len(".png")]] = entry.stat().st_size
+    return blobs
+
+
+def storage_report(root="resources"):
+    """Bytes the captures would take as one PNG each vs. what the store holds"""
+    references = referenced_hashes(root)
+    blobs = stored_blobs(root)
+    logical = sum(blobs.get(digest, 0) * count for digest, count in references.items())
+    stored = sum(blobs.values())
+    unreferenced = [digest for digest in blobs if digest not in references]
+    missing = [digest for digest in references if digest not in blobs]
+    return {
+        "captures": sum(references.values()),
+        "blobs": len(blobs),
+        "logical_bytes": logical,
+        "stored_bytes": stored,
+        "saved_bytes": logical - stored,
+        "unreferenced": unreferenced,
+        "missing": missing,
+    }
+
+
+def collect_garbage(root="resources"):
+    """Delete blobs no capture points at; returns (count, bytes freed)"""
+    references = referenced_hashes(root)
+    freed = 0
+    removed = 0
+    for digest, size in stored_blobs(root).items():
+        if digest not in references:
+            os.remove(blob_path(root, digest))
+            removed += 1
+            freed += size
+    return removed, freed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed storage of capture screenshots")
+    parser.add_argument("--root", default="resources")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Move img/{id}.png files into the store")
+    migrate_parser.add_argument("--workers", type=int, default=None, help="Hashing processes (default: CPU count)")
+    subparsers.add_parser("report", help="Print bytes saved by deduplication")
+    subparsers.add_parser("gc", help="Delete blobs no capture refers to (while no station is capturing)")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        start = time.perf_counter()
+        stats = migrate(args.root, args.workers)
+        print(f"Migrated {stats['migrated']} screenshots ({stats['bytes_before'] / 1e6:.1f} MB) into "
+              f"{stats['unique']} new blobs in {time.perf_counter() - start:.2f}s")
+    elif args.command == "gc":
+        removed, freed = collect_garbage(args.root)
+        print(f"Removed {removed} unreferenced blobs ({freed / 1e6:.1f} MB)")
+        return
+
+    report = storage_report(args.root)
+    saved = report["saved_bytes"] / report["logical_bytes"] if report["logical_bytes"] else 0.0
+    print(f"{report['captures']} captures share {report['blobs']} screenshots: "
+          f"{report['logical_bytes'] / 1e6:.1f} MB as one PNG each, {report['stored_bytes'] / 1e6:.1f} MB stored, "
+          f"{report['saved_bytes'] / 1e6:.1f} MB saved ({saved:.0%})")
+    if report["unreferenced"]:
+        print(f"{len(report['unreferenced'])} blobs are unreferenced (run gc to delete them)")
+    if report["missing"]:
+        print(f"{len(report['missing'])} referenced blobs are missing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import gzip
+import io
+import json
+import os
+import time
+
+try:
+    import zstandard
+except ImportError:  # zstd output is optional
+    zstandard = None
+
+from capture_reader import CaptureStore
+from file_id_allocator import list_capture_ids
+from image_store import capture_image_path
+
+
+MANIFEST_FILENAME = "manifest.json"
+EXTENSIONS = {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+DEFAULT_SHARD_MB = 256
+DEFAULT_OUTPUT = os.path.join("resources", "export")
+
+
+def iter_capture_records(root="resources"):
+    """One flat record per captured selection: capture id and record index, then the JSON record's fields"""
+    store = CaptureStore(root)
+    try:
+        for capture_id in list_capture_ids(os.path.join(root, "json")):
+            capture = store.capture(capture_id)
+            if capture is None:
+                continue
+            records = capture.records
+            img_path = capture_image_path(root, capture_id, records)
+            image = os.path.relpath(img_path, root).replace(os.sep, "/") if os.path.exists(img_path) else None
+            for record_index, item in enumerate(records):
+                flat = {"capture_id": capture_id, "record_index": record_index, "image": image}
+                flat.update(item)
+                yield flat
+    finally:
+        store.close()
+
+
+def _open_write(path, compression, level=None):
+    raw = open(path, 'wb')
+    if compression == "gzip":
+        stream = gzip.GzipFile(filename="", fileobj=raw, mode='wb', compresslevel=level or 6)
+    elif compression == "zstd":
+        if zstandard is None:
+            raw.close()
+            raise RuntimeError("zstd compression needs the zstandard package (pip install zstandard)")
+        stream = zstandard.ZstdCompressor(level=level or 3).stream_writer(raw)
+    else:
+        stream = raw
+    return raw, stream
+
+
+class ShardedJsonlWriter:
+    """Writes compact JSON lines into numbered shards of at most shard_bytes (uncompressed) each"""
+
+    def __init__(self, output_dir, prefix="captures", compression="none", shard_bytes=DEFAULT_SHARD_MB << 20,
+                 level=None):
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Unknown compression '{compression}'")
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.compression = compression
+        self.shard_bytes = shard_bytes
+        self.level = level
+        self.shards = []
+        self.manifest = None
+        self.raw = None
+        self.stream = None
+        self.tmp_path = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _open_shard(self):
+        name = f"{self.prefix}-{len(self.shards):05d}{EXTENSIONS[self.compression]}"
+        self.shards.append({"file": name, "records": 0, "bytes": 0})
+        # Shards are written under a temporary name, so a reader never sees a truncated one
+        self.tmp_path = os.path.join(self.output_dir, name + ".tmp")
+        self.raw, self.stream = _open_write(self.tmp_path, self.compression, self.level)
+
+    def _close_shard(self):
+        if self.stream is None:
+            return
+        self.stream.close()
+        if not self.raw.closed:
+            self.raw.close()
+        shard = self.shards[-1]
+        path = os.path.join(self.output_dir, shard["file"])
+        os.replace(self.tmp_path, path)
+        shard["compressed_bytes"] = os.path.getsize(path)
+        self.raw = self.stream = self.tmp_path = None
+
+    def write(self, record):
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode('utf-8')
+        if self.stream is None or (self.shards[-1]["bytes"] and self.shards[-1]["bytes"] + len(line) > self.shard_bytes):
+            self._close_shard()
+            self._open_shard()
+        self.stream.write(line)
+        self.shards[-1]["records"] += 1
+        self.shards[-1]["bytes"] += len(line)
+
+    def close(self):
+        """Finish the last shard and write the manifest listing every shard"""
+        self._close_shard()
+        manifest = {"compression": self.compression, "records": sum(s["records"] for s in self.shards),
+                    "shards": self.shards}
+        path = os.path.join(self.output_dir, MANIFEST_FILENAME)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+        self.manifest = manifest
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self.stream is not None:
+            self.stream.close()
+            if not self.raw.closed:
+                self.raw.close()
+            os.remove(self.tmp_path)
+
+
+def export_jsonl(root="resources", output_dir=DEFAULT_OUTPUT, compression="none", shard_bytes=DEFAULT_SHARD_MB << 20,
+                 level=None):
+    """Stream every capture record into sharded JSONL; returns the manifest"""
+    with ShardedJsonlWriter(output_dir, "captures", compression, shard_bytes, level) as writer:
+        for record in iter_capture_records(root):
+            writer.write(record)
+    return writer.manifest
+
+
+def _read_manifest(output_dir):
+    with open(os.path.join(output_dir, MANIFEST_FILENAME), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def open_jsonl(path):
+    """Text stream over a .jsonl, .jsonl.gz or .jsonl.zst file"""
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the zstandard package (pip install zstandard)")
+        raw = open(path, 'rb')
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def shard_paths(source):
+    """Shard files of an export directory in order (from its manifest), or a single file"""
+    if os.path.isdir(source):
+        manifest_path = os.path.join(source, MANIFEST_FILENAME)
+        if os.path.exists(manifest_path):
+            return [os.path.join(source, shard["file"]) for shard in _read_manifest(source)["shards"]]
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.endswith(tuple(EXTENSIONS.values())))
+    return [source]
+
+
+def iter_jsonl(source):
+    """Generator over the records of an export (directory or file), one line in memory at a time"""
+    for path in shard_paths(source):
+        with open_jsonl(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export captures as JSON lines, or stream an export back")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write every capture record as one JSON line")
+    export_parser.add_argument("--root", default="resources")
+    export_parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Directory for the shards and manifest")
+    export_parser.add_argument("--compression", choices=sorted(EXTENSIONS), default="none")
+    export_parser.add_argument("--level", type=int, help="Compression level")
+    export_parser.add_argument("--shard-mb", type=float, default=DEFAULT_SHARD_MB,
+                               help="Uncompressed size at which a new shard is started")
+
+    read_parser = subparsers.add_parser("read", help="Stream an export and print record counts")
+    read_parser.add_argument("source", help="Export directory or a single shard")
+    read_parser.add_argument("--head", type=int, default=0, help="Also print the first N records")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "export":
+        if args.compression == "zstd" and zstandard is None:
+            parser.error("--compression zstd needs the zstandard package (pip install zstandard)")
+        manifest = export_jsonl(args.root, args.output, args.compression, int(args.shard_mb * (1 << 20)), args.level)
+        elapsed = time.perf_counter() - start
+        raw = sum(shard["bytes"] for shard in manifest["shards"])
+        stored = sum(shard["compressed_bytes"] for shard in manifest["shards"])
+        print(f"{manifest['records']} records in {len(manifest['shards'])} shards: {raw / 1e6:.1f} MB of JSONL, "
+              f"{stored / 1e6:.1f} MB on disk ({args.compression}) in {elapsed:.2f}s -> {args.output}")
+        return
+
+    records = 0
+    captures = 0
+    last_capture = None
+    for record in iter_jsonl(args.source):
+        if records < args.head:
+            print(json.dumps(record, ensure_ascii=False))
+        records += 1
+        # Records of a capture are consecutive, so counting changes keeps memory flat
+        if record["capture_id"] != last_capture:
+            captures += 1
+            last_capture = record["capture_id"]
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"{records} records from {captures} captures in {elapsed:.2f}s ({records / elapsed:.0f} records/s)")
+
+
+if __name__ == "__main__":
+    main()
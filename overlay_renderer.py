@@ -0,0 +1,132 @@
+import argparse
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+
+FILL_RGB = (255, 0, 0)
+FILL_ALPHA = 30
+OUTLINE_RGB = (255, 0, 0)
+
+
+def capture_pixel_boxes(records, img_width, img_height):
+    """Pixel rectangles (x1, y1, x2, y2) for every bbox of a capture, as an int array"""
+    rel = [bbox for item in records for bbox in item.get('bbox', []) if len(bbox) == 4]
+    if not rel:
+        return np.zeros((0, 4), dtype=np.int64)
+    rel = np.asarray(rel, dtype=np.float64)
+    # bboxes are relative to the slide, so the slide size cancels out
+    left = rel[:, 0] * img_width
+    top = rel[:, 1] * img_height
+    right = left + rel[:, 2] * img_width
+    bottom = top + rel[:, 3] * img_height
+    return np.trunc(np.stack([left, top, right, bottom], axis=1)).astype(np.int64)
+
+
+def coverage_counts(boxes, width, height):
+    """Number of boxes covering each pixel (boxes are inclusive, like ImageDraw.rectangle)"""
+    x1 = np.clip(boxes[:, 0], 0, width)
+    y1 = np.clip(boxes[:, 1], 0, height)
+    x2 = np.clip(boxes[:, 2] + 1, 0, width)
+    y2 = np.clip(boxes[:, 3] + 1, 0, height)
+    valid = (x2 > x1) & (y2 > y1)
+    x1, y1, x2, y2 = x1[valid], y1[valid], x2[valid], y2[valid]
+
+    # Work on the grid of distinct box edges rather than on every pixel
+    xs = np.unique(np.concatenate([[0, width], x1, x2]))
+    ys = np.unique(np.concatenate([[0, height], y1, y2]))
+    grid = np.zeros((len(ys), len(xs)), dtype=np.int32)
+    cx1, cx2 = np.searchsorted(xs, x1), np.searchsorted(xs, x2)
+    cy1, cy2 = np.searchsorted(ys, y1), np.searchsorted(ys, y2)
+    # 2D difference array: +1 at the top-left corner, -1 past each edge, then prefix sums
+    np.add.at(grid, (cy1, cx1), 1)
+    np.add.at(grid, (cy1, cx2), -1)
+    np.add.at(grid, (cy2, cx1), -1)
+    np.add.at(grid, (cy2, cx2), 1)
+    grid = grid.cumsum(axis=0).cumsum(axis=1)[:-1, :-1]
+    return grid, np.diff(xs), np.diff(ys)
+
+
+def fill_mask(boxes, width, height):
+    """Alpha mask of all box fills stacked on top of each other, as an 'L' image"""
+    if not len(boxes):
+        return Image.new('L', (width, height), 0)
+    grid, cell_widths, cell_heights = coverage_counts(boxes, width, height)
+    # n stacked fills of alpha a leave (1 - a)^n of the pixel underneath
+    counts = np.arange(grid.max() + 1)
+    alpha_lut = np.round(255.0 * (1.0 - (1.0 - FILL_ALPHA / 255.0) ** counts)).astype(np.uint8)
+    alpha = alpha_lut[grid]
+    alpha = np.repeat(np.repeat(alpha, cell_heights, axis=0), cell_widths, axis=1)
+    return Image.fromarray(alpha, 'L')
+
+
+def render_overlay(image, boxes, thickness):
+    """Tint every box and draw its outline, compositing the fills in a single pass"""
+    base = image.convert('RGB')
+    mask = fill_mask(boxes, base.width, base.height)
+    result = Image.composite(Image.new('RGB', base.size, FILL_RGB), base, mask)
+
+    draw = ImageDraw.Draw(result)
+    # The outline grows outwards from the box by thickness - 1 pixels
+    grow = thickness - 1
+    for x1, y1, x2, y2 in boxes.tolist():
+        draw.rectangle([x1 - grow, y1 - grow, x2 + grow, y2 + grow], outline=OUTLINE_RGB, width=thickness)
+    return result
+
+
+def _render_overlay_per_box(image, boxes, thickness):
+    """Previous approach (one full-frame composite per box), kept for the benchmark"""
+    result = image.convert('RGBA')
+    for x1, y1, x2, y2 in boxes.tolist():
+        overlay = Image.new('RGBA', result.size, (0, 0, 0, 0))
+        ImageDraw.Draw(overlay).rectangle([x1, y1, x2, y2], fill=FILL_RGB + (FILL_ALPHA,))
+        result = Image.alpha_composite(result, overlay)
+        draw = ImageDraw.Draw(result)
+        for i in range(thickness):
+            draw.rectangle([x1 - i, y1 - i, x2 + i, y2 + i], outline=OUTLINE_RGB + (255,))
+    return result.convert('RGB')
+
+
+def benchmark(width, height, box_counts, thickness, repeat, seed=0):
+    """Time both renderers on random boxes; returns [(boxes, per_box_ms, vectorized_ms, max_diff)]"""
+    rng = np.random.default_rng(seed)
+    image = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), 'RGB')
+    results = []
+    for n in box_counts:
+        x1 = rng.integers(0, width - 1, n)
+        y1 = rng.integers(0, height - 1, n)
+        x2 = np.minimum(x1 + rng.integers(1, width // 3, n), width - 1)
+        y2 = np.minimum(y1 + rng.integers(1, height // 3, n), height - 1)
+        boxes = np.stack([x1, y1, x2, y2], axis=1)
+
+        timings = []
+        for renderer in (_render_overlay_per_box, render_overlay):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                output = renderer(image, boxes, thickness)
+                best = min(best, time.perf_counter() - start)
+            timings.append((best * 1000.0, np.asarray(output, dtype=np.int16)))
+        max_diff = int(np.abs(timings[0][1] - timings[1][1]).max())
+        results.append((n, timings[0][0], timings[1][0], max_diff))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the test viewer's bounding box overlay")
+    parser.add_argument("--size", default="3840x2160", help="Frame size in pixels (default: 1280x720 at 300%% zoom)")
+    parser.add_argument("--boxes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--thickness", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    width, height = [int(v) for v in args.size.lower().split("x")]
+    print(f"{width}x{height}, outline {args.thickness}px, best of {args.repeat}")
+    print(f"{'boxes':>6} {'per-box ms':>11} {'single-pass ms':>15} {'speedup':>8} {'max diff':>9}")
+    for n, per_box_ms, vectorized_ms, max_diff in benchmark(width, height, args.boxes, args.thickness, args.repeat):
+        print(f"{n:>6} {per_box_ms:>11.1f} {vectorized_ms:>15.1f} {per_box_ms / vectorized_ms:>7.1f}x {max_diff:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,32 @@
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox
 import win32com.client
 import os
-import json
 import tempfile
-import re
 from datetime import datetime
 from PIL import ImageGrab
 import pythoncom
+from slide_snapshot_cache import SlideSnapshotCache
+from selection_tracker import SelectionTracker, ComSelectionSource
+from file_id_allocator import FileIdAllocator
+from capture_writer import CaptureWriter
+from capture_records import bbox_to_relative, shape_record, table_record
+from slide_rasterizer import render_slide_to_file
+from text_index import load_text_index
+from shape_classifier import classify_com_shapes
+from slide_annotator import annotate_com_slide
+from com_tracing import DEFAULT_TRACE_DIR, ComTracer, NullTracer, unwrap
 
 
 class TableSectionWidget(ttk.Frame):
     """Widget for a single table section with radio buttons and textboxes"""
     
-    def __init__(self, parent, on_remove_callback, powerpoint_app):
+    def __init__(self, parent, on_remove_callback, powerpoint_app, slide_cache):
         super().__init__(parent, relief=tk.RIDGE, borderwidth=2, padding=10)
         self.on_remove_callback = on_remove_callback
         self.powerpoint_app = powerpoint_app
+        self.slide_cache = slide_cache
         
         # Table ID
         ttk.Label(self, text="Table ID:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=5)
@@ -197,20 +207,10 @@ class TableSectionWidget(ttk.Frame):
     def get_cell_texts(self, table_id, cells):
         """Get text from specific cells in the table"""
         try:
-            table_id_int = int(table_id)
-            slide = self.powerpoint_app.ActiveWindow.View.Slide
-            
-            # Find the table shape
-            table_shape = None
-            for shape in slide.Shapes:
-                if shape.Id == table_id_int and shape.HasTable:
-                    table_shape = shape
-                    break
-            
-            if not table_shape:
+            table = self.slide_cache.get_table(int(table_id))
+            if not table:
                 return f"Table ID {table_id} not found"
             
-            table = table_shape.Table
             texts = []
             
             for cell in cells:
@@ -220,10 +220,10 @@ class TableSectionWidget(ttk.Frame):
                 row_idx = int(parts[0])
                 col_idx = int(parts[1])
                 
-                if row_idx < 1 or row_idx > table.Rows.Count or col_idx < 1 or col_idx > table.Columns.Count:
+                if not table.has_cell(row_idx, col_idx):
                     return f"CELL {cell} NOT AVAILABLE"
                 
-                cell_text = table.Cell(row_idx, col_idx).Shape.TextFrame.TextRange.Text.strip()
+                cell_text = table.cell_text(row_idx, col_idx)
                 texts.append(cell_text if cell_text else "[empty]")
             
             return texts
@@ -233,31 +233,17 @@ class TableSectionWidget(ttk.Frame):
     def get_row_texts(self, table_id, rows):
         """Get text from specific rows in the table"""
         try:
-            table_id_int = int(table_id)
-            slide = self.powerpoint_app.ActiveWindow.View.Slide
-            
-            # Find the table shape
-            table_shape = None
-            for shape in slide.Shapes:
-                if shape.Id == table_id_int and shape.HasTable:
-                    table_shape = shape
-                    break
-            
-            if not table_shape:
+            table = self.slide_cache.get_table(int(table_id))
+            if not table:
                 return f"Table ID {table_id} not found"
             
-            table = table_shape.Table
             texts = []
             
             for row_idx in rows:
-                if row_idx < 1 or row_idx > table.Rows.Count:
+                if not table.has_row(row_idx):
                     return f"ROW {row_idx} NOT AVAILABLE"
                 
-                row_text = []
-                for col_idx in range(1, table.Columns.Count + 1):
-                    cell_text = table.Cell(row_idx, col_idx).Shape.TextFrame.TextRange.Text.strip()
-                    row_text.append(cell_text if cell_text else "[empty]")
-                
+                row_text = [cell_text if cell_text else "[empty]" for cell_text in table.row_texts(row_idx)]
                 texts.append(" ".join(row_text))
             
             return texts
@@ -267,30 +253,17 @@ class TableSectionWidget(ttk.Frame):
     def get_col_texts(self, table_id, cols):
         """Get text from specific cols in the table"""
         try:
-            table_id_int = int(table_id)
-            slide = self.powerpoint_app.ActiveWindow.View.Slide
-            
-            # Find the table shape
-            table_shape = None
-            for shape in slide.Shapes:
-                if shape.Id == table_id_int and shape.HasTable:
-                    table_shape = shape
-                    break
-            
-            if not table_shape:
+            table = self.slide_cache.get_table(int(table_id))
+            if not table:
                 return f"Table ID {table_id} not found"
             
-            table = table_shape.Table
             texts = []
             
             for col_idx in cols:
-                if col_idx < 1 or col_idx > table.Columns.Count:
+                if not table.has_col(col_idx):
                     return f"COL {col_idx} NOT AVAILABLE"
                 
-                col_text = []
-                for row_idx in range(1, table.Rows.Count + 1):
-                    cell_text = table.Cell(row_idx, col_idx).Shape.TextFrame.TextRange.Text.strip()
-                    col_text.append(cell_text if cell_text else "[empty]")
+                col_text = [cell_text if cell_text else "[empty]" for cell_text in table.col_texts(col_idx)]
                 
                 texts.append(" ".join(col_text))
             
@@ -371,15 +344,18 @@ class TableSectionWidget(ttk.Frame):
 
 
 class PowerPointShapeCaptureApp:
-    def __init__(self, root):
+    def __init__(self, root, com_tracer=None):
         self.root = root
         self.root.title("PowerPoint Shape Capture")
         self.root.geometry("800x700")
         
+        # With a tracer, every COM call made during a capture is timed by phase
+        self.com_tracer = com_tracer or NullTracer()
+        
         # Initialize PowerPoint connection
         try:
             pythoncom.CoInitialize()
-            self.ppt = win32com.client.Dispatch("PowerPoint.Application")
+            self.ppt = self.com_tracer.wrap(win32com.client.Dispatch("PowerPoint.Application"))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to connect to PowerPoint: {str(e)}")
             self.root.destroy()
@@ -388,6 +364,20 @@ class PowerPointShapeCaptureApp:
         # Track if cloud file has been converted to local
         self.cloud_converted_path = None
         
+        # Snapshot of the active slide shared by the table sections
+        self.slide_cache = SlideSnapshotCache(self.ppt)
+        
+        # Sequential capture ids (shared counter, safe across capture stations)
+        self.id_allocator = FileIdAllocator("resources")
+        
+        # Screenshots and JSON are written on a background thread
+        self.capture_writer = CaptureWriter(image_root="resources")
+        self.save_status_scheduled = False
+        
+        # Shape and table text of every capture, searchable from the test viewer
+        os.makedirs("resources", exist_ok=True)
+        self.text_index = load_text_index("resources")
+        
         # Main container
         main_frame = ttk.Frame(root, padding=10)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -449,6 +439,19 @@ class PowerPointShapeCaptureApp:
         self.selected_table_label = ttk.Label(table_frame, text="", foreground="blue")
         self.selected_table_label.pack(side=tk.LEFT, padx=5)
         
+        # Whole slide radio button with the all-slides option on same line
+        slide_frame = ttk.Frame(radio_frame)
+        slide_frame.pack(fill=tk.X, pady=2)
+        
+        self.slide_radio = ttk.Radiobutton(slide_frame, text="Whole slide (every shape)", 
+                                          variable=self.selection_mode, 
+                                          value="slide", 
+                                          command=self.on_mode_change)
+        self.slide_radio.pack(side=tk.LEFT, padx=5)
+        
+        self.all_slides = tk.BooleanVar(value=False)
+        ttk.Checkbutton(slide_frame, text="All slides", variable=self.all_slides).pack(side=tk.LEFT, padx=5)
+        
         # Container for mode-specific content
         self.mode_content_frame = ttk.Frame(main_frame)
         self.mode_content_frame.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -554,10 +557,11 @@ class PowerPointShapeCaptureApp:
         self.root.bind('<Return>', lambda e: self.on_ok())
         self.root.bind('<Escape>', lambda e: self.on_exit())
         
-        # Start polling for selection changes
-        self.last_selection_info = ""
+        # Track selection changes (PowerPoint events, adaptive polling as fallback)
         self.update_info_label()
-        self.poll_selection_changes()
+        self.selection_tracker = SelectionTracker(ComSelectionSource(unwrap(self.ppt)), self.root.after)
+        self.selection_tracker.subscribe(self.on_selection_change)
+        self.selection_tracker.start()
         
         # Initialize mode display
         self.on_mode_change()
@@ -751,7 +755,8 @@ class PowerPointShapeCaptureApp:
     
     def add_table_section(self):
         """Add a new table section"""
-        section = TableSectionWidget(self.scrollable_frame, self.remove_table_section, self.ppt)
+        section = TableSectionWidget(self.scrollable_frame, self.remove_table_section, self.ppt,
+                                     self.slide_cache)
         section.pack(fill=tk.X, pady=5)
         self.table_sections.append(section)
     
@@ -813,32 +818,14 @@ class PowerPointShapeCaptureApp:
             self.cloud_warning_frame.pack_forget()
             self.ok_button.config(state=tk.NORMAL)
     
-    def poll_selection_changes(self):
-        """Poll for selection changes every 500ms"""
-        try:
-            if self.ppt.Presentations.Count > 0:
-                presentation = self.ppt.ActivePresentation
-                slide = self.ppt.ActiveWindow.View.Slide
-                slide_number = slide.SlideIndex
-                
-                selection = self.ppt.ActiveWindow.Selection
-                shape_ids = []
-                if selection.Type == 2:  # ppSelectionShapes = 2
-                    shapes = selection.ShapeRange
-                    shape_ids = [shape.Id for shape in shapes]
-                
-                # Create a unique string representing current state
-                current_info = f"{presentation.FullName}|{slide_number}|{shape_ids}"
-                
-                # Update label if changed
-                if current_info != self.last_selection_info:
-                    self.last_selection_info = current_info
-                    self.update_info_label()
-        except:
-            pass  # Ignore errors during polling
-        
-        # Schedule next poll
-        self.root.after(500, self.poll_selection_changes)
+    def on_selection_change(self, state):
+        """Handle a change of presentation, slide or selected shapes"""
+        if state is not None:
+            presentation_path, slide_number, shape_ids = state
+            self.slide_cache.set_context(presentation_path, slide_number)
+        # Any change (including re-selecting to edit text) drops the slide snapshot
+        self.slide_cache.invalidate()
+        self.update_info_label()
     
     def clear_form(self):
         """Clear all form inputs"""
@@ -868,109 +855,15 @@ class PowerPointShapeCaptureApp:
     
     def bbox_to_relative(self, bbox, slide_width, slide_height):
         """Convert absolute bbox to relative coordinates (4 decimal points)"""
-        left, top, width, height = bbox
-        rel_left = round(left / slide_width, 4)
-        rel_top = round(top / slide_height, 4)
-        rel_width = round(width / slide_width, 4)
-        rel_height = round(height / slide_height, 4)
-        return [rel_left, rel_top, rel_width, rel_height]
-    
-    def is_color_white_or_transparent(self, color_obj):
-        """Check if a color is white (disregarding Type, just using RGB)"""
-        try:
-            # Try to get RGB value directly
-            rgb = color_obj.RGB
-            r = rgb & 0xFF
-            g = (rgb >> 8) & 0xFF
-            b = (rgb >> 16) & 0xFF
-            
-            # Check if white (all RGB values are close to 255)
-            if r >= 250 and g >= 250 and b >= 250:
-                return True
-            
-            return False
-        except:
-            # If RGB is not accessible, assume it might be transparent/white
-            return True
-    
-    def is_shape_invisible(self, shape):
-        """Check if shape fill and outline are both white or transparent"""
-        try:
-            # Check fill
-            fill_invisible = False
-            if shape.Fill.Visible == 0:  # Fill not visible
-                fill_invisible = True
-            elif shape.Fill.Transparency >= 0.99:  # Nearly fully transparent
-                fill_invisible = True
-            elif self.is_color_white_or_transparent(shape.Fill.ForeColor):
-                fill_invisible = True
-            
-            # Check outline
-            outline_invisible = False
-            if shape.Line.Visible == 0:  # Line not visible
-                outline_invisible = True
-            elif shape.Line.Transparency >= 0.99:  # Nearly fully transparent
-                outline_invisible = True
-            elif self.is_color_white_or_transparent(shape.Line.ForeColor):
-                outline_invisible = True
-            
-            return fill_invisible and outline_invisible
-        except:
-            return False
-    
-    def is_text_visible(self, shape):
-        """Check if shape has visible text (not white/transparent)"""
-        try:
-            if not shape.HasTextFrame:
-                return False
-            
-            text_range = shape.TextFrame.TextRange
-            text = text_range.Text.strip()
-            
-            if not text:
-                return False
-            
-            # Check text color
-            font_color = text_range.Font.Color
-            if self.is_color_white_or_transparent(font_color):
-                return False
-            
-            return True
-        except:
-            return False
+        return bbox_to_relative(bbox, slide_width, slide_height)
     
     def get_next_file_id(self):
-        """Get the next sequential file ID by checking existing files"""
+        """Reserve the next sequential file ID"""
         # Create directories if they don't exist
-        img_dir = os.path.join("resources", "img")
-        json_dir = os.path.join("resources", "json")
-        os.makedirs(img_dir, exist_ok=True)
-        os.makedirs(json_dir, exist_ok=True)
-        
-        # Check for existing files in both directories
-        max_id = 0
-        
-        # Check img directory
-        if os.path.exists(img_dir):
-            for filename in os.listdir(img_dir):
-                if filename.endswith('.png'):
-                    try:
-                        file_id = int(filename.replace('.png', ''))
-                        max_id = max(max_id, file_id)
-                    except ValueError:
-                        pass
-        
-        # Check json directory
-        if os.path.exists(json_dir):
-            for filename in os.listdir(json_dir):
-                if filename.endswith('.json'):
-                    try:
-                        file_id = int(filename.replace('.json', ''))
-                        max_id = max(max_id, file_id)
-                    except ValueError:
-                        pass
-        
-        return max_id + 1
+        os.makedirs(os.path.join("resources", "img"), exist_ok=True)
+        os.makedirs(os.path.join("resources", "json"), exist_ok=True)
+        
+        return self.id_allocator.allocate()
     
     def save_local_copy(self):
         """Save a local copy of a cloud presentation, close cloud file, and open local copy"""
@@ -1018,28 +911,30 @@ class PowerPointShapeCaptureApp:
     
     def on_ok(self):
         """Handle OK button click"""
+        trace_token = None
         try:
-            # Get next sequential file ID
-            file_id = self.get_next_file_id()
+            # COM calls from here until the screenshot is exported are traced as one capture
+            trace_token = self.com_tracer.begin()
             
-            # Get active presentation
-            if self.ppt.Presentations.Count == 0:
-                messagebox.showerror("Error", "No PowerPoint presentation is open")
-                return
+            with self.com_tracer.phase("context"):
+                # Get active presentation
+                if self.ppt.Presentations.Count == 0:
+                    messagebox.showerror("Error", "No PowerPoint presentation is open")
+                    return
             
-            presentation = self.ppt.ActivePresentation
-            slide = self.ppt.ActiveWindow.View.Slide
-            slide_number = slide.SlideIndex
+                presentation = self.ppt.ActivePresentation
+                slide = self.ppt.ActiveWindow.View.Slide
+                slide_number = slide.SlideIndex
             
-            # Get slide dimensions
-            slide_width = presentation.PageSetup.SlideWidth
-            slide_height = presentation.PageSetup.SlideHeight
+                # Get slide dimensions
+                slide_width = presentation.PageSetup.SlideWidth
+                slide_height = presentation.PageSetup.SlideHeight
             
-            # Get presentation path (use converted local path if available)
-            if self.cloud_converted_path:
-                presentation_path = self.cloud_converted_path
-            else:
-                presentation_path = presentation.FullName
+                # Get presentation path (use converted local path if available)
+                if self.cloud_converted_path:
+                    presentation_path = self.cloud_converted_path
+                else:
+                    presentation_path = presentation.FullName
             
             # Create resources directories
             img_dir = os.path.join("resources", "img")
@@ -1047,137 +942,42 @@ class PowerPointShapeCaptureApp:
             os.makedirs(img_dir, exist_ok=True)
             os.makedirs(json_dir, exist_ok=True)
             
-            # Take screenshot of current slide
-            img_path = os.path.join(img_dir, f"{file_id}.png")
-            self.capture_slide_screenshot(slide, img_path)
-            
             # Collect data based on selection mode
             json_data = []
+            table_texts = {}
             mode = self.selection_mode.get()
             
             if mode == "shapes":
                 # Get selected shapes
-                selection = self.ppt.ActiveWindow.Selection
-                if selection.Type == 2:  # ppSelectionShapes = 2
-                    shapes = selection.ShapeRange
-                    
-                    # Extract shape data
-                    shape_ids = []
-                    bboxes = []
-                    colors = []
-                    texts = []
+                with self.com_tracer.phase("selection"):
+                    selection = self.ppt.ActiveWindow.Selection
+                    selected = selection.Type == 2  # ppSelectionShapes = 2
+                    shapes = selection.ShapeRange if selected else None
+                if selected:
                     
-                    for shape in shapes:
-                        # Check if shape is a picture/image (always include pictures)
-                        is_picture = False
-                        try:
-                            # msoShapeTypePicture = 13, msoLinkedPicture = 11
-                            if shape.Type in [13, 11]:
-                                is_picture = True
-                        except:
-                            pass
-                        
-                        # For pictures, always use the shape bounding box
-                        if is_picture:
-                            abs_bbox = [shape.Left, shape.Top, shape.Width, shape.Height]
-                        else:
-                            # Check if shape is invisible (white/transparent fill and outline)
-                            shape_invisible = self.is_shape_invisible(shape)
-                            
-                            if shape_invisible:
-                                # Use text bounding box instead of shape bounding box
-                                # (even if text color is transparent, it might be visible against a non-transparent background)
-                                try:
-                                    # Remove trailing empty paragraphs before getting text bounds
-                                    text_frame = shape.TextFrame
-                                    text_range = text_frame.TextRange
-                                    original_text = text_range.Text
-                                    
-                                    # Find trailing whitespace (\n, \r, spaces, tabs)
-                                    trailing_whitespace = re.search(r'\s+$', original_text)
-                                    
-                                    if trailing_whitespace:
-                                        # Delete the trailing whitespace chunk
-                                        start_pos = trailing_whitespace.start()
-                                        deleted_text = original_text[start_pos:]
-                                        text_range.Text = original_text[:start_pos]
-                                        
-                                        # Get bounds without the trailing whitespace
-                                        text_left = text_range.BoundLeft
-                                        text_top = text_range.BoundTop
-                                        text_width = text_range.BoundWidth
-                                        text_height = text_range.BoundHeight
-                                        
-                                        # Restore the deleted trailing whitespace
-                                        text_range.Text = original_text
-                                        
-                                        abs_bbox = [text_left, text_top, text_width, text_height]
-                                    else:
-                                        # No trailing whitespace, use text bounds as-is
-                                        text_left = text_range.BoundLeft
-                                        text_top = text_range.BoundTop
-                                        text_width = text_range.BoundWidth
-                                        text_height = text_range.BoundHeight
-                                        abs_bbox = [text_left, text_top, text_width, text_height]
-                                except:
-                                    # Fallback to shape bounds if text bounds fail
-                                    abs_bbox = [shape.Left, shape.Top, shape.Width, shape.Height]
-                            else:
-                                # Use normal shape bounding box
-                                abs_bbox = [shape.Left, shape.Top, shape.Width, shape.Height]
-                        
-                        shape_ids.append(shape.Id)
-                        
-                        # Convert to relative coordinates
-                        rel_bbox = self.bbox_to_relative(abs_bbox, slide_width, slide_height)
-                        bboxes.append(rel_bbox)
-                        
-                        # Color (RGB)
-                        try:
-                            if shape.Fill.ForeColor.Type == 1:  # msoColorTypeRGB = 1
-                                rgb = shape.Fill.ForeColor.RGB
-                                # RGB is stored as BGR in COM, need to convert
-                                r = rgb & 0xFF
-                                g = (rgb >> 8) & 0xFF
-                                b = (rgb >> 16) & 0xFF
-                                colors.append([r, g, b])
-                            else:
-                                colors.append([0, 0, 0])
-                        except:
-                            colors.append([0, 0, 0])
-                        
-                        # Text
-                        try:
-                            if shape.HasTextFrame:
-                                text = shape.TextFrame.TextRange.Text.strip()
-                                texts.append(text)
-                            else:
-                                texts.append("")
-                        except:
-                            texts.append("")
+                    # One pass reads the fill, outline and text of every selected shape; pictures keep
+                    # their frame and invisible shapes (white/transparent fill and outline) use their text bounds
+                    with self.com_tracer.phase("classify"):
+                        classification = classify_com_shapes(shapes)
+                    with self.com_tracer.phase("text_bounds"):
+                        abs_bboxes = classification.bboxes()
+                    bboxes = [self.bbox_to_relative(abs_bbox, slide_width, slide_height) for abs_bbox in abs_bboxes]
                     
                     # Add shapes data to JSON
-                    shapes_data = {
-                        "name": self.name_entry.get().strip(),
-                        "path": presentation_path,
-                        "slide_number": slide_number,
-                        "slide_width": slide_width,
-                        "slide_height": slide_height,
-                        "selection_type": "shape",
-                        "shape_ids": shape_ids,
-                        "table_rows": "",
-                        "table_cols": "",
-                        "table_cells": "",
-                        "bbox": bboxes,
-                        "color_rgb": colors,
-                        "text": texts
-                    }
+                    shapes_data = shape_record(self.name_entry.get().strip(), presentation_path,
+                                               slide_number, slide_width, slide_height,
+                                               classification.shape_ids, bboxes, classification.colors(),
+                                               classification.texts)
                     json_data.append(shapes_data)
                 else:
                     messagebox.showwarning("Warning", "No shapes selected")
                     return
             
             elif mode == "table":
+                # Re-read the slide once so the geometry reflects any edits since the last selection change
+                self.slide_cache.set_context(presentation.FullName, slide_number)
+                self.slide_cache.invalidate()
+                
                 # Get table data from sections
                 for section in self.table_sections:
                     section_data = section.get_data()
@@ -1188,114 +988,41 @@ class PowerPointShapeCaptureApp:
                     values = section_data["values"]
                     section_type = section_data["type"]
                     
-                    # Find the table shape
-                    table_shape = None
-                    for shape in slide.Shapes:
-                        if shape.Id == table_id and shape.HasTable:
-                            table_shape = shape
-                            break
-                    
-                    if not table_shape:
+                    # One bulk read of the table; cells, rows and cols are derived from it
+                    with self.com_tracer.phase("table_read"):
+                        table = self.slide_cache.get_table(table_id)
+                    if table is None:
                         messagebox.showwarning("Warning", f"Table ID {table_id} not found")
                         continue
                     
-                    table = table_shape.Table
+                    # Cell texts for the text index
+                    table_texts[table_id] = table.text_rows()
                     
                     # Extract bboxes
-                    bboxes = []
-                    
                     if section_type == "cells":
-                        for cell_ref in values:
-                            parts = cell_ref.split('.')
-                            row_idx = int(parts[0])
-                            col_idx = int(parts[1])
-                            
-                            cell = table.Cell(row_idx, col_idx)
-                            abs_bbox = [cell.Shape.Left, cell.Shape.Top, 
-                                   cell.Shape.Width, cell.Shape.Height]
-                            rel_bbox = self.bbox_to_relative(abs_bbox, slide_width, slide_height)
-                            bboxes.append(rel_bbox)
-                        
-                        table_data = {
-                            "name": self.name_entry.get().strip(),
-                            "path": presentation_path,
-                            "slide_number": slide_number,
-                            "slide_width": slide_width,
-                            "slide_height": slide_height,
-                            "selection_type": "table_cells",
-                            "shape_ids": table_id,
-                            "table_rows": "",
-                            "table_cols": "",
-                            "table_cells": ",".join(values),
-                            "bbox": bboxes,
-                            "color_rgb": [],
-                            "text": []
-                        }
-                    
+                        abs_bboxes = [table.cell_bbox(*map(int, cell_ref.split('.'))) for cell_ref in values]
                     elif section_type == "rows":
-                        for row_idx in values:
-                            # Get bounding box of entire row
-                            first_cell = table.Cell(row_idx, 1)
-                            last_cell = table.Cell(row_idx, table.Columns.Count)
-                            
-                            left = first_cell.Shape.Left
-                            top = first_cell.Shape.Top
-                            width = (last_cell.Shape.Left + last_cell.Shape.Width) - left
-                            height = first_cell.Shape.Height
-                            
-                            abs_bbox = [left, top, width, height]
-                            rel_bbox = self.bbox_to_relative(abs_bbox, slide_width, slide_height)
-                            bboxes.append(rel_bbox)
-                        
-                        table_data = {
-                            "name": self.name_entry.get().strip(),
-                            "path": presentation_path,
-                            "slide_number": slide_number,
-                            "slide_width": slide_width,
-                            "slide_height": slide_height,
-                            "selection_type": "table_rows",
-                            "shape_ids": table_id,
-                            "table_rows": ",".join(map(str, values)),
-                            "table_cols": "",
-                            "table_cells": "",
-                            "bbox": bboxes,
-                            "color_rgb": [],
-                            "text": []
-                        }
+                        abs_bboxes = [table.row_bbox(row_idx) for row_idx in values]
+                    else:
+                        abs_bboxes = [table.col_bbox(col_idx) for col_idx in values]
+                    bboxes = [self.bbox_to_relative(abs_bbox, slide_width, slide_height) for abs_bbox in abs_bboxes]
                     
-                    elif section_type == "cols":
-                        for col_idx in values:
-                            # Get bounding box of entire column
-                            first_cell = table.Cell(1, col_idx)
-                            last_cell = table.Cell(table.Rows.Count, col_idx)
-                            
-                            left = first_cell.Shape.Left
-                            top = first_cell.Shape.Top
-                            width = first_cell.Shape.Width
-                            height = (last_cell.Shape.Top + last_cell.Shape.Height) - top
-                            
-                            abs_bbox = [left, top, width, height]
-                            rel_bbox = self.bbox_to_relative(abs_bbox, slide_width, slide_height)
-                            bboxes.append(rel_bbox)
-                        
-                        table_data = {
-                            "name": self.name_entry.get().strip(),
-                            "path": presentation_path,
-                            "slide_number": slide_number,
-                            "slide_width": slide_width,
-                            "slide_height": slide_height,
-                            "selection_type": "table_cols",
-                            "shape_ids": table_id,
-                            "table_rows": "",
-                            "table_cols": ",".join(map(str, values)),
-                            "table_cells": "",
-                            "bbox": bboxes,
-                            "color_rgb": [],
-                            "text": []
-                        }
+                    table_data = table_record(self.name_entry.get().strip(), presentation_path,
+                                              slide_number, slide_width, slide_height,
+                                              section_type, table_id, values, bboxes)
                     
                     json_data.append(table_data)
             
+            elif mode == "slide":
+                # Every shape of the slide(s), no selection needed: one capture per slide
+                with self.com_tracer.phase("context"):
+                    slides = list(presentation.Slides) if self.all_slides.get() else [slide]
+                trace_token = self.capture_whole_slides(slides, presentation_path, slide_width, slide_height,
+                                                        trace_token)
+                self.update_save_status()
+                self.clear_form()
+                return
+            
             elif mode == "rectangle":
                 # Handle drag rectangle mode
                 if not self.rectangle_bboxes:
@@ -1309,7 +1036,7 @@ class PowerPointShapeCaptureApp:
                     "slide_width": slide_width,
                     "slide_height": slide_height,
                     "selection_type": "rectangle",
-                    "bbox": self.rectangle_bboxes,
+                    "bbox": list(self.rectangle_bboxes),  # the form is cleared before the writer runs
                     "table_rows": "",
                     "table_cols": "",
                     "table_cells": "",
@@ -1317,17 +1044,57 @@ class PowerPointShapeCaptureApp:
                 }
                 json_data.append(rectangle_data)
             
-            # Save JSON
+            # Reserve the file ID only now that there is something to save
+            file_id = self.get_next_file_id()
+            img_path = os.path.join(img_dir, f"{file_id}.png")
             json_path = os.path.join(json_dir, f"{file_id}.json")
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, indent=2, ensure_ascii=False)
             
-            # Show success message and clear form
-            self.show_status_message("Data saved")
+            # Screenshot and JSON are written by the background writer, which indexes the texts once the JSON
+            # is saved; the exporter finishes the trace
+            exporter = self.make_slide_exporter(slide, presentation_path, slide_number, trace_token, f"capture-{file_id}")
+            trace_token = None
+            self.capture_writer.submit(img_path, json_path, json_data, exporter,
+                                       self.make_text_indexer(file_id, json_data, table_texts))
+            self.update_save_status()
             self.clear_form()
             
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
+        finally:
+            self.com_tracer.detach()
+            if trace_token is not None:
+                # Nothing was captured
+                self.com_tracer.discard(trace_token)
+    
+    def capture_whole_slides(self, slides, presentation_path, slide_width, slide_height, trace_token=None):
+        """Capture every shape (group members included) and table cell/row/column of each slide"""
+        name = self.name_entry.get().strip()
+        captured = 0
+        for index, capture_slide in enumerate(slides):
+            # One walk of the shape tree per slide, with on_ok's bbox and visibility rules
+            with self.com_tracer.phase("annotate"):
+                annotation = annotate_com_slide(capture_slide, name, presentation_path, slide_width, slide_height)
+            if not annotation.records:
+                continue
+            
+            file_id = self.get_next_file_id()
+            img_path = os.path.join("resources", "img", f"{file_id}.png")
+            json_path = os.path.join("resources", "json", f"{file_id}.json")
+            
+            # The trace covers every slide's reads and the last slide's export
+            last = index == len(slides) - 1
+            exporter = self.make_slide_exporter(capture_slide, presentation_path, annotation.slide_number,
+                                                trace_token if last else None, f"capture-{file_id}")
+            if last:
+                trace_token = None
+            self.capture_writer.submit(img_path, json_path, annotation.records, exporter,
+                                       self.make_text_indexer(file_id, annotation.records, annotation.table_texts))
+            captured += 1
+        
+        if not captured:
+            messagebox.showwarning("Warning", "No shapes on the slide")
+        # Returns the trace token when no exporter took it over
+        return trace_token
     
     def _reopen_local_file(self, cloud_presentation, local_path, slide_number):
         """Close cloud presentation and open local copy"""
@@ -1354,7 +1121,58 @@ class PowerPointShapeCaptureApp:
             messagebox.showerror("Error", f"Failed to reopen local file: {str(e)}")
             self.cloud_converted_path = None  # Reset flag on error
     
-    def capture_slide_screenshot(self, slide, output_path):
+    def make_slide_exporter(self, slide, presentation_path=None, slide_number=None, trace_token=None, trace_name=None):
+        """Return a callable that exports the slide as PNG from the writer thread"""
+        # COM objects belong to this thread's apartment; marshal the slide for the writer
+        stream = pythoncom.CoMarshalInterThreadInterfaceInStream(pythoncom.IID_IDispatch, slide._oleobj_)
+        
+        def export(output_path):
+            try:
+                with self.com_tracer.resume(trace_token), self.com_tracer.phase("export"):
+                    writer_slide = self.com_tracer.wrap(win32com.client.Dispatch(
+                        pythoncom.CoGetInterfaceAndReleaseStream(stream, pythoncom.IID_IDispatch)), "Slide")
+                    self.capture_slide_screenshot(writer_slide, output_path, presentation_path, slide_number)
+            finally:
+                summary = self.com_tracer.finish(trace_token, trace_name)
+                if summary:
+                    print(summary)
+        
+        return export
+    
+    def make_text_indexer(self, file_id, records, table_texts):
+        """Return a callable that indexes the capture's texts once the writer has saved its JSON"""
+        # A capture whose save fails never reaches the index, so search only returns saved captures
+        def index():
+            try:
+                self.text_index.add_capture(file_id, records, table_texts)
+            except Exception as e:
+                print(f"Text index error: {str(e)}")
+        
+        return index
+    
+    def update_save_status(self):
+        """Show the save backlog in the status label until the writer is idle"""
+        pending = self.capture_writer.pending_count()
+        errors = self.capture_writer.pop_errors()
+        
+        if errors:
+            self.status_label.config(text=f"Save failed: {errors[-1]}", foreground="red")
+        elif pending:
+            self.status_label.config(text=f"Saving... ({pending} pending)", foreground="green")
+        
+        if pending:
+            if not self.save_status_scheduled:
+                self.save_status_scheduled = True
+                self.root.after(200, self._poll_save_status)
+        elif not errors:
+            self.status_label.config(foreground="green")
+            self.show_status_message("Data saved")
+    
+    def _poll_save_status(self):
+        self.save_status_scheduled = False
+        self.update_save_status()
+    
+    def capture_slide_screenshot(self, slide, output_path, presentation_path=None, slide_number=None):
         """Capture screenshot of the current slide"""
         try:
             # Convert to absolute path for PowerPoint Export
@@ -1365,19 +1183,39 @@ class PowerPointShapeCaptureApp:
             
         except Exception as e:
             print(f"Screenshot error: {str(e)}")
-            # Fallback: just create a placeholder
+            # Fallback: render the saved .pptx ourselves if it is available locally
+            if presentation_path and slide_number and presentation_path.lower().endswith('.pptx') \
+                    and os.path.exists(presentation_path):
+                try:
+                    render_slide_to_file(presentation_path, slide_number, output_path)
+                    return
+                except Exception as render_error:
+                    print(f"Render error: {str(render_error)}")
+            # Last resort: just create a placeholder
             from PIL import Image
             img = Image.new('RGB', (800, 600), color='white')
             img.save(output_path)
     
     def on_exit(self):
         """Handle exit button click"""
+        pending = self.capture_writer.pending_count()
+        if pending:
+            self.status_label.config(text=f"Finishing {pending} pending save(s)...", foreground="green")
+            self.root.update_idletasks()
+        # Flush the writer so no capture is lost on exit
+        self.capture_writer.close()
+        self.selection_tracker.stop()
         self.root.destroy()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Capture PowerPoint shape, table and rectangle selections, or whole slides")
+    parser.add_argument("--trace-com", nargs="?", const=DEFAULT_TRACE_DIR, metavar="DIR",
+                        help=f"Time every COM call of each capture by phase (default dir: {DEFAULT_TRACE_DIR})")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = PowerPointShapeCaptureApp(root)
+    app = PowerPointShapeCaptureApp(root, ComTracer(args.trace_com) if args.trace_com else None)
     root.mainloop()
 
 
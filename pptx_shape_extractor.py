@@ -0,0 +1,954 @@
+import argparse
+import colorsys
+import json
+import ntpath
+import os
+import posixpath
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+
+from capture_records import bbox_to_relative
+
+
+# DrawingML stores geometry in English Metric Units
+EMU_PER_POINT = 12700
+
+NS = {
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+}
+
+R_EMBED = '{%s}embed' % NS['r']
+R_ID = '{%s}id' % NS['r']
+
+# Office shape type numbers (MsoShapeType), so records match what COM reports
+MSO_AUTO_SHAPE = 1
+MSO_CHART = 3
+MSO_GROUP = 6
+MSO_LINE = 9
+MSO_PICTURE = 13
+MSO_PLACEHOLDER = 14
+MSO_TEXT_BOX = 17
+MSO_TABLE = 19
+MSO_SMART_ART = 24
+
+# PowerPoint's TextRange.Text uses \r between paragraphs and \v for soft line breaks
+PARAGRAPH_SEPARATOR = "\r"
+LINE_BREAK = "\u000b"
+
+# Fill.ForeColor on a shape without a fill reports white over COM
+NO_FILL_FORE_COLOR = [255, 255, 255]
+
+DEFAULT_FONT_SIZE = 18.0
+DEFAULT_INSETS = [7.2, 3.6, 7.2, 3.6]  # left, top, right, bottom (points)
+
+# Master text style used for each placeholder type
+PLACEHOLDER_TEXT_STYLES = {
+    'title': 'titleStyle',
+    'ctrTitle': 'titleStyle',
+    'body': 'bodyStyle',
+    'subTitle': 'bodyStyle',
+    'obj': 'bodyStyle',
+}
+
+# Layout/master placeholders are matched on their base type
+PLACEHOLDER_BASE_TYPES = {
+    'ctrTitle': 'title',
+    'subTitle': 'body',
+    'obj': 'body',
+}
+
+PRESET_COLORS = {
+    'black': [0, 0, 0],
+    'white': [255, 255, 255],
+    'red': [255, 0, 0],
+    'green': [0, 128, 0],
+    'blue': [0, 0, 255],
+    'yellow': [255, 255, 0],
+    'gray': [128, 128, 128],
+}
+
+
+def emu_to_points(value):
+    """Convert EMU to points"""
+    return value / EMU_PER_POINT
+
+
+def _hex_to_rgb(value):
+    """Convert an RRGGBB hex string to [r, g, b]"""
+    return [int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)]
+
+
+def _clamp_channel(value):
+    """Clamp a color channel to 0-255"""
+    return max(0, min(255, int(round(value))))
+
+
+def _apply_color_modifiers(rgb, color_elem):
+    """Apply lumMod/lumOff/tint/shade/alpha children of a color element"""
+    transparency = 0.0
+    for modifier in color_elem:
+        tag = modifier.tag.split('}')[-1]
+        val = modifier.get('val')
+        if val is None:
+            continue
+        amount = int(val) / 100000.0
+        if tag in ('lumMod', 'lumOff'):
+            h, l, s = colorsys.rgb_to_hls(*[c / 255.0 for c in rgb])
+            if tag == 'lumMod':
+                l = l * amount
+            else:
+                l = l + amount
+            l = max(0.0, min(1.0, l))
+            rgb = [_clamp_channel(c * 255) for c in colorsys.hls_to_rgb(h, l, s)]
+        elif tag == 'tint':
+            rgb = [_clamp_channel(c * amount + 255 * (1 - amount)) for c in rgb]
+        elif tag == 'shade':
+            rgb = [_clamp_channel(c * amount) for c in rgb]
+        elif tag == 'alpha':
+            transparency = 1.0 - amount
+    return rgb, transparency
+
+
+def iter_shapes(shapes):
+    """Yield every shape record depth-first, including group children"""
+    for shape in shapes:
+        yield shape
+        if shape.get('children'):
+            yield from iter_shapes(shape['children'])
+
+
+def find_shape(shapes, shape_id):
+    """Find a shape record by id anywhere in the shape tree"""
+    for shape in iter_shapes(shapes):
+        if shape['id'] == shape_id:
+            return shape
+    return None
+
+
+def capture_color(shape):
+    """Color for the capture record, following on_ok's Fill.ForeColor rules"""
+    if shape['type'] in (MSO_TABLE, MSO_GROUP, MSO_CHART, MSO_SMART_ART):
+        return [0, 0, 0]
+    fill = shape['fill']
+    if fill['is_rgb']:
+        return list(fill['rgb'])
+    if not fill['visible'] and fill['rgb'] is None:
+        return list(NO_FILL_FORE_COLOR)
+    return [0, 0, 0]
+
+
+def table_cell_bbox(table, row_idx, col_idx):
+    """Bounding box of a table cell (1-based indices, points)"""
+    return list(table['cells'][row_idx - 1][col_idx - 1]['bbox'])
+
+
+def table_row_bbox(table, row_idx):
+    """Bounding box of a whole table row (1-based, points)"""
+    first = table['cells'][row_idx - 1][0]['bbox']
+    last = table['cells'][row_idx - 1][-1]['bbox']
+    # The grid row's height: the first cell may be merged down into the rows below
+    return [first[0], first[1], (last[0] + last[2]) - first[0], table['row_heights'][row_idx - 1]]
+
+
+def table_col_bbox(table, col_idx):
+    """Bounding box of a whole table column (1-based, points)"""
+    first = table['cells'][0][col_idx - 1]['bbox']
+    last = table['cells'][-1][col_idx - 1]['bbox']
+    # The grid column's width: the first cell may be merged across the columns to its right
+    return [first[0], first[1], table['col_widths'][col_idx - 1], (last[1] + last[3]) - first[1]]
+
+
+class PptxPresentation:
+    """Read-only view of a saved .pptx package"""
+
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        self._xml_cache = {}
+        self._rels_cache = {}
+
+        presentation = self.xml('ppt/presentation.xml')
+        slide_size = presentation.find('p:sldSz', NS)
+        self.slide_width = emu_to_points(int(slide_size.get('cx')))
+        self.slide_height = emu_to_points(int(slide_size.get('cy')))
+        self.default_text_style = presentation.find('p:defaultTextStyle', NS)
+
+        rels = self.rels('ppt/presentation.xml')
+        self.slide_parts = []
+        for slide_id in presentation.findall('p:sldIdLst/p:sldId', NS):
+            rel = rels.get(slide_id.get(R_ID))
+            if rel:
+                self.slide_parts.append(rel['target'])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Close the underlying zip file"""
+        self.zip.close()
+
+    @property
+    def slide_count(self):
+        return len(self.slide_parts)
+
+    def xml(self, part):
+        """Parse (and memoize) an XML part of the package"""
+        if part not in self._xml_cache:
+            self._xml_cache[part] = ET.fromstring(self.zip.read(part))
+        return self._xml_cache[part]
+
+    def read(self, part):
+        """Read raw bytes of a package part"""
+        return self.zip.read(part)
+
+    def rels(self, part):
+        """Relationships of a part as {rId: {'type', 'target'}}"""
+        if part in self._rels_cache:
+            return self._rels_cache[part]
+
+        base_dir, name = posixpath.split(part)
+        rels_path = posixpath.join(base_dir, '_rels', name + '.rels')
+        rels = {}
+        if rels_path in self.zip.namelist():
+            root = ET.fromstring(self.zip.read(rels_path))
+            for rel in root.findall('rel:Relationship', NS):
+                if rel.get('TargetMode') == 'External':
+                    continue
+                target = posixpath.normpath(posixpath.join(base_dir, rel.get('Target')))
+                rels[rel.get('Id')] = {
+                    'type': rel.get('Type').rsplit('/', 1)[-1],
+                    'target': target,
+                }
+        self._rels_cache[part] = rels
+        return rels
+
+    def related_part(self, part, rel_type):
+        """First related part of the given relationship type"""
+        for rel in self.rels(part).values():
+            if rel['type'] == rel_type:
+                return rel['target']
+        return None
+
+    def extract_slide(self, slide_number):
+        """Extract all shape records of a slide (1-based) in a single pass"""
+        if slide_number < 1 or slide_number > self.slide_count:
+            raise IndexError(f"Slide {slide_number} not in presentation ({self.slide_count} slides)")
+
+        context = _SlideContext(self, self.slide_parts[slide_number - 1])
+        return {
+            "slide_number": slide_number,
+            "slide_width": self.slide_width,
+            "slide_height": self.slide_height,
+            "background": context.background(),
+            "background_shapes": context.parse_background_shapes(),
+            "shapes": context.parse_shapes(),
+        }
+
+    def extract_all(self):
+        """Extract every slide of the presentation"""
+        return [self.extract_slide(n) for n in range(1, self.slide_count + 1)]
+
+
+class _SlideContext:
+    """Inherited state (theme, color map, placeholders) needed to parse one slide"""
+
+    def __init__(self, presentation, slide_part):
+        self.presentation = presentation
+        self.slide_part = slide_part
+        # Part whose relationships resolve picture references while parsing
+        self.rels_part = slide_part
+        self.layout_part = presentation.related_part(slide_part, 'slideLayout')
+        self.master_part = presentation.related_part(self.layout_part, 'slideMaster') if self.layout_part else None
+        theme_part = presentation.related_part(self.master_part, 'theme') if self.master_part else None
+
+        self.theme_colors = {}
+        if theme_part:
+            scheme = presentation.xml(theme_part).find('a:themeElements/a:clrScheme', NS)
+            if scheme is not None:
+                for entry in scheme:
+                    name = entry.tag.split('}')[-1]
+                    for color in entry:
+                        tag = color.tag.split('}')[-1]
+                        if tag == 'srgbClr':
+                            self.theme_colors[name] = _hex_to_rgb(color.get('val'))
+                        elif tag == 'sysClr':
+                            self.theme_colors[name] = _hex_to_rgb(color.get('lastClr', '000000'))
+
+        self.color_map = {'bg1': 'lt1', 'tx1': 'dk1', 'bg2': 'lt2', 'tx2': 'dk2'}
+        self.master_text_styles = None
+        if self.master_part:
+            master = presentation.xml(self.master_part)
+            color_map = master.find('p:clrMap', NS)
+            if color_map is not None:
+                self.color_map.update(color_map.attrib)
+            self.master_text_styles = master.find('p:txStyles', NS)
+
+        self.layout_placeholders = self._placeholder_map(self.layout_part)
+        self.master_placeholders = self._placeholder_map(self.master_part)
+
+    def _placeholder_map(self, part):
+        """Index the placeholders of a layout or master by idx and type"""
+        placeholders = {}
+        if not part:
+            return placeholders
+        for sp in self.presentation.xml(part).iter('{%s}sp' % NS['p']):
+            ph = sp.find('p:nvSpPr/p:nvPr/p:ph', NS)
+            if ph is None:
+                continue
+            ph_type = ph.get('type', 'obj')
+            placeholders.setdefault(('idx', ph.get('idx', '0')), sp)
+            placeholders.setdefault(('type', PLACEHOLDER_BASE_TYPES.get(ph_type, ph_type)), sp)
+        return placeholders
+
+    def _placeholder_chain(self, elem):
+        """Layout and master shapes a placeholder inherits from (nearest first)"""
+        ph = elem.find('p:nvSpPr/p:nvPr/p:ph', NS)
+        if ph is None:
+            return [], None
+        ph_type = ph.get('type', 'obj')
+        base_type = PLACEHOLDER_BASE_TYPES.get(ph_type, ph_type)
+        chain = []
+        layout_sp = None
+        if ph.get('idx') is not None:
+            layout_sp = self.layout_placeholders.get(('idx', ph.get('idx')))
+        if layout_sp is None:
+            layout_sp = self.layout_placeholders.get(('type', base_type))
+        if layout_sp is not None:
+            chain.append(layout_sp)
+        master_sp = self.master_placeholders.get(('type', base_type))
+        if master_sp is not None:
+            chain.append(master_sp)
+        return chain, ph_type
+
+    # -- colors ------------------------------------------------------------
+
+    def resolve_color(self, container):
+        """Resolve the color child of a fill/ref element to (rgb, is_rgb, transparency)"""
+        if container is None:
+            return None
+        for color in container:
+            tag = color.tag.split('}')[-1]
+            rgb = None
+            is_rgb = False
+            if tag == 'srgbClr':
+                rgb = _hex_to_rgb(color.get('val'))
+                is_rgb = True
+            elif tag == 'schemeClr':
+                name = color.get('val')
+                name = self.color_map.get(name, name)
+                rgb = self.theme_colors.get(name)
+            elif tag == 'sysClr':
+                rgb = _hex_to_rgb(color.get('lastClr', '000000'))
+            elif tag == 'prstClr':
+                rgb = PRESET_COLORS.get(color.get('val'))
+            elif tag == 'scrgbClr':
+                rgb = [_clamp_channel(int(color.get(c, '0')) / 100000.0 * 255) for c in ('r', 'g', 'b')]
+                is_rgb = True
+            else:
+                continue
+            if rgb is None:
+                return None
+            rgb, transparency = _apply_color_modifiers(list(rgb), color)
+            return rgb, is_rgb, transparency
+        return None
+
+    def _fill_from_properties(self, properties):
+        """Fill described directly by an spPr/tcPr element, or None if unspecified"""
+        if properties is None:
+            return None
+        for child in properties:
+            tag = child.tag.split('}')[-1]
+            if tag == 'noFill':
+                return {"visible": False, "rgb": None, "is_rgb": False, "transparency": 1.0}
+            if tag == 'solidFill':
+                color = self.resolve_color(child)
+                if color is None:
+                    return {"visible": True, "rgb": None, "is_rgb": False, "transparency": 0.0}
+                rgb, is_rgb, transparency = color
+                return {"visible": True, "rgb": rgb, "is_rgb": is_rgb, "transparency": transparency}
+            if tag == 'gradFill':
+                stop = child.find('a:gsLst/a:gs', NS)
+                color = self.resolve_color(stop)
+                rgb, is_rgb, transparency = color if color else (None, False, 0.0)
+                return {"visible": True, "rgb": rgb, "is_rgb": is_rgb, "transparency": transparency}
+            if tag == 'pattFill':
+                color = self.resolve_color(child.find('a:fgClr', NS))
+                rgb, is_rgb, transparency = color if color else (None, False, 0.0)
+                return {"visible": True, "rgb": rgb, "is_rgb": is_rgb, "transparency": transparency}
+            if tag == 'blipFill':
+                return {"visible": True, "rgb": None, "is_rgb": False, "transparency": 0.0}
+        return None
+
+    def _style_ref_fill(self, elem, ref_name):
+        """Fill implied by the shape's p:style fillRef/lnRef"""
+        ref = elem.find(f'p:style/a:{ref_name}', NS)
+        if ref is None or ref.get('idx', '0') == '0':
+            return None
+        color = self.resolve_color(ref)
+        rgb, is_rgb, transparency = color if color else (None, False, 0.0)
+        return {"visible": True, "rgb": rgb, "is_rgb": is_rgb, "transparency": transparency}
+
+    def shape_fill(self, elem, sp_pr, chain):
+        """Effective fill of a shape"""
+        fill = self._fill_from_properties(sp_pr)
+        for inherited in chain:
+            if fill is not None:
+                break
+            fill = self._fill_from_properties(inherited.find('p:spPr', NS))
+        if fill is None:
+            fill = self._style_ref_fill(elem, 'fillRef')
+        if fill is None:
+            fill = {"visible": False, "rgb": None, "is_rgb": False, "transparency": 1.0}
+        return fill
+
+    def shape_line(self, elem, sp_pr, chain):
+        """Effective outline of a shape"""
+        line = None
+        width = None
+        for properties in [sp_pr] + [s.find('p:spPr', NS) for s in chain]:
+            ln = properties.find('a:ln', NS) if properties is not None else None
+            if ln is None:
+                continue
+            if width is None and ln.get('w'):
+                width = emu_to_points(int(ln.get('w')))
+            line = self._fill_from_properties(ln)
+            if line is not None:
+                break
+        if line is None:
+            line = self._style_ref_fill(elem, 'lnRef')
+        if line is None:
+            line = {"visible": False, "rgb": None, "is_rgb": False, "transparency": 1.0}
+        line["width"] = width if width is not None else (0.75 if line["visible"] else 0.0)
+        return line
+
+    # -- text --------------------------------------------------------------
+
+    def _level_properties(self, ph_type, chain, tx_body, level):
+        """Paragraph properties for a text level as (pPr, from_master) pairs, nearest first"""
+        level_tag = f'a:lvl{level + 1}pPr'
+        candidates = []
+        if tx_body is not None:
+            candidates.append((tx_body.find(f'a:lstStyle/{level_tag}', NS), False))
+        for inherited in chain:
+            candidates.append((inherited.find(f'p:txBody/a:lstStyle/{level_tag}', NS), False))
+        if self.master_text_styles is not None:
+            style_name = PLACEHOLDER_TEXT_STYLES.get(ph_type, 'otherStyle') if ph_type else 'otherStyle'
+            candidates.append((self.master_text_styles.find(f'p:{style_name}/{level_tag}', NS), True))
+        if self.presentation.default_text_style is not None:
+            candidates.append((self.presentation.default_text_style.find(level_tag, NS), True))
+        return [(c, from_master) for c, from_master in candidates if c is not None]
+
+    def _run_style(self, r_pr, level_props, font_ref_color):
+        """Resolve size, color and weight of a run"""
+        size = None
+        rgb = None
+        bold = False
+        italic = False
+        for props, from_master in [(r_pr, False)] + [(lp.find('a:defRPr', NS), m) for lp, m in level_props]:
+            if props is None:
+                continue
+            if size is None and props.get('sz'):
+                size = int(props.get('sz')) / 100.0
+            if rgb is None and from_master and font_ref_color:
+                # The shape style's font color wins over master/default text styles
+                rgb = font_ref_color
+            if rgb is None:
+                color = self.resolve_color(props.find('a:solidFill', NS))
+                if color:
+                    rgb = color[0]
+            if props.get('b') is not None and not bold:
+                bold = props.get('b') in ('1', 'true')
+            if props.get('i') is not None and not italic:
+                italic = props.get('i') in ('1', 'true')
+        if rgb is None:
+            rgb = font_ref_color or self.theme_colors.get(self.color_map.get('tx1', 'dk1'), [0, 0, 0])
+        return {
+            "size": size if size is not None else DEFAULT_FONT_SIZE,
+            "rgb": rgb,
+            "bold": bold,
+            "italic": italic,
+        }
+
+    def parse_text_body(self, tx_body, chain=(), ph_type=None, font_ref_color=None, inherit_body=True):
+        """Parse paragraphs, runs and body properties of a txBody"""
+        body_props = []
+        if tx_body is not None:
+            body_props.append(tx_body.find('a:bodyPr', NS))
+        if inherit_body:
+            body_props.extend(s.find('p:txBody/a:bodyPr', NS) for s in chain)
+        body_props = [b for b in body_props if b is not None]
+
+        def body_attr(name, default):
+            for props in body_props:
+                if props.get(name) is not None:
+                    return props.get(name)
+            return default
+
+        insets = [
+            emu_to_points(int(body_attr('lIns', 91440))),
+            emu_to_points(int(body_attr('tIns', 45720))),
+            emu_to_points(int(body_attr('rIns', 91440))),
+            emu_to_points(int(body_attr('bIns', 45720))),
+        ]
+        font_scale = 1.0
+        for props in body_props:
+            autofit = props.find('a:normAutofit', NS)
+            if autofit is not None and autofit.get('fontScale'):
+                font_scale = int(autofit.get('fontScale')) / 100000.0
+                break
+
+        paragraphs = []
+        if tx_body is not None:
+            for p in tx_body.findall('a:p', NS):
+                p_pr = p.find('a:pPr', NS)
+                level = int(p_pr.get('lvl', '0')) if p_pr is not None else 0
+                level_props = self._level_properties(ph_type, chain, tx_body, level)
+                align = p_pr.get('algn') if p_pr is not None and p_pr.get('algn') else None
+                if align is None:
+                    for lp, _ in level_props:
+                        if lp.get('algn'):
+                            align = lp.get('algn')
+                            break
+
+                runs = []
+                for child in p:
+                    tag = child.tag.split('}')[-1]
+                    if tag in ('r', 'fld'):
+                        t = child.find('a:t', NS)
+                        style = self._run_style(child.find('a:rPr', NS), level_props, font_ref_color)
+                        style["size"] *= font_scale
+                        style["text"] = t.text or "" if t is not None else ""
+                        runs.append(style)
+                    elif tag == 'br':
+                        style = self._run_style(child.find('a:rPr', NS), level_props, font_ref_color)
+                        style["size"] *= font_scale
+                        style["text"] = LINE_BREAK
+                        runs.append(style)
+
+                end_style = self._run_style(p.find('a:endParaRPr', NS), level_props, font_ref_color)
+                paragraphs.append({
+                    "align": align or 'l',
+                    "level": level,
+                    "runs": runs,
+                    "end_size": end_style["size"] * font_scale,
+                })
+
+        text = PARAGRAPH_SEPARATOR.join("".join(run["text"] for run in p["runs"]) for p in paragraphs)
+        return {
+            "text": text,
+            "paragraphs": paragraphs,
+            "insets": insets,
+            "anchor": body_attr('anchor', 't'),
+            "wrap": body_attr('wrap', 'square') != 'none',
+        }
+
+    # -- shapes ------------------------------------------------------------
+
+    def parse_shapes(self):
+        """Parse the slide's shape tree"""
+        sp_tree = self.presentation.xml(self.slide_part).find('p:cSld/p:spTree', NS)
+        return self._parse_tree(sp_tree, (1.0, 0.0, 1.0, 0.0))
+
+    def background(self):
+        """Slide background color, inherited from layout/master when not set"""
+        for part in (self.slide_part, self.layout_part, self.master_part):
+            if not part:
+                continue
+            bg = self.presentation.xml(part).find('p:cSld/p:bg', NS)
+            if bg is None:
+                continue
+            fill = self._fill_from_properties(bg.find('p:bgPr', NS))
+            if fill is None:
+                ref = bg.find('p:bgRef', NS)
+                color = self.resolve_color(ref) if ref is not None else None
+                if color:
+                    return color[0]
+            elif fill["rgb"] is not None:
+                return fill["rgb"]
+            elif not fill["visible"]:
+                break
+        return [255, 255, 255]
+
+    def parse_background_shapes(self):
+        """Non-placeholder master and layout shapes drawn behind the slide's own shapes"""
+        parts = []
+        if self.presentation.xml(self.slide_part).get('showMasterSp', '1') not in ('0', 'false'):
+            layout_shows_master = self.layout_part and \
+                self.presentation.xml(self.layout_part).get('showMasterSp', '1') not in ('0', 'false')
+            if self.master_part and layout_shows_master:
+                parts.append(self.master_part)
+            if self.layout_part:
+                parts.append(self.layout_part)
+
+        shapes = []
+        for part in parts:
+            self.rels_part = part
+            sp_tree = self.presentation.xml(part).find('p:cSld/p:spTree', NS)
+            shapes.extend(s for s in self._parse_tree(sp_tree, (1.0, 0.0, 1.0, 0.0))
+                          if s["type"] != MSO_PLACEHOLDER)
+        self.rels_part = self.slide_part
+        return shapes
+
+    def _parse_tree(self, tree, transform):
+        """Parse the children of an spTree/grpSp under a coordinate transform"""
+        shapes = []
+        for elem in tree:
+            tag = elem.tag.split('}')[-1]
+            shape = None
+            if tag == 'sp':
+                shape = self._parse_sp(elem, transform)
+            elif tag == 'cxnSp':
+                shape = self._parse_sp(elem, transform, connector=True)
+            elif tag == 'pic':
+                shape = self._parse_pic(elem, transform)
+            elif tag == 'graphicFrame':
+                shape = self._parse_graphic_frame(elem, transform)
+            elif tag == 'grpSp':
+                shape = self._parse_group(elem, transform)
+            if shape is not None:
+                shapes.append(shape)
+        return shapes
+
+    @staticmethod
+    def _frame(xfrm, transform):
+        """Absolute bbox (points) of an xfrm under a group transform"""
+        if xfrm is None:
+            return None
+        off = xfrm.find('a:off', NS)
+        ext = xfrm.find('a:ext', NS)
+        if off is None or ext is None:
+            return None
+        ax, bx, ay, by = transform
+        left = ax * int(off.get('x')) + bx
+        top = ay * int(off.get('y')) + by
+        width = ax * int(ext.get('cx'))
+        height = ay * int(ext.get('cy'))
+        return [emu_to_points(left), emu_to_points(top), emu_to_points(width), emu_to_points(height)]
+
+    @staticmethod
+    def _non_visual(elem):
+        """Return the cNvPr element of any shape kind"""
+        for child in elem:
+            c_nv_pr = child.find('p:cNvPr', NS)
+            if c_nv_pr is not None:
+                return c_nv_pr
+        return None
+
+    def _base_record(self, elem, shape_type, bbox):
+        c_nv_pr = self._non_visual(elem)
+        return {
+            "id": int(c_nv_pr.get('id')) if c_nv_pr is not None else 0,
+            "name": c_nv_pr.get('name', '') if c_nv_pr is not None else '',
+            "type": shape_type,
+            "bbox": bbox if bbox is not None else [0.0, 0.0, 0.0, 0.0],
+            "rotation": 0.0,
+            "geometry": "rect",
+            "fill": {"visible": False, "rgb": None, "is_rgb": False, "transparency": 1.0},
+            "line": {"visible": False, "rgb": None, "is_rgb": False, "transparency": 1.0, "width": 0.0},
+            "has_text_frame": False,
+            "text": "",
+            "text_body": None,
+            "image_part": None,
+            "table": None,
+            "children": [],
+        }
+
+    def _parse_sp(self, elem, transform, connector=False):
+        sp_pr = elem.find('p:spPr', NS)
+        chain, ph_type = self._placeholder_chain(elem)
+
+        xfrm = sp_pr.find('a:xfrm', NS) if sp_pr is not None else None
+        bbox = self._frame(xfrm, transform)
+        for inherited in chain:
+            if bbox is not None:
+                break
+            bbox = self._frame(inherited.find('p:spPr/a:xfrm', NS), (1.0, 0.0, 1.0, 0.0))
+
+        if connector:
+            shape_type = MSO_LINE
+        elif ph_type is not None:
+            shape_type = MSO_PLACEHOLDER
+        elif elem.find('p:nvSpPr/p:cNvSpPr', NS) is not None and \
+                elem.find('p:nvSpPr/p:cNvSpPr', NS).get('txBox') in ('1', 'true'):
+            shape_type = MSO_TEXT_BOX
+        else:
+            shape_type = MSO_AUTO_SHAPE
+
+        record = self._base_record(elem, shape_type, bbox)
+        if xfrm is not None and xfrm.get('rot'):
+            record["rotation"] = int(xfrm.get('rot')) / 60000.0
+        geometry = sp_pr.find('a:prstGeom', NS) if sp_pr is not None else None
+        if geometry is not None:
+            record["geometry"] = geometry.get('prst')
+        elif sp_pr is not None and sp_pr.find('a:custGeom', NS) is not None:
+            record["geometry"] = "custom"
+
+        record["fill"] = self.shape_fill(elem, sp_pr, chain)
+        record["line"] = self.shape_line(elem, sp_pr, chain)
+
+        tx_body = elem.find('p:txBody', NS)
+        if tx_body is not None and not connector:
+            font_ref = self.resolve_color(elem.find('p:style/a:fontRef', NS))
+            record["has_text_frame"] = True
+            record["text_body"] = self.parse_text_body(
+                tx_body, chain, ph_type, font_ref[0] if font_ref else None)
+            record["text"] = record["text_body"]["text"]
+        elif not connector:
+            # Autoshapes always expose a (possibly empty) text frame over COM
+            record["has_text_frame"] = True
+            record["text_body"] = self.parse_text_body(None, chain, ph_type)
+        return record
+
+    def _parse_pic(self, elem, transform):
+        sp_pr = elem.find('p:spPr', NS)
+        bbox = self._frame(sp_pr.find('a:xfrm', NS) if sp_pr is not None else None, transform)
+        record = self._base_record(elem, MSO_PICTURE, bbox)
+        blip = elem.find('p:blipFill/a:blip', NS)
+        if blip is not None and blip.get(R_EMBED):
+            rel = self.presentation.rels(self.rels_part).get(blip.get(R_EMBED))
+            if rel:
+                record["image_part"] = rel['target']
+        record["line"] = self.shape_line(elem, sp_pr, [])
+        return record
+
+    def _parse_graphic_frame(self, elem, transform):
+        bbox = self._frame(elem.find('p:xfrm', NS), transform)
+        graphic_data = elem.find('a:graphic/a:graphicData', NS)
+        uri = graphic_data.get('uri', '') if graphic_data is not None else ''
+        table = graphic_data.find('a:tbl', NS) if graphic_data is not None else None
+
+        if table is not None:
+            record = self._base_record(elem, MSO_TABLE, bbox)
+            record["table"] = self._parse_table(table, record["bbox"])
+        elif uri.endswith('/chart'):
+            record = self._base_record(elem, MSO_CHART, bbox)
+        elif uri.endswith('/diagram'):
+            record = self._base_record(elem, MSO_SMART_ART, bbox)
+        else:
+            record = self._base_record(elem, MSO_AUTO_SHAPE, bbox)
+        return record
+
+    def _parse_table(self, table, frame_bbox):
+        """Parse table grid, cell geometry, text and fills"""
+        col_widths = [emu_to_points(int(c.get('w'))) for c in table.findall('a:tblGrid/a:gridCol', NS)]
+        rows = table.findall('a:tr', NS)
+        row_heights = [emu_to_points(int(r.get('h'))) for r in rows]
+
+        cells = []
+        top = frame_bbox[1]
+        for row_idx, row in enumerate(rows):
+            row_cells = []
+            left = frame_bbox[0]
+            for col_idx, tc in enumerate(row.findall('a:tc', NS)):
+                width = col_widths[col_idx] if col_idx < len(col_widths) else 0.0
+                row_span = int(tc.get('rowSpan', '1'))
+                grid_span = int(tc.get('gridSpan', '1'))
+                tc_pr = tc.find('a:tcPr', NS)
+                text_body = self.parse_text_body(tc.find('a:txBody', NS), inherit_body=False)
+                if tc_pr is not None:
+                    text_body["insets"] = [
+                        emu_to_points(int(tc_pr.get('marL', 91440))),
+                        emu_to_points(int(tc_pr.get('marT', 45720))),
+                        emu_to_points(int(tc_pr.get('marR', 91440))),
+                        emu_to_points(int(tc_pr.get('marB', 45720))),
+                    ]
+                    text_body["anchor"] = tc_pr.get('anchor', 't')
+                row_cells.append({
+                    # A merged cell's anchor covers every grid column and row it spans
+                    "bbox": [left, top, sum(col_widths[col_idx:col_idx + grid_span]),
+                             sum(row_heights[row_idx:row_idx + row_span])],
+                    "text": text_body["text"],
+                    "text_body": text_body,
+                    "fill": self._fill_from_properties(tc_pr),
+                    "span": [row_span, grid_span],
+                    "merged": tc.get('hMerge') in ('1', 'true') or tc.get('vMerge') in ('1', 'true'),
+                })
+                left += width
+            cells.append(row_cells)
+            top += row_heights[row_idx]
+
+        return {
+            "rows": len(rows),
+            "cols": len(col_widths),
+            "row_heights": row_heights,
+            "col_widths": col_widths,
+            "cells": cells,
+        }
+
+    def _parse_group(self, elem, transform):
+        xfrm = elem.find('p:grpSpPr/a:xfrm', NS)
+        bbox = self._frame(xfrm, transform)
+        record = self._base_record(elem, MSO_GROUP, bbox)
+
+        child_transform = transform
+        if xfrm is not None:
+            off = xfrm.find('a:off', NS)
+            ext = xfrm.find('a:ext', NS)
+            ch_off = xfrm.find('a:chOff', NS)
+            ch_ext = xfrm.find('a:chExt', NS)
+            if None not in (off, ext, ch_off, ch_ext):
+                ax, bx, ay, by = transform
+                ch_cx = int(ch_ext.get('cx')) or 1
+                ch_cy = int(ch_ext.get('cy')) or 1
+                sx = int(ext.get('cx')) / ch_cx
+                sy = int(ext.get('cy')) / ch_cy
+                child_transform = (
+                    ax * sx, ax * (int(off.get('x')) - int(ch_off.get('x')) * sx) + bx,
+                    ay * sy, ay * (int(off.get('y')) - int(ch_off.get('y')) * sy) + by,
+                )
+        record["children"] = self._parse_tree(elem, child_transform)
+        return record
+
+
+def locate_deck(recorded_path, deck_dirs):
+    """Find a deck on this machine from the (possibly Windows) path in a capture"""
+    if os.path.exists(recorded_path):
+        return recorded_path
+    name = ntpath.basename(recorded_path)
+    for deck_dir in deck_dirs:
+        candidate = os.path.join(deck_dir, name)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _bbox_matches(expected, actual, tolerance):
+    return len(expected) == 4 and all(abs(e - a) <= tolerance for e, a in zip(expected, actual))
+
+
+def check_capture(item, slide, tolerance):
+    """Compare one capture record against the extracted slide; return mismatch strings"""
+    mismatches = []
+    shapes = slide["shapes"]
+    slide_width = slide["slide_width"]
+    slide_height = slide["slide_height"]
+    selection_type = item.get("selection_type")
+
+    if selection_type == "shape":
+        # Imported here: the classifier is built on this module
+        from shape_classifier import classify_records
+        shape_ids = item.get("shape_ids", [])
+        found = [find_shape(shapes, shape_id) for shape_id in shape_ids]
+        # Same bbox rules as on_ok: invisible shapes are captured by their trimmed text bounds
+        boxes = iter(classify_records([shape for shape in found if shape is not None]).bboxes())
+        for idx, (shape_id, shape) in enumerate(zip(shape_ids, found)):
+            if shape is None:
+                mismatches.append(f"shape {shape_id}: not found")
+                continue
+            actual = bbox_to_relative(next(boxes), slide_width, slide_height)
+            expected = item["bbox"][idx] if idx < len(item.get("bbox", [])) else []
+            if not _bbox_matches(expected, actual, tolerance):
+                mismatches.append(f"shape {shape_id}: bbox {expected} != {actual}")
+            colors = item.get("color_rgb", [])
+            if idx < len(colors) and colors[idx] != capture_color(shape):
+                mismatches.append(f"shape {shape_id}: color {colors[idx]} != {capture_color(shape)}")
+            texts = item.get("text", [])
+            if idx < len(texts) and texts[idx] != shape["text"].strip():
+                mismatches.append(f"shape {shape_id}: text {texts[idx]!r} != {shape['text'].strip()!r}")
+
+    elif selection_type in ("table_cells", "table_rows", "table_cols"):
+        shape_ids = item.get("shape_ids")
+        table_id = shape_ids[0] if isinstance(shape_ids, list) else shape_ids
+        shape = find_shape(shapes, table_id)
+        if shape is None or shape["table"] is None:
+            return [f"table {table_id}: not found"]
+        table = shape["table"]
+
+        if selection_type == "table_cells":
+            refs = [c for c in item.get("table_cells", "").split(",") if c]
+            actual_boxes = [table_cell_bbox(table, *map(int, ref.split('.'))) for ref in refs]
+        elif selection_type == "table_rows":
+            refs = [r for r in item.get("table_rows", "").split(",") if r]
+            actual_boxes = [table_row_bbox(table, int(ref)) for ref in refs]
+        else:
+            refs = [c for c in item.get("table_cols", "").split(",") if c]
+            actual_boxes = [table_col_bbox(table, int(ref)) for ref in refs]
+
+        for ref, expected, box in zip(refs, item.get("bbox", []), actual_boxes):
+            actual = bbox_to_relative(box, slide_width, slide_height)
+            if not _bbox_matches(expected, actual, tolerance):
+                mismatches.append(f"table {table_id} {ref}: bbox {expected} != {actual}")
+
+    return mismatches
+
+
+def check_dataset(json_dir, deck_dirs, tolerance):
+    """Check every capture in json_dir against its deck; print a report"""
+    # Imported here: the cache is built on this module
+    from presentation_cache import PresentationCache
+    decks = PresentationCache()
+    totals = {"captures": 0, "checked": 0, "skipped": 0, "mismatched": 0}
+
+    for filename in sorted(os.listdir(json_dir), key=lambda f: (len(f), f)):
+        if not filename.endswith('.json'):
+            continue
+        totals["captures"] += 1
+        with open(os.path.join(json_dir, filename), 'r', encoding='utf-8') as f:
+            items = json.load(f)
+
+        for item in items:
+            if item.get("selection_type") == "rectangle":
+                continue
+            deck_path = locate_deck(item.get("path", ""), deck_dirs)
+            if deck_path is None:
+                totals["skipped"] += 1
+                print(f"{filename}: deck not found ({ntpath.basename(item.get('path', ''))})")
+                continue
+
+            try:
+                slide = decks.get(deck_path).slide(item["slide_number"])
+                mismatches = check_capture(item, slide, tolerance)
+            except Exception as e:
+                mismatches = [f"error: {str(e)}"]
+
+            totals["checked"] += 1
+            if mismatches:
+                totals["mismatched"] += 1
+                for mismatch in mismatches:
+                    print(f"{filename}: {mismatch}")
+
+    print(f"\n{totals['captures']} captures, {totals['checked']} records checked, "
+          f"{totals['mismatched']} with mismatches, {totals['skipped']} skipped (deck not found)")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract shapes from .pptx files without PowerPoint")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    dump_parser = subparsers.add_parser("dump", help="Print the shape records of a deck as JSON")
+    dump_parser.add_argument("pptx")
+    dump_parser.add_argument("--slide", type=int, help="Only this slide (1-based)")
+
+    check_parser = subparsers.add_parser("check", help="Compare extracted shapes against captured JSON")
+    check_parser.add_argument("--json-dir", default=os.path.join("resources", "json"))
+    check_parser.add_argument("--deck-dir", action="append", default=[],
+                              help="Directory to look for decks in (repeatable)")
+    check_parser.add_argument("--tolerance", type=float, default=0.002,
+                              help="Allowed difference in relative bbox coordinates")
+
+    args = parser.parse_args()
+
+    if args.command == "dump":
+        with PptxPresentation(args.pptx) as presentation:
+            if args.slide:
+                data = presentation.extract_slide(args.slide)
+            else:
+                data = presentation.extract_all()
+        json.dump(data, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    elif args.command == "check":
+        deck_dirs = args.deck_dir or [os.path.join("resources", "cloud_presentations")]
+        totals = check_dataset(args.json_dir, deck_dirs, args.tolerance)
+        sys.exit(1 if totals["mismatched"] else 0)
+
+
+if __name__ == "__main__":
+    main()
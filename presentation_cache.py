@@ -0,0 +1,267 @@
+import argparse
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_capture import find_decks
+from pptx_shape_extractor import PptxPresentation, find_shape
+from table_snapshot import TableSnapshot
+
+
+DEFAULT_CACHE_DIR = os.path.join("resources", "deck_cache")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 2 * 1024 * 1024 * 1024
+# Bump when the extractor's output changes, so old pickles are not served
+CACHE_FORMAT = 2
+
+
+def deck_key(path):
+    """Identity of a deck file as it is on disk now: normalised path, modification time and size"""
+    stat = os.stat(path)
+    return os.path.normcase(os.path.abspath(path)), stat.st_mtime_ns, stat.st_size
+
+
+def _key_digest(key):
+    return hashlib.sha1(repr((CACHE_FORMAT,) + tuple(key)).encode('utf-8')).hexdigest()
+
+
+class ParsedDeck:
+    """Every slide of a .pptx parsed once: slide size, shape trees and tables"""
+
+    def __init__(self, key, slide_width, slide_height, slides):
+        self.key = key
+        self.slide_width = slide_width
+        self.slide_height = slide_height
+        self.slides = slides
+        self.nbytes = 0
+        self._tables = {}
+
+    @classmethod
+    def parse(cls, path):
+        key = deck_key(path)
+        with PptxPresentation(path) as presentation:
+            return cls(key, presentation.slide_width, presentation.slide_height, presentation.extract_all())
+
+    @property
+    def path(self):
+        return self.key[0]
+
+    @property
+    def slide_count(self):
+        return len(self.slides)
+
+    def slide(self, slide_number):
+        """Extractor output for a slide (1-based)"""
+        if slide_number < 1 or slide_number > len(self.slides):
+            raise IndexError(f"Slide {slide_number} not in presentation ({len(self.slides)} slides)")
+        return self.slides[slide_number - 1]
+
+    def shapes(self, slide_number):
+        return self.slide(slide_number)["shapes"]
+
+    def table(self, slide_number, table_id):
+        """TableSnapshot of a table on a slide (built once), or None"""
+        key = (slide_number, table_id)
+        if key not in self._tables:
+            shape = find_shape(self.shapes(slide_number), table_id)
+            self._tables[key] = TableSnapshot.from_pptx(shape) if shape is not None and shape["table"] else None
+        return self._tables[key]
+
+    def to_state(self):
+        # Plain data only, so pickles load whichever module name this file was run under;
+        # table snapshots are cheap to rebuild and not worth the bytes
+        return {"key": self.key, "slide_width": self.slide_width, "slide_height": self.slide_height,
+                "slides": self.slides}
+
+
+class PresentationCache:
+    """Parsed decks in a size-bounded memory LRU, backed by a pickle per deck version on disk"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        # cache_dir=None keeps the cache in memory only
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{_key_digest(key)}.pickle")
+
+    def _load_disk(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            state = pickle.loads(data)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(state, dict) or tuple(state.get("key", ())) != key:
+            return None
+        deck = ParsedDeck(key, state["slide_width"], state["slide_height"], state["slides"])
+        deck.nbytes = len(data)
+        # Touch it so disk pruning removes the least recently used pickles first
+        os.utime(path)
+        return deck
+
+    def _save_disk(self, deck):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data = pickle.dumps(deck.to_state(), protocol=pickle.HIGHEST_PROTOCOL)
+        deck.nbytes = len(data)
+        path = self._disk_path(deck.key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, path):
+        """Parsed deck for the file as it is now (a newer save is parsed again)"""
+        key = deck_key(path)
+        with self.lock:
+            deck = self.entries.get(key)
+            if deck is not None:
+                self.stats["hits"] += 1
+                self.entries.move_to_end(key)
+                return deck
+
+        deck = self._load_disk(key)
+        if deck is not None:
+            with self.lock:
+                self.stats["disk_hits"] += 1
+        else:
+            deck = ParsedDeck.parse(path)
+            self._save_disk(deck)
+            self.prune_disk()
+            with self.lock:
+                self.stats["misses"] += 1
+        if not deck.nbytes:
+            deck.nbytes = len(pickle.dumps(deck.to_state(), protocol=pickle.HIGHEST_PROTOCOL))
+
+        with self.lock:
+            # Older versions of the same file will not be asked for again
+            for stale in [k for k in self.entries if k[0] == key[0] and k != key]:
+                del self.entries[stale]
+            self.entries[key] = deck
+            self._evict()
+        return deck
+
+    def slide_size(self, path):
+        deck = self.get(path)
+        return deck.slide_width, deck.slide_height
+
+    def nbytes(self):
+        return sum(deck.nbytes for deck in self.entries.values())
+
+    def _evict(self):
+        # The most recently used deck stays even if it alone exceeds the budget
+        while len(self.entries) > 1 and self.nbytes() > self.max_bytes:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def prune_disk(self):
+        """Delete the least recently used pickles until the disk cache fits max_disk_bytes"""
+        if self.cache_dir is None or not os.path.exists(self.cache_dir):
+            return 0
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(".pickle"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+            stats["bytes"] = self.nbytes()
+        return stats
+
+
+def _warm_deck(cache_dir, path):
+    """Worker: parse a deck into the disk cache unless an up-to-date pickle is there"""
+    cache = PresentationCache(cache_dir)
+    if cache._load_disk(deck_key(path)) is not None:
+        return path, False
+    cache._save_disk(ParsedDeck.parse(path))
+    return path, True
+
+
+def warm(deck_dir, cache_dir=DEFAULT_CACHE_DIR, workers=None):
+    """Parse every deck under deck_dir into the disk cache in parallel; returns (parsed, fresh, failed)"""
+    parsed = fresh = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(deck, pool.submit(_warm_deck, cache_dir, deck)) for deck in find_decks(deck_dir)]
+        for deck, future in futures:
+            try:
+                _, was_parsed = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{os.path.basename(deck)}: {str(e)}")
+                continue
+            parsed += was_parsed
+            fresh += not was_parsed
+    PresentationCache(cache_dir).prune_disk()
+    return parsed, fresh, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parsed-presentation cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    warm_parser = subparsers.add_parser("warm", help="Parse a folder of decks into the disk cache")
+    warm_parser.add_argument("deck_dir")
+    warm_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+
+    bench_parser = subparsers.add_parser("bench", help="Time parsing vs. disk and memory hits for one deck")
+    bench_parser.add_argument("pptx")
+    bench_parser.add_argument("--repeat", type=int, default=30, help="Lookups, like captures on the same deck")
+    args = parser.parse_args()
+
+    if args.command == "warm":
+        start = time.perf_counter()
+        parsed, fresh, failed = warm(args.deck_dir, args.cache_dir, args.workers)
+        print(f"{parsed} decks parsed, {fresh} already cached, {failed} failed in "
+              f"{time.perf_counter() - start:.2f}s -> {args.cache_dir}")
+        return
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        ParsedDeck.parse(args.pptx)
+    parse_ms = (time.perf_counter() - start) * 1000.0 / args.repeat
+
+    cache = PresentationCache(args.cache_dir)
+    cache.get(args.pptx)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        PresentationCache(args.cache_dir).get(args.pptx)
+    disk_ms = (time.perf_counter() - start) * 1000.0 / args.repeat
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        cache.get(args.pptx)
+    memory_ms = (time.perf_counter() - start) * 1000.0 / args.repeat
+    print(f"{os.path.basename(args.pptx)}: parse {parse_ms:.2f} ms, disk cache {disk_ms:.2f} ms, "
+          f"memory cache {memory_ms:.3f} ms per lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from capture_archive import SELECTION_TYPES, _StringTable
+from capture_records import shape_record, table_record
+from file_id_allocator import list_capture_ids
+
+
+SCHEMA_VERSION = 2
+DEFAULT_DATASET_PATH = os.path.join("resources", "captures_v2.npz")
+# Relative bboxes stay within about [0, 1]; a record reaching past this was stored in points
+ABSOLUTE_THRESHOLD = 1.5
+CHUNK_SIZE = 512
+
+# Record provenance flags
+FLAG_ABSOLUTE_BBOX = 1  # bboxes were converted from points
+FLAG_NO_SLIDE_SIZE = 2  # captured before slide_width/slide_height were recorded
+FLAG_SCALAR_SHAPE_ID = 4  # table record storing shape_ids as an int
+FLAG_PADDED = 8  # shape_ids/color_rgb/text shorter or longer than bbox
+
+# One row per record and one row per bbox; every record type fills the same columns
+RECORD_DTYPE = np.dtype([
+    ("capture_id", "<i4"), ("record_index", "<i2"), ("selection_type", "u1"), ("flags", "u1"),
+    ("slide_number", "<i4"), ("slide_size", "<f8", (2,)), ("name", "<i4"), ("path", "<i4"),
+    ("box_start", "<i4"), ("box_stop", "<i4"),
+])
+BOX_DTYPE = np.dtype([
+    ("record", "<i4"),
+    ("bbox", "<f8", (4,)),  # relative, 4 decimals as bbox_to_relative writes them
+    ("bbox_pt", "<f8", (4,)),  # points (0 when the slide size is unknown)
+    ("shape_id", "<i4"),  # shape, or the table for table selections; -1 for rectangles
+    ("row", "<i2"), ("col", "<i2"),  # 1-based table cell/row/column, 0 when not a table selection
+    ("color", "<i2", (3,)),  # -1 when the record has no color
+    ("text", "<i4"),  # string index, -1 when the record has no text
+])
+
+
+def _selection_cells(selection_type, item, count):
+    """(row, col) per bbox of a table selection"""
+    values = item.get(selection_type, "")
+    parts = values if isinstance(values, list) else [part for part in str(values).split(",") if part.strip()]
+    cells = []
+    for part in parts:
+        if selection_type == "table_cells":
+            row, col = (int(v) for v in str(part).split("."))
+        elif selection_type == "table_rows":
+            row, col = int(part), 0
+        else:
+            row, col = 0, int(part)
+        cells.append((row, col))
+    return (cells + [(0, 0)] * count)[:count]
+
+
+def _fit(values, count, fill):
+    # Values per bbox, padded or cut to the number of bboxes
+    return (list(values) + [fill] * count)[:count]
+
+
+def _record_fields(item):
+    """The v1 -> v2 rules for one record, shared by normalize_record and the migration workers: selection type,
+    provenance flags, and shape id, cell, color and text per bbox (the bboxes themselves are left as stored)"""
+    selection_type = item.get("selection_type", "shape")
+    bboxes = item.get("bbox", [])
+    count = len(bboxes)
+    ids = item.get("shape_ids", [])
+    flags = 0 if "slide_width" in item else FLAG_NO_SLIDE_SIZE
+    if bboxes and item.get("slide_width") and item.get("slide_height") and \
+            max(max(x + w, y + h) for x, y, w, h in bboxes) > ABSOLUTE_THRESHOLD:
+        flags |= FLAG_ABSOLUTE_BBOX
+    if selection_type == "shape":
+        item_colors = item.get("color_rgb", [])
+        item_texts = item.get("text", [])
+        if not (len(ids) == len(item_colors) == len(item_texts) == count):
+            flags |= FLAG_PADDED
+        shape_ids = _fit(ids, count, -1)
+        colors = [color if color else [-1, -1, -1] for color in _fit(item_colors, count, None)]
+        texts = _fit(item_texts, count, None)
+        cells = [(0, 0)] * count
+    else:
+        if selection_type == "rectangle":
+            table_id = -1
+        elif isinstance(ids, list):
+            table_id = ids[0] if ids else -1
+        else:
+            table_id = ids
+            flags |= FLAG_SCALAR_SHAPE_ID
+        shape_ids = [table_id] * count
+        colors = [[-1, -1, -1]] * count
+        texts = [None] * count
+        cells = _selection_cells(selection_type, item, count) if selection_type.startswith("table_") \
+            else [(0, 0)] * count
+    return selection_type, flags, shape_ids, cells, colors, texts
+
+
+def normalize_record(item):
+    """One v1 record (any era) as a v2 dict: same keys for every selection type, lists per bbox"""
+    selection_type, flags, shape_ids, cells, colors, texts = _record_fields(item)
+    slide_width = item.get("slide_width", 0.0)
+    slide_height = item.get("slide_height", 0.0)
+    bboxes = [list(map(float, bbox)) for bbox in item.get("bbox", [])]
+    if flags & FLAG_ABSOLUTE_BBOX:
+        bboxes = [[round(x / slide_width, 4), round(y / slide_height, 4),
+                   round(w / slide_width, 4), round(h / slide_height, 4)] for x, y, w, h in bboxes]
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "name": item.get("name", ""),
+        "path": item.get("path", ""),
+        "slide_number": item.get("slide_number", 0),
+        "slide_width": slide_width,
+        "slide_height": slide_height,
+        "selection_type": selection_type,
+        "bbox": bboxes,
+        "shape_ids": shape_ids,
+        "cells": [list(cell) for cell in cells],
+        "color_rgb": colors,
+        "text": texts,
+    }
+
+
+def _migrate_chunk(json_dir, capture_ids):
+    """Worker: typed record and box arrays for some captures, with their own string table"""
+    strings = _StringTable()
+    rec_cols = {name: [] for name in ("capture_id", "record_index", "selection_type", "flags", "slide_number",
+                                      "slide_size", "name", "path", "box_count")}
+    boxes = []
+    shape_ids = []
+    cells = []
+    colors = []
+    texts = []
+
+    # Only what cannot be vectorized happens per record: parsing JSON and the per-record rules
+    for capture_id in capture_ids:
+        with open(os.path.join(json_dir, f"{capture_id}.json"), 'r', encoding='utf-8') as f:
+            items = json.load(f)
+        for record_index, item in enumerate(items):
+            selection_type, flags, item_shape_ids, item_cells, item_colors, item_texts = _record_fields(item)
+            bbox = item.get("bbox", [])
+            count = len(bbox)
+            shape_ids.extend(item_shape_ids)
+            cells.extend(item_cells)
+            colors.extend(item_colors)
+            texts.extend(-1 if text is None else strings.add(text) for text in item_texts)
+            boxes.extend(bbox)
+
+            rec_cols["capture_id"].append(capture_id)
+            rec_cols["record_index"].append(record_index)
+            rec_cols["selection_type"].append(SELECTION_TYPES.index(selection_type))
+            rec_cols["flags"].append(flags)
+            rec_cols["slide_number"].append(item.get("slide_number", 0))
+            rec_cols["slide_size"].append((item.get("slide_width", 0.0), item.get("slide_height", 0.0)))
+            rec_cols["name"].append(strings.add(item.get("name", "")))
+            rec_cols["path"].append(strings.add(item.get("path", "")))
+            rec_cols["box_count"].append(count)
+
+    record_count = len(rec_cols["capture_id"])
+    records = np.zeros(record_count, dtype=RECORD_DTYPE)
+    for name in ("capture_id", "record_index", "selection_type", "flags", "slide_number", "name", "path"):
+        records[name] = rec_cols[name]
+    records["slide_size"] = np.array(rec_cols["slide_size"], dtype=np.float64).reshape(-1, 2)
+    counts = np.array(rec_cols["box_count"], dtype=np.int64)
+    stops = np.cumsum(counts)
+    records["box_stop"] = stops
+    records["box_start"] = stops - counts
+
+    box_array = np.zeros(len(boxes), dtype=BOX_DTYPE)
+    box_records = np.repeat(np.arange(record_count), counts)
+    box_array["record"] = box_records
+    stored = np.array(boxes, dtype=np.float64).reshape(-1, 4)
+
+    # Whole-chunk array ops from here: convert the records stored in points to relative bboxes
+    if len(stored):
+        absolute = (records["flags"] & FLAG_ABSOLUTE_BBOX) != 0
+        box_sizes = np.tile(records["slide_size"][box_records], 2)  # (w, h, w, h) per box
+        converted = absolute[box_records]
+        rel = stored.copy()
+        rel[converted] = np.round(stored[converted] / box_sizes[converted], 4)
+        box_array["bbox"] = rel
+        # Records stored in points keep their exact values rather than the rounded relative ones
+        box_array["bbox_pt"] = np.where(converted[:, None], stored, rel * box_sizes)
+    box_array["shape_id"] = shape_ids
+    cell_array = np.array(cells, dtype=np.int16).reshape(-1, 2)
+    box_array["row"] = cell_array[:, 0]
+    box_array["col"] = cell_array[:, 1]
+    box_array["color"] = np.array(colors, dtype=np.int16).reshape(-1, 3)
+    box_array["text"] = texts
+    return records, box_array, strings.strings
+
+
+def migrate_dataset(root="resources", output=DEFAULT_DATASET_PATH, workers=None, chunk_size=CHUNK_SIZE):
+    """Normalise every capture into the typed v2 dataset across a process pool; returns counts"""
+    json_dir = os.path.join(root, "json")
+    capture_ids = list_capture_ids(json_dir)
+    chunks = [capture_ids[i:i + chunk_size] for i in range(0, len(capture_ids), chunk_size)]
+    strings = _StringTable()
+    all_records = []
+    all_boxes = []
+    record_total = 0
+    box_total = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for records, boxes, local_strings in pool.map(_migrate_chunk, [json_dir] * len(chunks), chunks):
+            # Re-point the chunk's string indices and offsets into the merged tables
+            mapping = np.array([strings.add(s) for s in local_strings], dtype=np.int32)
+            if len(mapping):
+                records["name"] = mapping[records["name"]]
+                records["path"] = mapping[records["path"]]
+                has_text = boxes["text"] >= 0
+                boxes["text"][has_text] = mapping[boxes["text"][has_text]]
+            records["box_start"] += box_total
+            records["box_stop"] += box_total
+            boxes["record"] += record_total
+            record_total += len(records)
+            box_total += len(boxes)
+            all_records.append(records)
+            all_boxes.append(boxes)
+
+    records = np.concatenate(all_records) if all_records else np.zeros(0, dtype=RECORD_DTYPE)
+    boxes = np.concatenate(all_boxes) if all_boxes else np.zeros(0, dtype=BOX_DTYPE)
+    string_offsets, string_data = strings.columns()
+    tmp_path = output + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, schema_version=np.array(SCHEMA_VERSION), selection_types=np.array(SELECTION_TYPES),
+                 records=records, boxes=boxes, string_offsets=string_offsets, string_data=string_data)
+    os.replace(tmp_path, output)
+    return {"captures": len(capture_ids), "records": len(records), "boxes": len(boxes),
+            "absolute": int(np.count_nonzero(records["flags"] & FLAG_ABSOLUTE_BBOX)),
+            "bytes": os.path.getsize(output)}
+
+
+class CaptureDataset:
+    """The typed v2 dataset: record and box tables with the same columns for every selection type"""
+
+    def __init__(self, path=DEFAULT_DATASET_PATH):
+        with np.load(path) as data:
+            version = int(data["schema_version"])
+            if version != SCHEMA_VERSION:
+                raise ValueError(f"{path} has schema version {version}, expected {SCHEMA_VERSION}")
+            self.selection_types = [str(s) for s in data["selection_types"]]
+            self.records = data["records"]
+            self.boxes = data["boxes"]
+            self.string_offsets = data["string_offsets"]
+            self.string_data = data["string_data"]
+
+    def string(self, index):
+        if index < 0:
+            return None
+        start, stop = self.string_offsets[index], self.string_offsets[index + 1]
+        return self.string_data[start:stop].tobytes().decode('utf-8')
+
+    def capture_records(self, capture_id):
+        """Rows of the record table for one capture (records are sorted by capture id)"""
+        first, last = np.searchsorted(self.records["capture_id"], [capture_id, capture_id + 1])
+        return self.records[first:last]
+
+    def record_boxes(self, record):
+        return self.boxes[record["box_start"]:record["box_stop"]]
+
+
+def _baseline(json_dir):
+    """Per-record Python loader the typed dataset replaces, for the benchmark"""
+    records = 0
+    boxes = 0
+    for capture_id in list_capture_ids(json_dir):
+        with open(os.path.join(json_dir, f"{capture_id}.json"), 'r', encoding='utf-8') as f:
+            for item in json.load(f):
+                normalized = normalize_record(item)
+                records += 1
+                boxes += len(normalized["bbox"])
+    return records, boxes
+
+
+def write_synthetic_captures(root, count, seed=0):
+    """Mixed-era captures (shapes, tables, rectangles, some in points, some without slide size)"""
+    rng = random.Random(seed)
+    json_dir = os.path.join(root, "json")
+    os.makedirs(json_dir, exist_ok=True)
+    for capture_id in range(1, count + 1):
+        items = []
+        for _ in range(rng.randint(1, 3)):
+            n = rng.randint(1, 6)
+            bboxes = [[round(rng.random() * 0.7, 4), round(rng.random() * 0.7, 4),
+                       round(rng.random() * 0.3, 4), round(rng.random() * 0.3, 4)] for _ in range(n)]
+            kind = rng.random()
+            if kind < 0.6:
+                item = shape_record("bench", "deck.pptx", rng.randint(1, 30), 960.0, 540.0,
+                                    [rng.randint(2, 300) for _ in range(n)], bboxes,
+                                    [[rng.randint(0, 255) for _ in range(3)] for _ in range(n)],
+                                    [f"text {rng.randint(0, 999)}" for _ in range(n)])
+            elif kind < 0.85:
+                item = table_record("bench", "deck.pptx", rng.randint(1, 30), 960.0, 540.0,
+                                    rng.choice(["cells", "rows", "cols"]), rng.randint(2, 300),
+                                    [f"{i + 1}.{i + 2}" for i in range(n)], bboxes)
+                if item["selection_type"] != "table_cells":
+                    item[item["selection_type"]] = ",".join(str(i + 1) for i in range(n))
+            else:
+                item = {"name": "bench", "path": "deck.pptx", "slide_number": 1, "slide_width": 960.0,
+                        "slide_height": 540.0, "selection_type": "rectangle", "bbox": bboxes,
+                        "table_rows": "", "table_cols": "", "table_cells": "", "shape_ids": []}
+            if rng.random() < 0.1:
+                item["bbox"] = [[x * 960.0, y * 540.0, w * 960.0, h * 540.0] for x, y, w, h in bboxes]
+            elif rng.random() < 0.05:
+                del item["slide_width"], item["slide_height"]
+            items.append(item)
+        with open(os.path.join(json_dir, f"{capture_id}.json"), 'w', encoding='utf-8') as f:
+            json.dump(items, f, indent=2)
+
+
+def benchmark(root, workers, repeat=1):
+    json_dir = os.path.join(root, "json")
+    output = os.path.join(tempfile.mkdtemp(prefix="schema_bench_"), "captures_v2.npz")
+    try:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            records, boxes = _baseline(json_dir)
+        baseline = (time.perf_counter() - start) / repeat
+        print(f"{records} records, {boxes} boxes")
+        print(f"per-record Python normalisation: {baseline:.2f}s ({records / baseline:.0f} records/s)")
+        for worker_count in sorted({1, workers or os.cpu_count() or 1}):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                summary = migrate_dataset(root, output, worker_count)
+            elapsed = (time.perf_counter() - start) / repeat
+            print(f"vectorized migration, {worker_count} workers: {elapsed:.2f}s "
+                  f"({summary['records'] / elapsed:.0f} records/s, {baseline / elapsed:.1f}x)")
+
+        # What loaders gain: the typed file replaces parsing and normalising every JSON file
+        start = time.perf_counter()
+        for _ in range(repeat):
+            dataset = CaptureDataset(output)
+        load = (time.perf_counter() - start) / repeat
+        print(f"typed dataset load: {load * 1000:.1f} ms ({len(dataset.records) / max(load, 1e-9):.0f} records/s, "
+              f"{baseline / max(load, 1e-9):.0f}x the per-record loader)")
+
+        # Same values in every box column either way
+        expected = {"bbox": [], "shape_id": [], "cell": [], "color": [], "text": []}
+        for capture_id in list_capture_ids(json_dir):
+            with open(os.path.join(json_dir, f"{capture_id}.json"), 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    normalized = normalize_record(item)
+                    expected["bbox"].extend(normalized["bbox"])
+                    expected["shape_id"].extend(normalized["shape_ids"])
+                    expected["cell"].extend(normalized["cells"])
+                    expected["color"].extend(normalized["color_rgb"])
+                    expected["text"].extend(normalized["text"])
+        boxes = dataset.boxes
+        mismatched = [name for name, ok in (
+            ("bbox", np.allclose(boxes["bbox"], np.array(expected["bbox"]).reshape(-1, 4))),
+            ("shape_id", boxes["shape_id"].tolist() == expected["shape_id"]),
+            ("cell", np.stack([boxes["row"], boxes["col"]], axis=1).tolist() == expected["cell"]),
+            ("color", boxes["color"].tolist() == expected["color"]),
+            ("text", [dataset.string(index) for index in boxes["text"]] == expected["text"])) if not ok]
+        print(f"typed dataset matches per-record normalisation: "
+              f"{'MISMATCH in ' + ', '.join(mismatched) if mismatched else 'OK'}")
+    finally:
+        shutil.rmtree(os.path.dirname(output), ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate captures to the typed v2 schema")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Write the typed dataset from resources/json")
+    migrate_parser.add_argument("--root", default="resources")
+    migrate_parser.add_argument("--output", default=DEFAULT_DATASET_PATH)
+    migrate_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+
+    show_parser = subparsers.add_parser("show", help="Print one capture from the typed dataset")
+    show_parser.add_argument("capture_id", type=int)
+    show_parser.add_argument("--dataset", default=DEFAULT_DATASET_PATH)
+
+    bench_parser = subparsers.add_parser("bench", help="Per-record normalisation vs. the vectorized migration")
+    bench_parser.add_argument("--root", default="resources")
+    bench_parser.add_argument("--synthetic", type=int, default=0, help="Benchmark on N generated captures instead")
+    bench_parser.add_argument("--workers", type=int, default=None)
+    bench_parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        start = time.perf_counter()
+        summary = migrate_dataset(args.root, args.output, args.workers)
+        print(f"Migrated {summary['captures']} captures ({summary['records']} records, {summary['boxes']} boxes, "
+              f"{summary['absolute']} records converted from points) to schema v{SCHEMA_VERSION} in "
+              f"{time.perf_counter() - start:.2f}s -> {args.output} ({summary['bytes'] / 1024:.0f} KB)")
+    elif args.command == "show":
+        dataset = CaptureDataset(args.dataset)
+        for record in dataset.capture_records(args.capture_id):
+            print(f"[{record['record_index']}] {dataset.selection_types[record['selection_type']]} "
+                  f"slide {record['slide_number']} flags {record['flags']} name {dataset.string(record['name'])!r}")
+            for box in dataset.record_boxes(record):
+                print(f"    shape {box['shape_id']} cell {box['row']}.{box['col']} bbox {box['bbox'].tolist()} "
+                      f"color {box['color'].tolist()} text {dataset.string(box['text'])!r}")
+    elif args.synthetic:
+        root = tempfile.mkdtemp(prefix="schema_synthetic_")
+        try:
+            write_synthetic_captures(root, args.synthetic)
+            benchmark(root, args.workers, args.repeat)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    else:
+        benchmark(args.root, args.workers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
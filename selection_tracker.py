@@ -0,0 +1,226 @@
+PP_SELECTION_SHAPES = 2  # ppSelectionShapes
+
+
+class _PowerPointEvents:
+    """PowerPoint.Application event sink; every relevant event marks the selection dirty"""
+
+    on_event = None
+
+    def _fire(self):
+        if self.on_event:
+            self.on_event()
+
+    def OnWindowSelectionChange(self, Sel):
+        self._fire()
+
+    def OnSlideSelectionChanged(self, SldRange):
+        self._fire()
+
+    def OnWindowActivate(self, Pres, Wn):
+        self._fire()
+
+    def OnAfterPresentationOpen(self, Pres):
+        self._fire()
+
+    def OnNewPresentation(self, Pres):
+        self._fire()
+
+    def OnPresentationClose(self, Pres):
+        self._fire()
+
+
+class ComSelectionSource:
+    """Reads the selection state from a PowerPoint COM application and counts COM calls"""
+
+    def __init__(self, powerpoint_app):
+        self.ppt = powerpoint_app
+        self.com_calls = 0
+        self.events = None
+
+    def _get(self, obj, name):
+        """Property get that counts as one cross-process COM call"""
+        self.com_calls += 1
+        return getattr(obj, name)
+
+    def read_state(self):
+        """Return (presentation path, slide index, tuple of shape ids), or None if nothing is open"""
+        if self._get(self._get(self.ppt, "Presentations"), "Count") == 0:
+            return None
+
+        presentation = self._get(self.ppt, "ActivePresentation")
+        window = self._get(self.ppt, "ActiveWindow")
+        slide = self._get(self._get(window, "View"), "Slide")
+        slide_number = self._get(slide, "SlideIndex")
+
+        selection = self._get(window, "Selection")
+        shape_ids = ()
+        if self._get(selection, "Type") == PP_SELECTION_SHAPES:
+            shapes = self._get(selection, "ShapeRange")
+            shape_ids = tuple(self._get(shape, "Id") for shape in shapes)
+
+        return (self._get(presentation, "FullName"), slide_number, shape_ids)
+
+    def connect(self, on_event):
+        """Subscribe to application events; return False if they are not available"""
+        try:
+            import win32com.client
+            self.events = win32com.client.WithEvents(self.ppt, _PowerPointEvents)
+            self.events.on_event = on_event
+            return True
+        except Exception as e:
+            print(f"Selection events unavailable, polling instead: {str(e)}")
+            self.events = None
+            return False
+
+    def disconnect(self):
+        """Drop the event subscription"""
+        if self.events is not None:
+            self.events.on_event = None
+            self.events = None
+
+    def pump(self):
+        """Deliver pending COM events to this thread (no calls into PowerPoint)"""
+        if self.events is not None:
+            import pythoncom
+            pythoncom.PumpWaitingMessages()
+
+
+class ManualSelectionSource:
+    """Selection source driven by hand, for tests and benchmarks without PowerPoint"""
+
+    def __init__(self, state=None, supports_events=True):
+        self.state = state
+        self.supports_events = supports_events
+        self.com_calls = 0
+        self.on_event = None
+
+    def set_state(self, state, fire_event=True):
+        """Change the selection; optionally raise the matching event"""
+        self.state = state
+        if fire_event and self.on_event:
+            self.on_event()
+
+    def read_state(self):
+        self.com_calls += 1
+        return self.state
+
+    def connect(self, on_event):
+        if not self.supports_events:
+            return False
+        self.on_event = on_event
+        return True
+
+    def disconnect(self):
+        self.on_event = None
+
+    def pump(self):
+        pass
+
+
+class SelectionTracker:
+    """Pushes selection changes to subscribers only when they happen"""
+
+    def __init__(self, source, schedule, min_interval=250, max_interval=4000, pump_interval=100):
+        self.source = source
+        self.schedule = schedule
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.pump_interval = pump_interval
+
+        self.subscribers = []
+        self.state = None
+        self.has_state = False
+        self.events_connected = False
+        self.dirty = True
+        self.running = False
+        self.interval = min_interval
+        self.since_last_read = 0
+
+        self.stats = {
+            "ticks": 0,
+            "reads": 0,
+            "events": 0,
+            "notifications": 0,
+            "errors": 0,
+            "com_calls": 0,
+            "last_tick_com_calls": 0,
+        }
+
+    def subscribe(self, callback):
+        """Call callback(state) whenever the selection changes"""
+        self.subscribers.append(callback)
+
+    def start(self):
+        """Connect events, publish the current state and start ticking"""
+        self.running = True
+        self.events_connected = self.source.connect(self.on_event)
+        self.tick()
+
+    def stop(self):
+        """Stop ticking and drop the event subscription"""
+        self.running = False
+        self.source.disconnect()
+
+    def on_event(self):
+        """Event callback: the selection may have changed"""
+        self.stats["events"] += 1
+        self.dirty = True
+
+    def com_calls_per_tick(self):
+        """Average COM calls spent per tick so far"""
+        if not self.stats["ticks"]:
+            return 0.0
+        return self.stats["com_calls"] / self.stats["ticks"]
+
+    def tick(self):
+        """One scheduler step; returns the delay until the next step (ms)"""
+        if not self.running:
+            return None
+
+        calls_before = self.source.com_calls
+        self.stats["ticks"] += 1
+        self.source.pump()
+
+        if self.events_connected:
+            # Only re-read after an event, plus a slow safety poll in case one was missed
+            self.since_last_read += self.pump_interval
+            if self.dirty or self.since_last_read >= self.max_interval:
+                self.read()
+            delay = self.pump_interval
+        else:
+            # No events: back off while nothing changes, snap back on a change
+            changed = self.read()
+            if changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * 2, self.max_interval)
+            delay = self.interval
+
+        tick_calls = self.source.com_calls - calls_before
+        self.stats["last_tick_com_calls"] = tick_calls
+        self.stats["com_calls"] += tick_calls
+
+        self.schedule(delay, self.tick)
+        return delay
+
+    def read(self):
+        """Read the selection and notify subscribers if it changed; returns True on change"""
+        self.dirty = False
+        self.since_last_read = 0
+        self.stats["reads"] += 1
+        try:
+            state = self.source.read_state()
+        except Exception:
+            # PowerPoint can be busy (e.g. a dialog is open); try again next time
+            self.stats["errors"] += 1
+            return False
+
+        if self.has_state and state == self.state:
+            return False
+
+        self.state = state
+        self.has_state = True
+        self.stats["notifications"] += 1
+        for callback in self.subscribers:
+            callback(state)
+        return True
@@ -0,0 +1,318 @@
+import argparse
+import time
+
+import numpy as np
+
+from pptx_shape_extractor import PptxPresentation, NO_FILL_FORE_COLOR, capture_color
+from text_bounds import com_text_bounds, shape_text_bounds
+
+
+# msoShapeTypePicture = 13, msoLinkedPicture = 11: always captured by their frame
+PICTURE_TYPES = (13, 11)
+MSO_COLOR_TYPE_RGB = 1
+# Nearly fully transparent fills and outlines count as invisible
+INVISIBLE_TRANSPARENCY = 0.99
+WHITE_THRESHOLD = 250
+
+# How a shape's bbox is taken
+BBOX_FRAME = 0
+BBOX_TEXT = 1
+BBOX_STRATEGY_NAMES = {BBOX_FRAME: "frame", BBOX_TEXT: "text"}
+
+# One row per shape. *_ok flags mark reads that succeeded, the *_bgr colours are COM's 0x00BBGGRR
+# (-1: RGB could not be read, which on_ok treats as white)
+SHAPE_DTYPE = np.dtype([
+    ("id", np.int32),
+    ("type", np.int16),
+    ("bbox", np.float64, (4,)),
+    ("fill_ok", np.bool_),
+    ("fill_visible", np.bool_),
+    ("fill_transparency", np.float32),
+    ("fill_fore_ok", np.bool_),
+    ("fill_bgr", np.int32),
+    ("fill_color_type", np.int8),
+    ("line_ok", np.bool_),
+    ("line_visible", np.bool_),
+    ("line_transparency", np.float32),
+    ("line_fore_ok", np.bool_),
+    ("line_bgr", np.int32),
+    ("has_text", np.bool_),
+    ("font_ok", np.bool_),
+    ("font_bgr", np.int32),
+])
+
+
+def _to_bgr(rgb):
+    return int(rgb[0]) | (int(rgb[1]) << 8) | (int(rgb[2]) << 16)
+
+
+def is_white(bgr):
+    """White (every channel >= 250) or unreadable; works on ints and arrays"""
+    bgr = np.asarray(bgr)
+    white = ((bgr & 0xFF) >= WHITE_THRESHOLD) & (((bgr >> 8) & 0xFF) >= WHITE_THRESHOLD) \
+        & (((bgr >> 16) & 0xFF) >= WHITE_THRESHOLD)
+    return (bgr < 0) | white
+
+
+def format_invisible(ok, visible, transparency, fore_ok, bgr):
+    """on_ok's fill/outline test: hidden, nearly transparent or white; a failed read that on_ok would
+    have reached makes the shape count as visible"""
+    return np.asarray(ok) & (~np.asarray(visible) | (np.asarray(transparency) >= INVISIBLE_TRANSPARENCY)
+                             | (np.asarray(fore_ok) & is_white(bgr)))
+
+
+class ShapeClassification:
+    """Fill, line and text properties of a set of shapes, and the decisions on_ok takes from them"""
+
+    def __init__(self, rows, texts, measure_text):
+        # texts are the shapes' stripped texts; measure_text(index) returns trimmed text bounds
+        self.rows = rows
+        self.texts = texts
+        self.measure_text = measure_text
+
+        self.is_picture = np.isin(rows["type"], PICTURE_TYPES)
+        fill_invisible = format_invisible(rows["fill_ok"], rows["fill_visible"], rows["fill_transparency"],
+                                          rows["fill_fore_ok"], rows["fill_bgr"])
+        line_invisible = format_invisible(rows["line_ok"], rows["line_visible"], rows["line_transparency"],
+                                          rows["line_fore_ok"], rows["line_bgr"])
+        self.invisible = ~self.is_picture & fill_invisible & line_invisible
+        self.text_visible = rows["has_text"] & np.array([bool(text) for text in texts], dtype=bool) \
+            & rows["font_ok"] & ~is_white(rows["font_bgr"])
+        # Invisible shapes are captured by their text, everything else by its frame
+        self.strategy = np.where(self.invisible, BBOX_TEXT, BBOX_FRAME).astype(np.int8)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def shape_ids(self):
+        return self.rows["id"].tolist()
+
+    def colors(self):
+        """[r, g, b] per shape for the capture record: the fill colour when COM reports it as RGB, else black"""
+        rows = self.rows
+        bgr = np.where((rows["fill_color_type"] == MSO_COLOR_TYPE_RGB) & rows["fill_fore_ok"]
+                       & (rows["fill_bgr"] >= 0), rows["fill_bgr"], 0)
+        return np.stack([bgr & 0xFF, (bgr >> 8) & 0xFF, (bgr >> 16) & 0xFF], axis=1).tolist()
+
+    def bboxes(self):
+        """Absolute bbox per shape: the frame, or the trimmed text bounds for invisible shapes"""
+        boxes = self.rows["bbox"].copy()
+        for index in np.flatnonzero(self.strategy == BBOX_TEXT):
+            try:
+                boxes[index] = self.measure_text(index)
+            except Exception:
+                # Same fallback as on_ok: keep the frame
+                pass
+        return boxes.tolist()
+
+
+def _read_format(format_getter, row, prefix):
+    """Read Visible, Transparency (when visible) and ForeColor.RGB of a Fill or Line into row; returns ForeColor"""
+    try:
+        fmt = format_getter()
+        visible = fmt.Visible != 0
+        row[f"{prefix}_visible"] = visible
+        row[f"{prefix}_transparency"] = fmt.Transparency if visible else 0.0
+        row[f"{prefix}_ok"] = True
+    except Exception:
+        return None
+    try:
+        fore = fmt.ForeColor
+        row[f"{prefix}_fore_ok"] = True
+    except Exception:
+        return None
+    try:
+        row[f"{prefix}_bgr"] = fore.RGB
+    except Exception:
+        row[f"{prefix}_bgr"] = -1
+    return fore
+
+
+def classify_com_shapes(shapes, font_colors=False):
+    """Read every COM shape once (shared Fill/ForeColor/TextRange objects, outlines only where the fill
+    leaves the question open) and classify them; text_visible needs font_colors"""
+    shapes = list(shapes)
+    rows = np.zeros(len(shapes), dtype=SHAPE_DTYPE)
+    rows["fill_color_type"] = -1
+    texts = []
+    text_ranges = []
+    raw_texts = []
+    for index, shape in enumerate(shapes):
+        row = rows[index]
+        row["id"] = shape.Id
+        try:
+            row["type"] = shape.Type
+        except Exception:
+            row["type"] = -1
+        row["bbox"] = (shape.Left, shape.Top, shape.Width, shape.Height)
+
+        fore = _read_format(lambda: shape.Fill, row, "fill")
+        if fore is not None:
+            try:
+                row["fill_color_type"] = fore.Type
+            except Exception:
+                pass
+        # The outline only matters for a non-picture whose fill is already invisible
+        if row["type"] not in PICTURE_TYPES and format_invisible(
+                row["fill_ok"], row["fill_visible"], row["fill_transparency"], row["fill_fore_ok"], row["fill_bgr"]):
+            _read_format(lambda: shape.Line, row, "line")
+
+        text_range = None
+        text = ""
+        try:
+            if shape.HasTextFrame:
+                row["has_text"] = True
+                text_range = shape.TextFrame.TextRange
+                text = text_range.Text
+        except Exception:
+            text_range = None
+            text = ""
+        if font_colors and text.strip():
+            try:
+                color = text_range.Font.Color
+                row["font_ok"] = True
+                try:
+                    row["font_bgr"] = color.RGB
+                except Exception:
+                    row["font_bgr"] = -1
+            except Exception:
+                pass
+        texts.append(text.strip())
+        text_ranges.append(text_range)
+        raw_texts.append(text)
+
+    def measure_text(index):
+        if text_ranges[index] is None:
+            raise ValueError("Shape has no text frame")
+        return com_text_bounds(text_ranges[index], raw_texts[index])
+
+    return ShapeClassification(rows, texts, measure_text)
+
+
+def classify_records(shapes):
+    """Classify pptx_shape_extractor shape records with the values COM would report for them"""
+    rows = np.zeros(len(shapes), dtype=SHAPE_DTYPE)
+    texts = []
+    for index, shape in enumerate(shapes):
+        row = rows[index]
+        row["id"] = shape["id"]
+        row["type"] = shape["type"]
+        row["bbox"] = shape["bbox"]
+        for prefix in ("fill", "line"):
+            fmt = shape[prefix]
+            row[f"{prefix}_ok"] = row[f"{prefix}_fore_ok"] = True
+            row[f"{prefix}_visible"] = fmt["visible"]
+            row[f"{prefix}_transparency"] = fmt["transparency"] if fmt["visible"] else 0.0
+            # A format without a colour reports white over COM
+            row[f"{prefix}_bgr"] = _to_bgr(fmt["rgb"] or NO_FILL_FORE_COLOR)
+        fore_rgb = list(shape["fill"]["rgb"] or NO_FILL_FORE_COLOR)
+        row["fill_color_type"] = MSO_COLOR_TYPE_RGB if capture_color(shape) == fore_rgb else 0
+        text = shape["text"] if shape["has_text_frame"] else ""
+        row["has_text"] = shape["has_text_frame"]
+        runs = [run for p in (shape["text_body"] or {"paragraphs": []})["paragraphs"] for run in p["runs"]
+                if run["text"]]
+        if runs:
+            row["font_ok"] = True
+            row["font_bgr"] = _to_bgr(runs[0]["rgb"])
+        texts.append(text.strip())
+
+    def measure_text(index):
+        bounds = shape_text_bounds(shapes[index])
+        if bounds is None:
+            raise ValueError("Shape has no text frame")
+        return bounds
+
+    return ShapeClassification(rows, texts, measure_text)
+
+
+def _per_shape_reads(shapes):
+    """on_ok's former per-shape reads (is_shape_invisible, then bbox, color and text), for the benchmark"""
+    def white(color):
+        try:
+            return bool(is_white(color.RGB))
+        except Exception:
+            return True
+
+    results = []
+    for shape in shapes:
+        try:
+            is_picture = shape.Type in PICTURE_TYPES
+        except Exception:
+            is_picture = False
+        invisible = False
+        if not is_picture:
+            try:
+                fill_invisible = shape.Fill.Visible == 0 or shape.Fill.Transparency >= INVISIBLE_TRANSPARENCY \
+                    or white(shape.Fill.ForeColor)
+                line_invisible = shape.Line.Visible == 0 or shape.Line.Transparency >= INVISIBLE_TRANSPARENCY \
+                    or white(shape.Line.ForeColor)
+                invisible = fill_invisible and line_invisible
+            except Exception:
+                pass
+        bbox = [shape.Left, shape.Top, shape.Width, shape.Height]
+        color = 0
+        try:
+            if shape.Fill.ForeColor.Type == MSO_COLOR_TYPE_RGB:
+                color = shape.Fill.ForeColor.RGB
+        except Exception:
+            pass
+        text = ""
+        try:
+            if shape.HasTextFrame:
+                text = shape.TextFrame.TextRange.Text.strip()
+        except Exception:
+            pass
+        results.append((shape.Id, invisible, bbox, color, text))
+    return results
+
+
+def benchmark(shape_count=200, latency=0.0002, seed=0):
+    """COM calls and time: per-shape helpers vs. one classification pass, on the fake PowerPoint"""
+    from fake_powerpoint import FakeApplication, synthetic_deck
+
+    app = FakeApplication(latency)
+    app.add(synthetic_deck(1, shape_count, table_size=None, seed=seed))
+    shapes = list(app.active_window._slide()._shapes._items)
+    results = []
+    for label, action in (("per-shape helpers", lambda: _per_shape_reads(shapes)),
+                          ("classification pass", lambda: classify_com_shapes(shapes))):
+        app.calls.reset()
+        start = time.perf_counter()
+        action()
+        results.append((label, app.calls.calls, (time.perf_counter() - start) * 1000.0))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify shapes the way on_ok does, all at once")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    show_parser = subparsers.add_parser("show", help="Print the classification of a .pptx slide's shapes")
+    show_parser.add_argument("pptx")
+    show_parser.add_argument("--slide", type=int, default=1)
+
+    bench_parser = subparsers.add_parser("bench", help="Count COM calls against the fake PowerPoint")
+    bench_parser.add_argument("--shapes", type=int, default=200)
+    bench_parser.add_argument("--latency-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.command == "show":
+        with PptxPresentation(args.pptx) as presentation:
+            shapes = presentation.extract_slide(args.slide)["shapes"]
+        classification = classify_records(shapes)
+        for index, (bbox, color) in enumerate(zip(classification.bboxes(), classification.colors())):
+            flags = [name for name, mask in (("picture", classification.is_picture),
+                                             ("invisible", classification.invisible),
+                                             ("visible text", classification.text_visible)) if mask[index]]
+            print(f"{classification.rows['id'][index]:>4} {BBOX_STRATEGY_NAMES[classification.strategy[index]]:<5} "
+                  f"{[round(v, 1) for v in bbox]} rgb {color} {', '.join(flags)}")
+        return
+
+    print(f"{args.shapes} shapes, {args.latency_ms:.2f} ms per call")
+    for label, calls, ms in benchmark(args.shapes, args.latency_ms / 1000.0):
+        print(f"  {label:<22} {calls:>6} calls {ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
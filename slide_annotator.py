@@ -0,0 +1,155 @@
+import argparse
+import time
+
+from capture_records import bbox_to_relative, shape_record, table_section_records
+from pptx_shape_extractor import MSO_GROUP, MSO_PLACEHOLDER, MSO_TABLE, PptxPresentation
+from shape_classifier import classify_com_shapes, classify_records
+from slide_snapshot_cache import SlideSnapshot
+from table_snapshot import TableSnapshot
+
+
+# Only these shape types can hold a table; HasTable is not asked of anything else
+TABLE_TYPES = (MSO_TABLE, MSO_PLACEHOLDER)
+
+
+class SlideAnnotation:
+    """Capture records of every shape of one slide and of every cell, row and column of its tables"""
+
+    def __init__(self, name, path, slide_number, slide_width, slide_height):
+        self.name = name
+        self.path = path
+        self.slide_number = slide_number
+        self.slide_width = slide_width
+        self.slide_height = slide_height
+        self.records = []
+        self.table_texts = {}
+        self.shape_count = 0
+
+    def add_shape(self, shape_id, bbox, color, text):
+        rel_bbox = bbox_to_relative(bbox, self.slide_width, self.slide_height)
+        self.records.append(shape_record(self.name, self.path, self.slide_number, self.slide_width,
+                                         self.slide_height, [shape_id], [rel_bbox], [color], [text]))
+        self.shape_count += 1
+
+    def add_table(self, table):
+        self.records.extend(table_section_records(self.name, self.path, self.slide_number, self.slide_width,
+                                                  self.slide_height, table))
+        # Cell texts for the text index
+        self.table_texts[table.table_id] = table.text_rows()
+
+
+def _annotate(shapes, classify, group_items, read_table, annotation):
+    """Classify one level of the shape tree at once, then descend into its groups and tables"""
+    classification = classify(shapes)
+    for shape, shape_id, shape_type, bbox, color, text in zip(
+            shapes, classification.shape_ids, classification.rows["type"].tolist(), classification.bboxes(),
+            classification.colors(), classification.texts):
+        annotation.add_shape(shape_id, bbox, color, text)
+        if shape_type == MSO_GROUP:
+            # Members follow their group, depth-first like iter_shapes
+            _annotate(group_items(shape), classify, group_items, read_table, annotation)
+        elif shape_type in TABLE_TYPES:
+            table = read_table(shape)
+            if table is not None:
+                annotation.add_table(table)
+
+
+def _com_table(shape):
+    return TableSnapshot.from_com(shape) if shape.HasTable else None
+
+
+def annotate_com_slide(slide, name, path, slide_width, slide_height):
+    """Records for every shape (group members included) and table cell/row/column of a PowerPoint slide,
+    with on_ok's bbox and visibility rules; each shape is read once"""
+    annotation = SlideAnnotation(name, path, slide.SlideIndex, slide_width, slide_height)
+    _annotate(list(slide.Shapes), classify_com_shapes, lambda shape: list(shape.GroupItems), _com_table, annotation)
+    return annotation
+
+
+def annotate_slide(slide, name, path):
+    """The same records for a pptx_shape_extractor slide"""
+    annotation = SlideAnnotation(name, path, slide["slide_number"], slide["slide_width"], slide["slide_height"])
+    _annotate(slide["shapes"], classify_records, lambda shape: shape["children"],
+              lambda shape: TableSnapshot.from_pptx(shape) if shape["table"] is not None else None, annotation)
+    return annotation
+
+
+def _per_shape_annotation(slide):
+    """Every shape captured as its own selection, tables found by a second walk (for the benchmark)"""
+    shapes = []
+    pending = list(slide.Shapes)
+    while pending:
+        shape = pending.pop(0)
+        shapes.append(shape)
+        if shape.Type == MSO_GROUP:
+            pending.extend(shape.GroupItems)
+    for shape in shapes:
+        classification = classify_com_shapes([shape])
+        classification.bboxes()
+        classification.colors()
+    snapshot = SlideSnapshot(slide)
+    return [snapshot.get_table(table_id) for table_id in snapshot.table_shapes]
+
+
+def benchmark(slides=5, shapes=40, latency=0.0002, pptx=None, seed=0):
+    """COM calls and time to annotate every slide: one walk per slide vs. per-shape capture"""
+    from fake_powerpoint import FakeApplication, synthetic_deck
+
+    app = FakeApplication(latency)
+    if pptx:
+        presentation = app.open(pptx)
+    else:
+        presentation = app.add(synthetic_deck(slides, shapes, seed=seed))
+    fake_slides = list(presentation._slides._items)
+    width = presentation._page_setup.SlideWidth
+    height = presentation._page_setup.SlideHeight
+
+    results = []
+    records = 0
+    for label, action in (("per-shape capture", _per_shape_annotation),
+                          ("one walk per slide", lambda slide: annotate_com_slide(slide, "bench", "", width, height))):
+        app.calls.reset()
+        start = time.perf_counter()
+        for slide in fake_slides:
+            result = action(slide)
+            if isinstance(result, SlideAnnotation):
+                records += len(result.records)
+        results.append((label, app.calls.calls, (time.perf_counter() - start) * 1000.0))
+    return len(fake_slides), records, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture every shape of a slide, no selection needed")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    show_parser = subparsers.add_parser("show", help="Print the records of a .pptx slide")
+    show_parser.add_argument("pptx")
+    show_parser.add_argument("--slide", type=int, default=1)
+
+    bench_parser = subparsers.add_parser("bench", help="Count COM calls against the fake PowerPoint")
+    bench_parser.add_argument("--pptx", help="Annotate this deck instead of a synthetic one")
+    bench_parser.add_argument("--slides", type=int, default=5)
+    bench_parser.add_argument("--shapes", type=int, default=40, help="Shapes per synthetic slide")
+    bench_parser.add_argument("--latency-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.command == "show":
+        with PptxPresentation(args.pptx) as presentation:
+            slide = presentation.extract_slide(args.slide)
+        annotation = annotate_slide(slide, "show", args.pptx)
+        for record in annotation.records:
+            label = record["table_cells"] or record["table_rows"] or record["table_cols"]
+            print(f"{record['selection_type']:<12} {record['shape_ids']} {label:<6} {record['bbox'][0]} "
+                  f"{' '.join(record['text'])[:40]!r}")
+        print(f"{annotation.shape_count} shapes, {len(annotation.table_texts)} tables, "
+              f"{len(annotation.records)} records")
+        return
+
+    slide_count, records, results = benchmark(args.slides, args.shapes, args.latency_ms / 1000.0, args.pptx)
+    print(f"{slide_count} slides, {records} records, {args.latency_ms:.2f} ms per call")
+    for label, calls, ms in results:
+        print(f"  {label:<20} {calls:>6} calls {ms:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageDraw
+
+from pptx_shape_extractor import PptxPresentation, MSO_GROUP, MSO_LINE, MSO_PICTURE
+from text_layout import layout_text
+
+
+# slide.Export renders at 96 DPI by default (a 960x540 pt slide becomes 1280x720)
+DEFAULT_DPI = 96
+TABLE_BORDER_RGB = (0, 0, 0)
+
+
+def _rgba(rgb, transparency=0.0):
+    return (rgb[0], rgb[1], rgb[2], int(round(255 * (1.0 - transparency))))
+
+
+class SlideRasterizer:
+    """Draws the shapes parsed from a .pptx slide with Pillow"""
+
+    def __init__(self, presentation, dpi=DEFAULT_DPI):
+        self.presentation = presentation
+        self.scale = dpi / 72.0
+
+    def render(self, slide_number):
+        """Render one slide (1-based) to an RGB image"""
+        slide = self.presentation.extract_slide(slide_number)
+        size = (int(round(slide["slide_width"] * self.scale)), int(round(slide["slide_height"] * self.scale)))
+        image = Image.new("RGBA", size, _rgba(slide["background"]))
+
+        for shape in slide["background_shapes"] + slide["shapes"]:
+            self.draw_shape(image, shape)
+        return image.convert("RGB")
+
+    def _pixels(self, bbox):
+        left, top, width, height = bbox
+        x1 = left * self.scale
+        y1 = top * self.scale
+        return [x1, y1, x1 + width * self.scale, y1 + height * self.scale]
+
+    def draw_shape(self, image, shape):
+        """Draw one shape record (recursing into groups)"""
+        if shape["type"] == MSO_GROUP:
+            for child in shape["children"]:
+                self.draw_shape(image, child)
+            return
+        if shape["type"] == MSO_PICTURE:
+            self.draw_picture(image, shape)
+        elif shape["table"] is not None:
+            self.draw_table(image, shape)
+        else:
+            self.draw_geometry(image, shape)
+            if shape["text_body"] is not None and shape["text"].strip():
+                self.draw_text(image, shape["text_body"], shape["bbox"])
+
+    def draw_geometry(self, image, shape):
+        """Fill and outline of an autoshape (rotation is ignored)"""
+        x1, y1, x2, y2 = self._pixels(shape["bbox"])
+        fill = shape["fill"]
+        line = shape["line"]
+        fill_rgba = _rgba(fill["rgb"], fill["transparency"]) if fill["visible"] and fill["rgb"] else None
+        line_rgba = _rgba(line["rgb"], line["transparency"]) if line["visible"] and line["rgb"] else None
+        line_width = max(1, int(round(line["width"] * self.scale))) if line_rgba else 0
+        if fill_rgba is None and line_rgba is None:
+            return
+
+        # Draw on a layer so transparent fills blend with what is underneath
+        layer = Image.new("RGBA", image.size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        x2 = max(x2, x1 + 1)
+        y2 = max(y2, y1 + 1)
+        geometry = shape["geometry"]
+
+        if shape["type"] == MSO_LINE or geometry in ("line", "straightConnector1"):
+            if line_rgba:
+                draw.line([x1, y1, x2, y2], fill=line_rgba, width=line_width)
+        elif geometry in ("ellipse", "circle"):
+            draw.ellipse([x1, y1, x2, y2], fill=fill_rgba, outline=line_rgba, width=line_width)
+        elif geometry in ("roundRect", "round2SameRect"):
+            radius = min(x2 - x1, y2 - y1) * 0.1667
+            draw.rounded_rectangle([x1, y1, x2, y2], radius=radius, fill=fill_rgba,
+                                   outline=line_rgba, width=line_width)
+        else:
+            draw.rectangle([x1, y1, x2, y2], fill=fill_rgba, outline=line_rgba, width=line_width)
+        image.alpha_composite(layer)
+
+    def draw_picture(self, image, shape):
+        """Paste an embedded picture scaled to its frame"""
+        x1, y1, x2, y2 = [int(round(v)) for v in self._pixels(shape["bbox"])]
+        width, height = max(1, x2 - x1), max(1, y2 - y1)
+        try:
+            with Image.open(io.BytesIO(self.presentation.read(shape["image_part"]))) as picture:
+                picture = picture.convert("RGBA").resize((width, height), Image.Resampling.LANCZOS)
+            layer = Image.new("RGBA", image.size, (0, 0, 0, 0))
+            layer.paste(picture, (x1, y1))
+            image.alpha_composite(layer)
+        except Exception:
+            # Formats Pillow can't decode (EMF/WMF, SVG): mark the frame instead
+            draw = ImageDraw.Draw(image)
+            draw.rectangle([x1, y1, x2, y2], fill=(220, 220, 220, 255), outline=(160, 160, 160, 255))
+
+    def draw_table(self, image, shape):
+        """Cell fills, grid lines and cell text"""
+        draw = ImageDraw.Draw(image)
+        for row in shape["table"]["cells"]:
+            for cell in row:
+                if cell["merged"]:
+                    # Covered by the merge's anchor cell, whose bbox spans every merged row and column
+                    continue
+                x1, y1, x2, y2 = self._pixels(cell["bbox"])
+                fill = cell["fill"]
+                fill_rgba = _rgba(fill["rgb"], fill["transparency"]) if fill and fill["visible"] and fill["rgb"] else None
+                draw.rectangle([x1, y1, x2, y2], fill=fill_rgba, outline=TABLE_BORDER_RGB)
+                if cell["text"].strip():
+                    self.draw_text(image, cell["text_body"], cell["bbox"])
+
+    def draw_text(self, image, text_body, bbox):
+        """Draw a text body laid out inside bbox"""
+        draw = ImageDraw.Draw(image)
+        for line in layout_text(text_body, bbox, self.scale):
+            for x, chunk, font, rgb in line["pieces"]:
+                if chunk.strip():
+                    draw.text((x, line["y"]), chunk, font=font, fill=tuple(rgb))
+
+
+def render_slide_to_file(deck_path, slide_number, output_path, dpi=DEFAULT_DPI):
+    """Render one slide of a deck to a PNG file"""
+    with PptxPresentation(deck_path) as presentation:
+        SlideRasterizer(presentation, dpi).render(slide_number).save(output_path, "PNG")
+
+
+def render_slide_png(deck_path, slide_number, dpi=DEFAULT_DPI):
+    """Render one slide of a deck and return the PNG bytes"""
+    with PptxPresentation(deck_path) as presentation:
+        buffer = io.BytesIO()
+        SlideRasterizer(presentation, dpi).render(slide_number).save(buffer, "PNG")
+        return buffer.getvalue()
+
+
+def _render_job(job):
+    deck_path, slide_number, output_path, dpi = job
+    render_slide_to_file(deck_path, slide_number, output_path, dpi)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render .pptx slides to PNG without PowerPoint")
+    parser.add_argument("pptx")
+    parser.add_argument("--slide", type=int, help="Only this slide (1-based); default is every slide")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    with PptxPresentation(args.pptx) as presentation:
+        slide_numbers = [args.slide] if args.slide else list(range(1, presentation.slide_count + 1))
+    os.makedirs(args.output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(args.pptx))[0]
+    jobs = [(args.pptx, n, os.path.join(args.output_dir, f"{stem}_{n}.png"), args.dpi) for n in slide_numbers]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for output_path in pool.map(_render_job, jobs):
+            print(output_path)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {len(jobs)} slides in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from table_snapshot import TableSnapshot
+
+
+class SlideSnapshot:
+    """Shapes and table snapshots of one slide, read once over COM"""
+
+    def __init__(self, slide):
+        self.slide = slide
+        self.shape_ids = []
+        self.table_shapes = {}
+        self._tables = {}
+
+        # One walk over slide.Shapes; tables are read in full on first use
+        for shape in slide.Shapes:
+            shape_id = shape.Id
+            self.shape_ids.append(shape_id)
+            if shape.HasTable:
+                self.table_shapes[shape_id] = shape
+
+    def get_table(self, table_id):
+        """TableSnapshot of a table on this slide (geometry and texts of every cell), or None"""
+        if table_id in self._tables:
+            return self._tables[table_id]
+
+        table_shape = self.table_shapes.get(table_id)
+        if table_shape is None:
+            return None
+
+        self._tables[table_id] = TableSnapshot.from_com(table_shape)
+        return self._tables[table_id]
+
+
+class SlideSnapshotCache:
+    """Caches the snapshot of the active slide, keyed by presentation, slide index and revision"""
+
+    def __init__(self, powerpoint_app):
+        self.powerpoint_app = powerpoint_app
+        self.presentation_path = None
+        self.slide_index = None
+        self.revision = 0
+        self.snapshot = None
+        self.snapshot_key = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def key(self):
+        return (self.presentation_path, self.slide_index, self.revision)
+
+    def set_context(self, presentation_path, slide_index):
+        """Record the active presentation/slide; a change drops the snapshot"""
+        if (presentation_path, slide_index) != (self.presentation_path, self.slide_index):
+            self.presentation_path = presentation_path
+            self.slide_index = slide_index
+            self.invalidate()
+
+    def invalidate(self):
+        """Force the next lookup to re-read the slide"""
+        self.revision += 1
+        self.snapshot = None
+        self.snapshot_key = None
+
+    def get_snapshot(self):
+        """Return the snapshot for the current key, reading the slide on a miss"""
+        if self.snapshot is not None and self.snapshot_key == self.key:
+            self.hits += 1
+            return self.snapshot
+
+        self.misses += 1
+        slide = self.powerpoint_app.ActiveWindow.View.Slide
+        if self.slide_index is None:
+            # No context pushed yet (e.g. before the first poll)
+            self.presentation_path = self.powerpoint_app.ActivePresentation.FullName
+            self.slide_index = slide.SlideIndex
+        self.snapshot = SlideSnapshot(slide)
+        self.snapshot_key = self.key
+        return self.snapshot
+
+    def get_table(self, table_id):
+        """TableSnapshot of a table on the active slide, or None"""
+        return self.get_snapshot().get_table(table_id)
@@ -0,0 +1,388 @@
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from capture_archive import DEFAULT_ARCHIVE_PATH, SELECTION_TYPES
+from file_id_allocator import FileIdAllocator, file_lock
+from image_store import HASH_KEY, capture_image_path, pixel_hash
+from text_index import INDEX_FILENAME
+
+
+REPORT_FILENAME = "store_report.json"
+JOURNAL_FILENAME = ".compact_journal.json"
+STAGED_SUFFIX = ".compact"
+# Screenshot width/height may differ from slide_width/slide_height by this fraction (pixel rounding)
+ASPECT_TOLERANCE = 0.01
+CHUNK_SIZE = 256
+MAX_LISTED_IDS = 50
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _selection_count(value):
+    # table_rows/cols/cells are comma-joined strings in on_ok's records
+    parts = [part.strip() for part in str(value).split(",") if part.strip()]
+    if not parts:
+        return None
+    for part in parts:
+        if not all(piece.isdigit() and int(piece) >= 1 for piece in part.split(".")):
+            return None
+    return len(parts)
+
+
+def record_problems(item):
+    """Ways a record differs from the schema on_ok writes (empty list if it matches)"""
+    if not isinstance(item, dict):
+        return ["record_not_object"]
+    problems = []
+    for key in ("name", "path", "table_rows", "table_cols", "table_cells"):
+        if not isinstance(item.get(key), str):
+            problems.append(f"bad_{key}")
+    if HASH_KEY in item and not (isinstance(item[HASH_KEY], str) and len(item[HASH_KEY]) == 64 and
+                                 all(c in "0123456789abcdef" for c in item[HASH_KEY])):
+        problems.append(f"bad_{HASH_KEY}")
+    if not _is_int(item.get("slide_number")) or item["slide_number"] < 1:
+        problems.append("bad_slide_number")
+    # Older captures have no slide size; when present it must be positive
+    for key in ("slide_width", "slide_height"):
+        if key in item and not (_is_number(item[key]) and item[key] > 0):
+            problems.append(f"bad_{key}")
+
+    bboxes = item.get("bbox")
+    if not isinstance(bboxes, list):
+        problems.append("bad_bbox")
+        bboxes = []
+    elif not all(isinstance(bbox, list) and len(bbox) == 4 and all(_is_number(v) for v in bbox) and
+                 bbox[2] >= 0 and bbox[3] >= 0 for bbox in bboxes):
+        problems.append("bad_bbox")
+
+    selection_type = item.get("selection_type")
+    shape_ids = item.get("shape_ids")
+    if selection_type not in SELECTION_TYPES:
+        problems.append("bad_selection_type")
+    elif selection_type == "shape":
+        if not isinstance(shape_ids, list) or not all(_is_int(v) for v in shape_ids):
+            problems.append("bad_shape_ids")
+        elif len(shape_ids) != len(bboxes):
+            problems.append("bbox_count_mismatch")
+        colors = item.get("color_rgb")
+        if not isinstance(colors, list) or len(colors) != len(bboxes) or not all(
+                color is None or (isinstance(color, list) and len(color) == 3 and
+                                  all(_is_int(v) and 0 <= v <= 255 for v in color)) for color in colors):
+            problems.append("bad_color_rgb")
+        texts = item.get("text")
+        if not isinstance(texts, list) or len(texts) != len(bboxes) or \
+                not all(text is None or isinstance(text, str) for text in texts):
+            problems.append("bad_text")
+    elif selection_type.startswith("table_"):
+        if not _is_int(shape_ids):
+            problems.append("bad_shape_ids")
+        count = _selection_count(item.get(selection_type, ""))
+        if count is None:
+            problems.append(f"bad_{selection_type}")
+        elif count != len(bboxes):
+            problems.append("bbox_count_mismatch")
+    elif shape_ids != []:
+        problems.append("bad_shape_ids")
+    if not bboxes and "bad_bbox" not in problems:
+        problems.append("empty_bbox")
+    return problems
+
+
+def check_capture(root, capture_id, decode=True):
+    """Check one capture's JSON and screenshot; returns {id, problems, image size}"""
+    json_path = os.path.join(root, "json", f"{capture_id}.json")
+    result = {"id": capture_id, "problems": []}
+    problems = result["problems"]
+
+    records = None
+    if os.path.exists(json_path):
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            problems.append("json_unreadable")
+        if records is not None:
+            if not isinstance(records, list) or not records:
+                problems.append("no_records")
+            else:
+                for item in records:
+                    for problem in record_problems(item):
+                        if problem not in problems:
+                            problems.append(problem)
+    else:
+        problems.append("image_without_json")
+
+    records = records if isinstance(records, list) else None
+    stored_hash = next((item[HASH_KEY] for item in records or [] if isinstance(item, dict) and item.get(HASH_KEY)),
+                       None)
+    img_path = capture_image_path(root, capture_id, records)
+    if not os.path.exists(img_path):
+        problems.append("missing_image")
+        return result
+    try:
+        with Image.open(img_path) as img:
+            # verify() checks the PNG structure and CRCs; load() also inflates the pixels
+            if decode:
+                img.load()
+                # A stored screenshot must still hash to the name the JSON refers to it by
+                if stored_hash and pixel_hash(img) != stored_hash:
+                    problems.append("image_hash_mismatch")
+            else:
+                img.verify()
+            width, height = img.size
+    except Exception:
+        problems.append("image_unreadable")
+        return result
+    result["image_size"] = [width, height]
+
+    if records:
+        for item in records:
+            if isinstance(item, dict) and _is_number(item.get("slide_width")) and _is_number(item.get("slide_height")) \
+                    and item["slide_width"] > 0 and item["slide_height"] > 0 and height > 0:
+                expected = item["slide_width"] / item["slide_height"]
+                if abs(width / height - expected) > expected * ASPECT_TOLERANCE:
+                    problems.append("aspect_mismatch")
+                break
+    return result
+
+
+def _check_chunk(root, capture_ids, decode):
+    # Workers return only captures with problems; the rest are just counted
+    bad = [result for result in (check_capture(root, capture_id, decode) for capture_id in capture_ids)
+           if result["problems"]]
+    return len(capture_ids), bad
+
+
+def scan_store(root):
+    """Capture ids with a JSON file and/or a screenshot, plus stray files that are neither"""
+    ids = set()
+    stray = []
+    for sub_dir, extension in (("json", ".json"), ("img", ".png")):
+        directory = os.path.join(root, sub_dir)
+        if not os.path.exists(directory):
+            continue
+        # scandir streams entries, so 100k+ files never build a second list of stat results
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                stem = name[:-len(extension)] if name.endswith(extension) else None
+                if stem is not None and stem.isdigit() and int(stem) >= 1:
+                    ids.add(int(stem))
+                else:
+                    stray.append(os.path.join(sub_dir, name))
+    return sorted(ids), sorted(stray)
+
+
+def _id_ranges(ids):
+    """Compact list form of sorted ids: 3, "7-12", ..."""
+    ranges = []
+    for capture_id in ids:
+        if ranges and isinstance(ranges[-1], list) and ranges[-1][1] == capture_id - 1:
+            ranges[-1][1] = capture_id
+        elif ranges and _is_int(ranges[-1]) and ranges[-1] == capture_id - 1:
+            ranges[-1] = [ranges[-1], capture_id]
+        else:
+            ranges.append(capture_id)
+    return [f"{r[0]}-{r[1]}" if isinstance(r, list) else r for r in ranges]
+
+
+def check_store(root="resources", workers=None, decode=True, report_path=None):
+    """Validate every capture in parallel and write a compact report; returns the report"""
+    start = time.perf_counter()
+    capture_ids, stray = scan_store(root)
+    by_problem = {}
+    checked = 0
+    chunks = [capture_ids[i:i + CHUNK_SIZE] for i in range(0, len(capture_ids), CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_check_chunk, root, chunk, decode) for chunk in chunks]
+        for future in futures:
+            count, bad = future.result()
+            checked += count
+            for result in bad:
+                for problem in result["problems"]:
+                    by_problem.setdefault(problem, []).append(result["id"])
+
+    max_id = capture_ids[-1] if capture_ids else 0
+    present = set(capture_ids)
+    gaps = [capture_id for capture_id in range(1, max_id + 1) if capture_id not in present]
+    bad_ids = sorted({capture_id for ids in by_problem.values() for capture_id in ids})
+    report = {
+        "root": os.path.abspath(root),
+        "captures": checked,
+        "ok": checked - len(bad_ids),
+        "max_id": max_id,
+        "gap_count": len(gaps),
+        "gaps": _id_ranges(gaps[:MAX_LISTED_IDS]),
+        "stray_files": stray[:MAX_LISTED_IDS],
+        "stray_count": len(stray),
+        # Per problem: how many captures, and the first ids as ranges
+        "problems": {problem: {"count": len(ids), "ids": _id_ranges(sorted(ids)[:MAX_LISTED_IDS])}
+                     for problem, ids in sorted(by_problem.items())},
+        "elapsed": round(time.perf_counter() - start, 3),
+    }
+    report_path = report_path or os.path.join(root, REPORT_FILENAME)
+    tmp_path = report_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, report_path)
+    return report
+
+
+def _write_journal(path, journal):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(journal, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def plan_compaction(root, drop_orphans=False):
+    """Journal renumbering the captures to 1..n in id order (orphan screenshots dropped if asked)"""
+    capture_ids, _ = scan_store(root)
+    json_dir = os.path.join(root, "json")
+    orphans = [capture_id for capture_id in capture_ids
+               if not os.path.exists(os.path.join(json_dir, f"{capture_id}.json"))]
+    if drop_orphans:
+        orphan_set = set(orphans)
+        capture_ids = [capture_id for capture_id in capture_ids if capture_id not in orphan_set]
+    moves = [[old_id, new_id] for new_id, old_id in enumerate(capture_ids, start=1) if old_id != new_id]
+    return {"phase": "stage", "moves": moves, "dropped": orphans if drop_orphans else [],
+            "next_id": len(capture_ids) + 1}
+
+
+def _move(src, dst):
+    # Idempotent: a rename already done by an interrupted run is skipped
+    if os.path.exists(src):
+        os.replace(src, dst)
+
+
+def _apply_journal(root, journal, journal_path):
+    files = (("json", ".json"), ("img", ".png"))
+    if journal["phase"] == "stage":
+        # Orphans go to a trash folder, not away, so a wrong call can be undone by hand
+        trash_dir = os.path.join(root, "compact_trash")
+        if journal["dropped"]:
+            os.makedirs(trash_dir, exist_ok=True)
+        for old_id in journal["dropped"]:
+            _move(os.path.join(root, "img", f"{old_id}.png"), os.path.join(trash_dir, f"{old_id}.png"))
+        # Phase 1 moves every file to a staged name, so no rename can overwrite a capture not yet moved
+        for old_id, new_id in journal["moves"]:
+            for sub_dir, extension in files:
+                directory = os.path.join(root, sub_dir)
+                _move(os.path.join(directory, f"{old_id}{extension}"),
+                      os.path.join(directory, f"{new_id}{extension}{STAGED_SUFFIX}"))
+        journal["phase"] = "commit"
+        _write_journal(journal_path, journal)
+
+    if journal["phase"] == "commit":
+        for old_id, new_id in journal["moves"]:
+            for sub_dir, extension in files:
+                directory = os.path.join(root, sub_dir)
+                _move(os.path.join(directory, f"{new_id}{extension}{STAGED_SUFFIX}"),
+                      os.path.join(directory, f"{new_id}{extension}"))
+        journal["phase"] = "finish"
+        _write_journal(journal_path, journal)
+
+
+def _remap_text_index(root, mapping, dropped):
+    path = os.path.join(root, INDEX_FILENAME)
+    if not os.path.exists(path) or not (mapping or dropped):
+        return
+    dropped = set(dropped)
+    lines = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry["capture_id"] in dropped:
+                continue
+            entry["capture_id"] = mapping.get(entry["capture_id"], entry["capture_id"])
+            lines.append(json.dumps(entry))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + ("\n" if lines else ""))
+    os.replace(tmp_path, path)
+
+
+def compact_store(root="resources", drop_orphans=False):
+    """Renumber captures to close id gaps; resumes an interrupted run from its journal"""
+    journal_path = os.path.join(root, JOURNAL_FILENAME)
+    allocator = FileIdAllocator(root)
+    # Holding the allocator's lock keeps capture stations from taking an id mid-renumbering
+    with file_lock(allocator.lock_path):
+        resumed = os.path.exists(journal_path)
+        if resumed:
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                journal = json.load(f)
+        else:
+            journal = plan_compaction(root, drop_orphans)
+            if not journal["moves"] and not journal["dropped"]:
+                allocator._write_counter(journal["next_id"])
+                return {"moved": 0, "dropped": 0, "next_id": journal["next_id"], "resumed": False}
+            _write_journal(journal_path, journal)
+
+        _apply_journal(root, journal, journal_path)
+
+        # Derived files keyed by capture id: the text index is rewritten, the archive is stale
+        if journal["phase"] == "finish":
+            mapping = {old_id: new_id for old_id, new_id in journal["moves"]}
+            _remap_text_index(root, mapping, journal["dropped"])
+            # Recorded, so a resumed run does not apply the mapping to the index a second time
+            journal["phase"] = "remapped"
+            _write_journal(journal_path, journal)
+        archive_path = os.path.join(root, os.path.basename(DEFAULT_ARCHIVE_PATH))
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+        allocator._write_counter(journal["next_id"])
+        os.remove(journal_path)
+    return {"moved": len(journal["moves"]), "dropped": len(journal["dropped"]),
+            "next_id": journal["next_id"], "resumed": resumed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and repair the capture store")
+    parser.add_argument("--root", default="resources")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    check_parser = subparsers.add_parser("check", help="Validate every capture and write a report")
+    check_parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    check_parser.add_argument("--headers-only", action="store_true",
+                              help="Verify PNG structure without inflating pixels (faster)")
+    check_parser.add_argument("--report", help=f"Report path (default: {{root}}/{REPORT_FILENAME})")
+
+    compact_parser = subparsers.add_parser("compact", help="Renumber captures to 1..n (resumes if interrupted)")
+    compact_parser.add_argument("--drop-orphans", action="store_true",
+                                help="Move screenshots without a JSON file to {root}/compact_trash")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        report = check_store(args.root, args.workers, not args.headers_only, args.report)
+        print(f"{report['captures']} captures checked in {report['elapsed']:.2f}s: {report['ok']} ok, "
+              f"{report['gap_count']} id gaps, {report['stray_count']} stray files")
+        for problem, info in report["problems"].items():
+            print(f"  {problem}: {info['count']} ({', '.join(map(str, info['ids'][:10]))})")
+        raise SystemExit(0 if report["ok"] == report["captures"] and not report["stray_count"] else 1)
+
+    start = time.perf_counter()
+    result = compact_store(args.root, args.drop_orphans)
+    print(f"{'Resumed: ' if result['resumed'] else ''}{result['moved']} captures renumbered, "
+          f"{result['dropped']} orphans dropped in {time.perf_counter() - start:.2f}s; next id {result['next_id']}")
+
+
+if __name__ == "__main__":
+    main()
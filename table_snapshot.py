@@ -0,0 +1,138 @@
+import argparse
+
+import numpy as np
+
+from pptx_shape_extractor import PptxPresentation, iter_shapes
+
+
+class TableSnapshot:
+    """Geometry and text of every cell of a table, read once; rows, columns and cells are derived locally"""
+
+    def __init__(self, table_id, geometry, texts, row_heights=None, col_widths=None):
+        # geometry is float64 [rows, cols, 4] of (left, top, width, height) in points; with the grid's
+        # row heights and column widths, rows and columns are not widened by merged cells
+        self.table_id = table_id
+        self.geometry = np.asarray(geometry, dtype=np.float64)
+        self.row_heights = row_heights
+        self.col_widths = col_widths
+        self.texts = np.empty(self.geometry.shape[:2], dtype=object)
+        for row_idx, row in enumerate(texts):
+            self.texts[row_idx, :] = row
+
+    @property
+    def rows(self):
+        return self.texts.shape[0]
+
+    @property
+    def cols(self):
+        return self.texts.shape[1]
+
+    @classmethod
+    def from_com(cls, table_shape):
+        """Read a PowerPoint table shape: one pass, each cell's Shape fetched once"""
+        table = table_shape.Table
+        table_rows = table.Rows
+        table_cols = table.Columns
+        rows = table_rows.Count
+        cols = table_cols.Count
+        # Grid sizes: a merged cell's Shape covers every row and column it spans
+        row_heights = [row.Height for row in table_rows]
+        col_widths = [col.Width for col in table_cols]
+        geometry = np.zeros((rows, cols, 4), dtype=np.float64)
+        texts = []
+        for row_idx in range(1, rows + 1):
+            row_texts = []
+            for col_idx in range(1, cols + 1):
+                cell_shape = table.Cell(row_idx, col_idx).Shape
+                geometry[row_idx - 1, col_idx - 1] = (cell_shape.Left, cell_shape.Top,
+                                                      cell_shape.Width, cell_shape.Height)
+                row_texts.append(cell_shape.TextFrame.TextRange.Text.strip())
+            texts.append(row_texts)
+        return cls(table_shape.Id, geometry, texts, row_heights, col_widths)
+
+    @classmethod
+    def from_pptx(cls, shape):
+        """Build from a table shape record of pptx_shape_extractor"""
+        table = shape["table"]
+        rows, cols = table["rows"], table["cols"]
+        geometry = np.zeros((rows, cols, 4), dtype=np.float64)
+        texts = [[""] * cols for _ in range(rows)]
+        for row_idx, row in enumerate(table["cells"][:rows]):
+            for col_idx, cell in enumerate(row[:cols]):
+                geometry[row_idx, col_idx] = cell["bbox"]
+                texts[row_idx][col_idx] = cell["text"].strip()
+        return cls(shape["id"], geometry, texts, table["row_heights"][:rows], table["col_widths"][:cols])
+
+    def has_cell(self, row_idx, col_idx):
+        return 1 <= row_idx <= self.rows and 1 <= col_idx <= self.cols
+
+    def has_row(self, row_idx):
+        return 1 <= row_idx <= self.rows
+
+    def has_col(self, col_idx):
+        return 1 <= col_idx <= self.cols
+
+    def _check(self, valid, what):
+        if not valid:
+            raise IndexError(f"Table {self.table_id} has no {what}")
+
+    def cell_bbox(self, row_idx, col_idx):
+        """[left, top, width, height] of a cell (1-based)"""
+        self._check(self.has_cell(row_idx, col_idx), f"cell {row_idx}.{col_idx}")
+        return self.geometry[row_idx - 1, col_idx - 1].tolist()
+
+    def row_bbox(self, row_idx):
+        """Bounding box of a row: first cell to the right edge of the last, first cell's height"""
+        self._check(self.has_row(row_idx), f"row {row_idx}")
+        first = self.geometry[row_idx - 1, 0].tolist()
+        last = self.geometry[row_idx - 1, -1].tolist()
+        height = self.row_heights[row_idx - 1] if self.row_heights else first[3]
+        return [first[0], first[1], (last[0] + last[2]) - first[0], height]
+
+    def col_bbox(self, col_idx):
+        """Bounding box of a column: first cell to the bottom edge of the last, first cell's width"""
+        self._check(self.has_col(col_idx), f"column {col_idx}")
+        first = self.geometry[0, col_idx - 1].tolist()
+        last = self.geometry[-1, col_idx - 1].tolist()
+        width = self.col_widths[col_idx - 1] if self.col_widths else first[2]
+        return [first[0], first[1], width, (last[1] + last[3]) - first[1]]
+
+    def cell_text(self, row_idx, col_idx):
+        self._check(self.has_cell(row_idx, col_idx), f"cell {row_idx}.{col_idx}")
+        return self.texts[row_idx - 1, col_idx - 1]
+
+    def row_texts(self, row_idx):
+        """Texts of the cells of a row, left to right"""
+        self._check(self.has_row(row_idx), f"row {row_idx}")
+        return self.texts[row_idx - 1, :].tolist()
+
+    def col_texts(self, col_idx):
+        """Texts of the cells of a column, top to bottom"""
+        self._check(self.has_col(col_idx), f"column {col_idx}")
+        return self.texts[:, col_idx - 1].tolist()
+
+    def text_rows(self):
+        """All cell texts as a list of rows"""
+        return self.texts.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the table snapshots of a .pptx slide")
+    parser.add_argument("pptx")
+    parser.add_argument("--slide", type=int, default=1)
+    args = parser.parse_args()
+
+    with PptxPresentation(args.pptx) as presentation:
+        slide = presentation.extract_slide(args.slide)
+    for shape in iter_shapes(slide["shapes"]):
+        if shape["table"] is None:
+            continue
+        table = TableSnapshot.from_pptx(shape)
+        print(f"Table {table.table_id}: {table.rows} rows x {table.cols} cols")
+        for row_idx in range(1, table.rows + 1):
+            bbox = [round(v, 1) for v in table.row_bbox(row_idx)]
+            print(f"  row {row_idx} {bbox}: {' | '.join(table.row_texts(row_idx))}")
+
+
+if __name__ == "__main__":
+    main()
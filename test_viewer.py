@@ -1,8 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
-import os
-from PIL import Image, ImageDraw, ImageTk
+from PIL import ImageTk
+from capture_reader import CaptureStore
+from capture_prefetcher import CapturePrefetcher, cache_key
+from text_index import load_text_index
 
 
 class TestViewerApp:
@@ -17,6 +18,21 @@ class TestViewerApp:
         self.box_thickness = 5
         self.zoom_level = 0.6  # Default zoom level (60% of original size)
         
+        # Captures come from the memory-mapped archive when one has been compiled
+        self.capture_store = CaptureStore("resources")
+        
+        # Neighbouring captures are loaded and pre-rendered in the background
+        self.prefetcher = CapturePrefetcher(self.capture_store)
+        self.current_test_id = None
+        self.current_entry = None
+        
+        # Inverted index of captured shape and table text
+        self.text_index = load_text_index("resources")
+        self.search_hits = []
+        
+        # Tiles currently on the canvas
+        self.tile_items = {}
+        
         # Main container
         main_frame = ttk.Frame(root, padding=10)
         main_frame.pack(fill=tk.BOTH, expand=True)
@@ -52,6 +68,25 @@ class TestViewerApp:
         self.next_button = ttk.Button(nav_row, text="Next", command=self.next_test)
         self.next_button.pack(side=tk.LEFT, padx=5)
         
+        self.cache_label = ttk.Label(nav_row, text="", foreground="gray")
+        self.cache_label.pack(side=tk.LEFT, padx=10)
+        
+        # Third row - Text search
+        search_row = ttk.Frame(top_frame)
+        search_row.pack(fill=tk.X, pady=(5, 0))
+        
+        ttk.Label(search_row, text="Search text:").pack(side=tk.LEFT, padx=5)
+        self.search_entry = ttk.Entry(search_row, width=30)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind('<Return>', self.on_search_return)
+        
+        self.search_button = ttk.Button(search_row, text="Find", command=self.run_search)
+        self.search_button.pack(side=tk.LEFT, padx=5)
+        
+        self.search_results = ttk.Combobox(search_row, state="readonly", width=60)
+        self.search_results.pack(side=tk.LEFT, padx=5)
+        self.search_results.bind('<<ComboboxSelected>>', self.on_search_result_selected)
+        
         # Box thickness controls
         thickness_frame = ttk.Frame(top_frame)
         thickness_frame.pack(side=tk.LEFT, padx=20)
@@ -114,8 +149,8 @@ class TestViewerApp:
         
         # Canvas for image with scrollbars
         self.canvas = tk.Canvas(image_frame, bg='gray')
-        v_scrollbar = ttk.Scrollbar(image_frame, orient=tk.VERTICAL, command=self.canvas.yview)
-        h_scrollbar = ttk.Scrollbar(image_frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        v_scrollbar = ttk.Scrollbar(image_frame, orient=tk.VERTICAL, command=self.on_yview)
+        h_scrollbar = ttk.Scrollbar(image_frame, orient=tk.HORIZONTAL, command=self.on_xview)
         
         self.canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
         
@@ -126,7 +161,8 @@ class TestViewerApp:
         image_frame.grid_rowconfigure(0, weight=1)
         image_frame.grid_columnconfigure(0, weight=1)
         
-        self.image_on_canvas = None
+        # Only the tiles in view are rendered, so refresh them when the viewport changes
+        self.canvas.bind('<Configure>', lambda e: self.update_visible_tiles())
         
         # Key bindings
         self.root.bind('<Return>', lambda e: self.load_test_data())
@@ -135,6 +171,39 @@ class TestViewerApp:
         # Focus on test ID entry
         self.test_id_entry.focus()
     
+    def on_search_return(self, event):
+        """Enter in the search box searches instead of loading the test ID"""
+        self.run_search()
+        return "break"
+    
+    def run_search(self):
+        """Find captures containing the search phrase"""
+        query = self.search_entry.get().strip()
+        if not query:
+            return
+        
+        self.search_hits = self.text_index.search(query, limit=500)
+        labels = []
+        for hit in self.search_hits:
+            where = f"table {hit['shape_id']} cell {hit['cell']}" if hit['cell'] else f"shape {hit['shape_id']}"
+            text = " ".join(hit['text'].split())
+            labels.append(f"{hit['capture_id']}: {where} - {text[:60]}")
+        self.search_results.config(values=labels)
+        
+        if labels:
+            self.search_results.set(f"{len(labels)} matches - select one")
+        else:
+            self.search_results.set("No matches")
+    
+    def on_search_result_selected(self, event):
+        """Jump to the capture of the selected search result"""
+        position = self.search_results.current()
+        if position < 0 or position >= len(self.search_hits):
+            return
+        self.test_id_entry.delete(0, tk.END)
+        self.test_id_entry.insert(0, str(self.search_hits[position]['capture_id']))
+        self.load_test_data()
+    
     def update_thickness_label(self, value):
         """Update the thickness label when slider moves"""
         self.thickness_label.config(text=str(int(float(value))))
@@ -152,32 +221,25 @@ class TestViewerApp:
             messagebox.showwarning("Warning", "Please enter a test ID")
             return
         
-        # Look for JSON file
-        json_path = os.path.join("resources", "json", f"{test_id}.json")
-        if not os.path.exists(json_path):
-            messagebox.showerror("Error", f"Test ID '{test_id}' not found in resources/json/")
-            return
-        
-        # Load JSON data
+        # Look for capture (archive or JSON file), prefetched when stepping with Prev/Next
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                self.current_data = json.load(f)
+            entry = self.prefetcher.get(test_id, self.zoom_level, self.box_thickness, self.viewport())
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load JSON: {str(e)}")
+            messagebox.showerror("Error", f"Failed to load capture: {str(e)}")
+            return
+        if entry is None:
+            messagebox.showerror("Error", f"Test ID '{test_id}' not found in resources/json/")
             return
         
         # Look for image file
-        img_path = os.path.join("resources", "img", f"{test_id}.png")
-        if not os.path.exists(img_path):
-            messagebox.showerror("Error", f"Image file '{test_id}.png' not found in resources/img/")
+        if entry.image is None:
+            messagebox.showerror("Error", f"Screenshot of capture {test_id} not found in resources/")
             return
         
-        # Load image
-        try:
-            self.current_image = Image.open(img_path)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load image: {str(e)}")
-            return
+        self.current_test_id = test_id
+        self.current_entry = entry
+        self.current_data = entry.records
+        self.current_image = entry.image
         
         # Update prompt
         self.update_prompt()
@@ -255,117 +317,85 @@ class TestViewerApp:
         if not self.current_data:
             return
         
-        # Build prompt from data
-        prompt_lines = []
-        for idx, item in enumerate(self.current_data):
-            name = item.get('name', 'N/A')
-            selection_type = item.get('selection_type', 'N/A')
-            path = item.get('path', 'N/A')
-            slide_num = item.get('slide_number', 'N/A')
-            
-            prompt_lines.append(f"[{idx+1}] Name: {name} | Type: {selection_type} | Slide: {slide_num}")
-            
-            if selection_type == "shape":
-                shape_ids = item.get('shape_ids', [])
-                texts = item.get('text', [])
-                prompt_lines.append(f"    Shape IDs: {shape_ids}")
-                if texts and any(texts):
-                    prompt_lines.append(f"    Texts: {texts}")
-            elif selection_type == "table_cells":
-                cells = item.get('table_cells', '')
-                prompt_lines.append(f"    Table ID: {item.get('shape_ids', 'N/A')} | Cells: {cells}")
-            elif selection_type == "table_rows":
-                rows = item.get('table_rows', '')
-                prompt_lines.append(f"    Table ID: {item.get('shape_ids', 'N/A')} | Rows: {rows}")
-            elif selection_type == "table_cols":
-                cols = item.get('table_cols', '')
-                prompt_lines.append(f"    Table ID: {item.get('shape_ids', 'N/A')} | Cols: {cols}")
-            
-            prompt_lines.append("")  # Empty line between items
-        
-        prompt_text = "\n".join(prompt_lines)
+        prompt_text = self.current_entry.prompt
         
         self.prompt_text.config(state=tk.NORMAL)
         self.prompt_text.delete(1.0, tk.END)
         self.prompt_text.insert(1.0, prompt_text)
         self.prompt_text.config(state=tk.DISABLED)
     
+    def viewport(self):
+        """Visible canvas rectangle in zoomed image coordinates"""
+        left = self.canvas.canvasx(0)
+        top = self.canvas.canvasy(0)
+        return left, top, left + max(1, self.canvas.winfo_width()), top + max(1, self.canvas.winfo_height())
+    
     def draw_and_display_image(self):
         """Draw bounding boxes on image and display"""
         if not self.current_image or not self.current_data:
             return
         
-        # Create a copy of the image to draw on
-        img_with_boxes = self.current_image.copy()
-        
-        # Apply zoom level
-        original_width, original_height = img_with_boxes.size
-        new_width = int(original_width * self.zoom_level)
-        new_height = int(original_height * self.zoom_level)
-        img_with_boxes = img_with_boxes.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        
-        draw = ImageDraw.Draw(img_with_boxes, 'RGBA')
+        # Zoom and thickness are part of the cache key; re-fetch when either changed
+        entry = self.current_entry
+        if entry.key != cache_key(self.current_test_id, self.zoom_level, self.box_thickness):
+            entry = self.prefetcher.get(self.current_test_id, self.zoom_level, self.box_thickness, self.viewport())
+            self.current_entry = entry
         
         # Get image dimensions (after zoom)
-        img_width, img_height = img_with_boxes.size
+        img_width, img_height = entry.pyramid.zoomed_size(self.zoom_level)
         
-        # Draw bounding boxes for all items
-        for item in self.current_data:
-            bboxes = item.get('bbox', [])
-            
-            # Get slide dimensions (for converting relative to absolute coords)
-            slide_width = item.get('slide_width', img_width)
-            slide_height = item.get('slide_height', img_height)
-            
-            # Calculate scale factors (in case image was resized during export)
-            scale_x = img_width / slide_width
-            scale_y = img_height / slide_height
-            
-            for bbox in bboxes:
-                if len(bbox) != 4:
-                    continue
-                
-                # bbox is now in relative coordinates (0-1 range)
-                rel_left, rel_top, rel_width, rel_height = bbox
-                
-                # Convert to absolute coordinates using slide dimensions and scale
-                left = rel_left * slide_width * scale_x
-                top = rel_top * slide_height * scale_y
-                width = rel_width * slide_width * scale_x
-                height = rel_height * slide_height * scale_y
-                
-                # Calculate rectangle coordinates
-                x1 = int(left)
-                y1 = int(top)
-                x2 = int(left + width)
-                y2 = int(top + height)
-                
-                # Draw transparent red rectangle with red outline
-                # First draw the transparent fill
-                overlay = Image.new('RGBA', img_with_boxes.size, (0, 0, 0, 0))
-                overlay_draw = ImageDraw.Draw(overlay)
-                overlay_draw.rectangle([x1, y1, x2, y2], fill=(255, 0, 0, 30))
-                img_with_boxes = Image.alpha_composite(img_with_boxes.convert('RGBA'), overlay)
-                
-                # Then draw the red outline (scale thickness with zoom)
-                draw = ImageDraw.Draw(img_with_boxes)
-                scaled_thickness = max(1, int(self.box_thickness * self.zoom_level))
-                for i in range(scaled_thickness):
-                    draw.rectangle([x1-i, y1-i, x2+i, y2+i], outline=(255, 0, 0, 255))
-        
-        # Convert to PhotoImage and display
-        img_with_boxes = img_with_boxes.convert('RGB')
-        self.photo_image = ImageTk.PhotoImage(img_with_boxes)
-        
-        # Update canvas
+        # Drop the tiles of the previous zoom/capture; only visible tiles are rendered
         self.canvas.delete("all")
-        self.image_on_canvas = self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo_image)
+        self.tile_items = {}
+        self.canvas.config(scrollregion=(0, 0, img_width, img_height))
+        self.update_visible_tiles()
+        
+        self.prefetcher.prefetch_around(self.current_test_id, self.zoom_level, self.box_thickness, self.viewport())
+        self.update_cache_label()
+    
+    def update_cache_label(self):
+        """Show prefetch cache hit/miss counts"""
+        stats = self.prefetcher.snapshot()
+        self.cache_label.config(text=f"Cache: {stats['hits']} hits / {stats['misses'] + stats['waits']} misses "
+                                     f"({stats['entries']} captures, {stats['bytes'] / 1e6:.0f} MB)")
+    
+    def on_xview(self, *args):
+        """Horizontal scrollbar moved"""
+        self.canvas.xview(*args)
+        self.update_visible_tiles()
+    
+    def on_yview(self, *args):
+        """Vertical scrollbar moved"""
+        self.canvas.yview(*args)
+        self.update_visible_tiles()
+    
+    def update_visible_tiles(self):
+        """Render tiles that scrolled into view and drop the ones that left it"""
+        entry = self.current_entry
+        if entry is None or entry.pyramid is None:
+            return
         
-        # Update scroll region
-        self.canvas.config(scrollregion=self.canvas.bbox(tk.ALL))
+        visible = set(entry.pyramid.visible_tiles(entry.zoom, *self.viewport()))
+        
+        for key in list(self.tile_items):
+            if key not in visible:
+                item, _ = self.tile_items.pop(key)
+                self.canvas.delete(item)
+        
+        for col, row in visible:
+            if (col, row) in self.tile_items:
+                continue
+            tile = entry.tile(col, row)
+            # Keep a reference to the PhotoImage or Tk will discard it
+            photo = ImageTk.PhotoImage(tile)
+            x1, y1, _, _ = entry.pyramid.tile_rect(entry.zoom, col, row)
+            item = self.canvas.create_image(x1, y1, anchor=tk.NW, image=photo)
+            self.tile_items[(col, row)] = (item, photo)
     
     def on_exit(self):
         """Handle exit button click"""
+        self.prefetcher.close()
+        self.capture_store.close()
         self.root.destroy()
 
 
@@ -0,0 +1,179 @@
+import argparse
+import re
+import time
+
+from pptx_shape_extractor import PptxPresentation, PARAGRAPH_SEPARATOR, iter_shapes
+from text_layout import layout_text
+
+
+# on_ok measures the text without this trailing run (spaces, tabs, empty paragraphs)
+TRAILING_WHITESPACE = re.compile(r'\s+$')
+
+
+def full_text(text_body):
+    """Text of a parsed text body as TextRange.Text reports it (\\r between paragraphs)"""
+    return PARAGRAPH_SEPARATOR.join("".join(run["text"] for run in p["runs"]) for p in text_body["paragraphs"])
+
+
+def trimmed_length(text):
+    """Number of characters left once the trailing whitespace is dropped"""
+    match = TRAILING_WHITESPACE.search(text)
+    return match.start() if match else len(text)
+
+
+def utf16_length(text):
+    """Length as PowerPoint counts characters: UTF-16 code units (emoji and other non-BMP characters are two)"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def text_body_prefix(text_body, length):
+    """The first length characters of a parsed text body (paragraph separators count as one character)"""
+    if length >= len(full_text(text_body)):
+        return text_body
+    paragraphs = []
+    remaining = length
+    for idx, paragraph in enumerate(text_body["paragraphs"]):
+        if idx > 0:
+            # The separator alone does not bring the next paragraph into the range
+            if remaining <= 1:
+                break
+            remaining -= 1
+        runs = []
+        for run in paragraph["runs"]:
+            if remaining <= 0:
+                break
+            text = run["text"][:remaining]
+            remaining -= len(text)
+            runs.append(dict(run, text=text))
+        paragraphs.append(dict(paragraph, runs=runs))
+    prefix = dict(text_body, paragraphs=paragraphs)
+    prefix["text"] = full_text(prefix)
+    return prefix
+
+
+def lines_bounds(lines):
+    """[left, top, width, height] around laid out lines (trailing spaces of a line do not count)"""
+    left = min(line["x"] for line in lines)
+    top = min(line["y"] for line in lines)
+    right = max(line["x"] + line["width"] for line in lines)
+    bottom = max(line["y"] + line["height"] for line in lines)
+    return [left, top, right - left, bottom - top]
+
+
+def layout_bounds(text_body, box):
+    """Bounds (points) of a text body laid out in box; an empty body is a point at the inset corner"""
+    lines = layout_text(text_body, box, 1.0)
+    if not lines:
+        return [box[0] + text_body["insets"][0], box[1] + text_body["insets"][1], 0.0, 0.0]
+    return lines_bounds(lines)
+
+
+def trimmed_text_bounds(text_body, box):
+    """Offline counterpart of on_ok's text bounds: the text without its trailing whitespace, laid out in box"""
+    return layout_bounds(text_body_prefix(text_body, trimmed_length(full_text(text_body))), box)
+
+
+def shape_text_bounds(shape):
+    """Trimmed text bounds of a pptx_shape_extractor shape record, or None if it has no text frame"""
+    if not shape["has_text_frame"] or shape["text_body"] is None:
+        return None
+    return trimmed_text_bounds(shape["text_body"], shape["bbox"])
+
+
+def com_text_bounds(text_range, text=None):
+    """[left, top, width, height] of a TextRange without its trailing whitespace, without editing the deck"""
+    # Characters(1, n) is a view on the first n characters: PowerPoint measures it in place,
+    # so there is no write, no undo entry and nothing to restore if a call fails
+    if text is None:
+        text = text_range.Text
+    length = trimmed_length(text)
+    if length < len(text):
+        text_range = text_range.Characters(1, utf16_length(text[:length]))
+    return [text_range.BoundLeft, text_range.BoundTop, text_range.BoundWidth, text_range.BoundHeight]
+
+
+def mutating_com_text_bounds(text_range):
+    """The previous on_ok approach (write the trimmed text, measure, write it back); kept for the benchmark"""
+    original_text = text_range.Text
+    length = trimmed_length(original_text)
+    if length < len(original_text):
+        text_range.Text = original_text[:length]
+        bounds = [text_range.BoundLeft, text_range.BoundTop, text_range.BoundWidth, text_range.BoundHeight]
+        text_range.Text = original_text
+        return bounds
+    return [text_range.BoundLeft, text_range.BoundTop, text_range.BoundWidth, text_range.BoundHeight]
+
+
+def _time_com(app, shapes, measure):
+    app.calls.reset()
+    start = time.perf_counter()
+    bounds = [measure(shape.TextFrame.TextRange) for shape in shapes]
+    return bounds, (time.perf_counter() - start) * 1000.0, app.calls.calls, app.calls.mutations
+
+
+def benchmark(text_boxes=200, latency=0.0002, edit_latency=0.002, seed=0):
+    """Mutating vs. Characters-based COM bounds on the fake PowerPoint, and the offline engine"""
+    from fake_powerpoint import FakeApplication, MSO_TEXT_BOX, synthetic_deck
+
+    deck = synthetic_deck(1, text_boxes, table_size=None, seed=seed)
+    slide = deck["slides"][0]
+    records = [shape for shape in slide["shapes"] if shape["type"] == MSO_TEXT_BOX]
+    app = FakeApplication(latency, {"Text=": edit_latency})
+    app.add(deck)
+    fake_slide = app.active_window._slide()
+    shapes = fake_slide.find_shapes([shape["id"] for shape in records])
+
+    mutating, mutating_ms, mutating_calls, mutations = _time_com(app, shapes, mutating_com_text_bounds)
+    ranged, ranged_ms, ranged_calls, ranged_mutations = _time_com(app, shapes, com_text_bounds)
+    start = time.perf_counter()
+    for shape in records:
+        shape_text_bounds(shape)
+    offline_ms = (time.perf_counter() - start) * 1000.0
+
+    max_diff = max((abs(a - b) for m, r in zip(mutating, ranged) for a, b in zip(m, r)), default=0.0)
+    trailing = sum(trimmed_length(shape["text"]) < len(shape["text"]) for shape in records)
+    return {
+        "text_boxes": len(records),
+        "with_trailing_whitespace": trailing,
+        "rows": [("COM, write/measure/restore", mutating_ms, mutating_calls, mutations),
+                 ("COM, Characters(1, n)", ranged_ms, ranged_calls, ranged_mutations),
+                 ("offline (.pptx + font metrics)", offline_ms, 0, 0)],
+        "max_difference": max_diff,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text bounds without editing the deck")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    show_parser = subparsers.add_parser("show", help="Print the trimmed text bounds of every text shape of a slide")
+    show_parser.add_argument("pptx")
+    show_parser.add_argument("--slide", type=int, default=1)
+
+    bench_parser = subparsers.add_parser("bench", help="Compare the approaches on a slide with many text boxes")
+    bench_parser.add_argument("--text-boxes", type=int, default=200, help="Shapes on the synthetic slide")
+    bench_parser.add_argument("--latency-ms", type=float, default=0.2, help="Per-call COM round trip")
+    bench_parser.add_argument("--edit-ms", type=float, default=2.0,
+                              help="Round trip of a TextRange.Text write (re-layout and undo entry)")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        with PptxPresentation(args.pptx) as presentation:
+            slide = presentation.extract_slide(args.slide)
+        for shape in iter_shapes(slide["shapes"]):
+            bounds = shape_text_bounds(shape)
+            if bounds is not None and shape["text"].strip():
+                print(f"{shape['id']:>4} frame {[round(v, 1) for v in shape['bbox']]} "
+                      f"text {[round(v, 1) for v in bounds]} {shape['text'].strip()[:40]!r}")
+        return
+
+    result = benchmark(args.text_boxes, args.latency_ms / 1000.0, args.edit_ms / 1000.0)
+    print(f"{result['text_boxes']} text boxes, {result['with_trailing_whitespace']} with trailing whitespace "
+          f"({args.latency_ms:.2f} ms per call, {args.edit_ms:.1f} ms per text write)")
+    for label, ms, calls, mutations in result["rows"]:
+        print(f"  {label:<32} {ms:>9.1f} ms {calls:>6} calls {mutations:>4} edits")
+    print(f"  largest difference between the COM approaches: {result['max_difference']:.3f} pt")
+
+
+if __name__ == "__main__":
+    main()
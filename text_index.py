@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import re
+import time
+
+from file_id_allocator import list_capture_ids
+from presentation_cache import PresentationCache
+from pptx_shape_extractor import locate_deck
+
+
+INDEX_FILENAME = "text_index.jsonl"
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """Lowercase word tokens of a text"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def _parse_values(value):
+    if isinstance(value, list):
+        return value
+    return [part for part in str(value).split(",") if part.strip()]
+
+
+def record_entries(records, table_texts=None):
+    """(shape_id, cell, text) for every piece of text a capture points at"""
+    # table_texts maps a table id to its 2D list of cell texts, as SlideSnapshot.get_table returns
+    table_texts = table_texts or {}
+    entries = []
+    for item in records:
+        selection_type = item.get("selection_type", "shape")
+        if selection_type == "shape":
+            for shape_id, text in zip(item.get("shape_ids", []), item.get("text", [])):
+                if text:
+                    entries.append((shape_id, "", text))
+            continue
+        if not selection_type.startswith("table_"):
+            continue
+
+        table_id = item.get("shape_ids")
+        texts = table_texts.get(table_id)
+        if not texts:
+            continue
+        rows, cols = len(texts), len(texts[0]) if texts else 0
+        if selection_type == "table_cells":
+            cells = [tuple(int(v) for v in ref.split(".")) for ref in _parse_values(item.get("table_cells", ""))]
+        elif selection_type == "table_rows":
+            cells = [(int(r), c) for r in _parse_values(item.get("table_rows", "")) for c in range(1, cols + 1)]
+        else:
+            cells = [(r, int(c)) for c in _parse_values(item.get("table_cols", "")) for r in range(1, rows + 1)]
+        for row_idx, col_idx in cells:
+            if 1 <= row_idx <= rows and 1 <= col_idx <= cols and texts[row_idx - 1][col_idx - 1]:
+                entries.append((table_id, f"{row_idx}.{col_idx}", texts[row_idx - 1][col_idx - 1]))
+    return entries
+
+
+class TextIndex:
+    """Inverted index from word tokens to the captured shapes and table cells containing them"""
+
+    def __init__(self, path=None):
+        # With a path, every entry added is also appended to it (one JSON object per line)
+        self.path = path
+        self.entries = []
+        self.entry_tokens = []
+        self.postings = {}
+        self.captures = set()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _index(self, capture_id, shape_id, cell, text):
+        entry_id = len(self.entries)
+        tokens = tokenize(text)
+        self.entries.append((capture_id, shape_id, cell, text))
+        self.entry_tokens.append(tokens)
+        self.captures.add(capture_id)
+        for token in set(tokens):
+            self.postings.setdefault(token, []).append(entry_id)
+
+    def add_capture(self, capture_id, records, table_texts=None):
+        """Index a capture's texts (and persist them when the index has a file)"""
+        capture_id = int(capture_id)
+        entries = record_entries(records, table_texts)
+        for shape_id, cell, text in entries:
+            self._index(capture_id, shape_id, cell, text)
+        if self.path and entries:
+            lines = [json.dumps({"capture_id": capture_id, "shape_id": shape_id, "cell": cell, "text": text})
+                     for shape_id, cell, text in entries]
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+        return len(entries)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index file written by add_capture or rebuild (missing file: empty index)"""
+        index = cls(path)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from an interrupted write
+                    index._index(entry["capture_id"], entry["shape_id"], entry["cell"], entry["text"])
+        return index
+
+    def search(self, query, phrase=True, limit=None):
+        """Entries containing every query word (consecutively, with phrase); best matches first"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        postings = [self.postings.get(token) for token in set(tokens)]
+        if not all(postings):
+            return []
+
+        # Intersect starting from the rarest token
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+
+        hits = []
+        for entry_id in sorted(candidates):
+            entry_tokens = self.entry_tokens[entry_id]
+            if phrase and len(tokens) > 1 and not _contains_run(entry_tokens, tokens):
+                continue
+            capture_id, shape_id, cell, text = self.entries[entry_id]
+            hits.append({"capture_id": capture_id, "shape_id": shape_id, "cell": cell, "text": text,
+                         "exact": len(entry_tokens) == len(tokens)})
+        # Entries that are exactly the query first, then newest captures first
+        hits.sort(key=lambda hit: (not hit["exact"], -hit["capture_id"]))
+        return hits[:limit] if limit else hits
+
+    def capture_ids(self, query, phrase=True):
+        """Sorted ids of captures with at least one matching entry"""
+        return sorted({hit["capture_id"] for hit in self.search(query, phrase)})
+
+
+def _contains_run(tokens, run):
+    first = run[0]
+    for start in range(len(tokens) - len(run) + 1):
+        if tokens[start] == first and tokens[start:start + len(run)] == run:
+            return True
+    return False
+
+
+def _deck_table_texts(records, deck_dirs, decks):
+    """Cell texts of the tables a capture selected, read from the deck if it is on this machine"""
+    table_texts = {}
+    for item in records:
+        if not item.get("selection_type", "").startswith("table_"):
+            continue
+        deck_path = locate_deck(item.get("path", ""), deck_dirs)
+        if deck_path is None or not deck_path.lower().endswith(".pptx"):
+            continue
+        try:
+            table = decks.get(deck_path).table(item["slide_number"], item.get("shape_ids"))
+        except Exception as e:
+            print(f"{os.path.basename(deck_path)}: {str(e)}")
+            continue
+        if table is not None:
+            table_texts[item["shape_ids"]] = table.text_rows()
+    return table_texts
+
+
+def rebuild(root="resources", deck_dirs=(), output=None):
+    """Re-index every capture from its JSON file and write the index file atomically"""
+    json_dir = os.path.join(root, "json")
+    output = output or os.path.join(root, INDEX_FILENAME)
+    index = TextIndex()
+    decks = PresentationCache()
+    lines = []
+    for capture_id in list_capture_ids(json_dir):
+        with open(os.path.join(json_dir, f"{capture_id}.json"), 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        table_texts = _deck_table_texts(records, deck_dirs, decks)
+        for shape_id, cell, text in record_entries(records, table_texts):
+            index._index(capture_id, shape_id, cell, text)
+            lines.append(json.dumps({"capture_id": capture_id, "shape_id": shape_id, "cell": cell, "text": text}))
+    tmp_path = output + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + ("\n" if lines else ""))
+    os.replace(tmp_path, output)
+    index.path = output
+    return index
+
+
+def load_text_index(root="resources"):
+    """The index file, built from the captures on disk the first time"""
+    path = os.path.join(root, INDEX_FILENAME)
+    if os.path.exists(path):
+        return TextIndex.load(path)
+    # Without decks to read from, only shape texts of existing captures are indexed
+    return rebuild(root, output=path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search captured shape and table text")
+    parser.add_argument("--root", default="resources")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="Re-index every capture")
+    rebuild_parser.add_argument("--deck-dir", action="append", default=[],
+                                help="Where to look for decks to read table cell text from (repeatable)")
+
+    search_parser = subparsers.add_parser("search", help="Find captures containing a phrase")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--any-order", action="store_true", help="Match all words in any order")
+    search_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "rebuild":
+        index = rebuild(args.root, args.deck_dir)
+        print(f"Indexed {len(index)} texts from {len(index.captures)} captures, {len(index.postings)} distinct words "
+              f"in {time.perf_counter() - start:.2f}s -> {index.path}")
+        return
+
+    index = load_text_index(args.root)
+    loaded = time.perf_counter() - start
+    start = time.perf_counter()
+    hits = index.search(args.query, phrase=not args.any_order)
+    elapsed = time.perf_counter() - start
+    for hit in hits[:args.limit]:
+        where = f"table {hit['shape_id']} cell {hit['cell']}" if hit["cell"] else f"shape {hit['shape_id']}"
+        print(f"capture {hit['capture_id']}, {where}: {hit['text'][:80]!r}")
+    print(f"{len(hits)} matches in {elapsed * 1000:.2f} ms (index of {len(index)} texts loaded in {loaded:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
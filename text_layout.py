@@ -0,0 +1,131 @@
+import re
+
+from PIL import ImageFont
+
+from pptx_shape_extractor import LINE_BREAK
+
+
+# Line height as a multiple of the font size (PowerPoint's single spacing is ~1.2)
+LINE_SPACING = 1.2
+
+FONT_CANDIDATES = {
+    False: ["arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"],
+    True: ["arialbd.ttf", "Arial Bold.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"],
+}
+
+_font_cache = {}
+
+
+def get_font(size_px, bold=False):
+    """Load a TrueType font at a pixel size (cached), falling back to Pillow's default"""
+    size_px = max(1, int(round(size_px)))
+    key = (size_px, bold)
+    if key not in _font_cache:
+        font = None
+        for name in FONT_CANDIDATES[bold]:
+            try:
+                font = ImageFont.truetype(name, size_px)
+                break
+            except OSError:
+                continue
+        if font is None:
+            try:
+                font = ImageFont.load_default(size=size_px)
+            except TypeError:  # Pillow < 10.1
+                font = ImageFont.load_default()
+        _font_cache[key] = font
+    return _font_cache[key]
+
+
+def _measure(font, text):
+    """Advance width of text in pixels"""
+    if hasattr(font, "getlength"):
+        return font.getlength(text)
+    return font.getsize(text)[0]
+
+
+def _split_lines(paragraph):
+    """Split a paragraph's runs at soft line breaks into lists of (text, run) pieces"""
+    lines = [[]]
+    for run in paragraph["runs"]:
+        parts = run["text"].split(LINE_BREAK)
+        for idx, part in enumerate(parts):
+            if idx > 0:
+                lines.append([])
+            if part:
+                lines[-1].append((part, run))
+    return lines
+
+
+def layout_text(text_body, box, scale=1.0):
+    """Lay out a parsed text body inside box (points); returns lines in pixels at scale"""
+    # Each line is {"x", "y", "width", "height", "pieces": [(x, text, font, rgb)]}
+    left_inset, top_inset, right_inset, bottom_inset = text_body["insets"]
+    left = (box[0] + left_inset) * scale
+    top = (box[1] + top_inset) * scale
+    avail_width = max(0.0, (box[2] - left_inset - right_inset) * scale)
+    avail_height = max(0.0, (box[3] - top_inset - bottom_inset) * scale)
+    wrap = text_body.get("wrap", True) and avail_width > 0
+
+    lines = []
+    for paragraph in text_body["paragraphs"]:
+        for soft_line in _split_lines(paragraph):
+            current = []
+            current_width = 0.0
+            for text, run in soft_line:
+                font = get_font(run["size"] * scale, run["bold"])
+                for chunk in re.findall(r'\S+\s*|\s+', text):
+                    chunk_width = _measure(font, chunk)
+                    if wrap and current and current_width + _measure(font, chunk.rstrip()) > avail_width:
+                        lines.append((paragraph, current))
+                        current = []
+                        current_width = 0.0
+                    current.append((chunk, font, run))
+                    current_width += chunk_width
+            lines.append((paragraph, current))
+
+    laid_out = []
+    y = 0.0
+    for paragraph, pieces in lines:
+        if pieces:
+            size = max(run["size"] for _, _, run in pieces)
+        else:
+            size = paragraph["end_size"]
+        height = size * scale * LINE_SPACING
+
+        x = 0.0
+        placed = []
+        for chunk, font, run in pieces:
+            placed.append((x, chunk, font, run["rgb"]))
+            x += _measure(font, chunk)
+        # Trailing whitespace does not count towards the visible width
+        width = x
+        if placed:
+            last_x, last_chunk, last_font, _ = placed[-1]
+            width = last_x + _measure(last_font, last_chunk.rstrip())
+
+        laid_out.append({"width": width, "height": height, "y": y, "pieces": placed,
+                         "align": paragraph["align"]})
+        y += height
+
+    total_height = y
+    anchor = text_body.get("anchor", "t")
+    if anchor == "ctr":
+        offset_y = top + (avail_height - total_height) / 2
+    elif anchor == "b":
+        offset_y = top + avail_height - total_height
+    else:
+        offset_y = top
+
+    for line in laid_out:
+        align = line.pop("align")
+        if align == "ctr":
+            offset_x = left + (avail_width - line["width"]) / 2
+        elif align == "r":
+            offset_x = left + avail_width - line["width"]
+        else:
+            offset_x = left
+        line["x"] = offset_x
+        line["y"] += offset_y
+        line["pieces"] = [(offset_x + px, chunk, font, rgb) for px, chunk, font, rgb in line["pieces"]]
+    return laid_out
@@ -0,0 +1,147 @@
+import argparse
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from overlay_renderer import render_overlay
+
+
+TILE_SIZE = 512
+MAX_CACHED_TILES = 64
+
+
+class ZoomPyramid:
+    """Power-of-two downsampled copies of a slide image, served as fixed-size tiles at any zoom"""
+
+    def __init__(self, image, tile_size=TILE_SIZE, max_tiles=MAX_CACHED_TILES):
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.width, self.height = image.size
+
+        # Level k is the image reduced by 2**k; stop once a level fits in one tile
+        level = image.convert('RGB')
+        self.levels = [(1.0, level)]
+        while max(level.size) > tile_size and min(level.size) >= 2:
+            level = level.reduce(2)
+            self.levels.append((level.width / self.width, level))
+
+        # Tiles may be requested from the viewer and the prefetch thread at once
+        self.tiles = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def nbytes(self):
+        """Approximate memory held by the levels and cached tiles"""
+        with self.lock:
+            images = [image for _, image in self.levels] + list(self.tiles.values())
+        return sum(image.width * image.height * len(image.getbands()) for image in images)
+
+    def zoomed_size(self, zoom):
+        """Size of the whole image at a zoom level (same rounding as Image.resize callers used)"""
+        return max(1, int(self.width * zoom)), max(1, int(self.height * zoom))
+
+    def grid_size(self, zoom):
+        """Number of tile columns and rows at a zoom level"""
+        width, height = self.zoomed_size(zoom)
+        return -(-width // self.tile_size), -(-height // self.tile_size)
+
+    def tile_rect(self, zoom, col, row):
+        """Pixel rectangle (x1, y1, x2, y2) of a tile in zoomed image coordinates (exclusive end)"""
+        width, height = self.zoomed_size(zoom)
+        x1 = col * self.tile_size
+        y1 = row * self.tile_size
+        return x1, y1, min(x1 + self.tile_size, width), min(y1 + self.tile_size, height)
+
+    def visible_tiles(self, zoom, x1, y1, x2, y2):
+        """(col, row) of every tile intersecting a viewport rectangle in zoomed coordinates"""
+        cols, rows = self.grid_size(zoom)
+        first_col = max(0, int(x1) // self.tile_size)
+        first_row = max(0, int(y1) // self.tile_size)
+        last_col = min(cols - 1, int(x2) // self.tile_size)
+        last_row = min(rows - 1, int(y2) // self.tile_size)
+        return [(col, row) for row in range(first_row, last_row + 1) for col in range(first_col, last_col + 1)]
+
+    def _source_level(self, zoom):
+        # Smallest level that still has at least as many pixels as the zoomed image
+        for scale, image in reversed(self.levels):
+            if scale >= zoom:
+                return scale, image
+        return self.levels[0]
+
+    def tile(self, zoom, col, row):
+        """Slide pixels of one tile (cached)"""
+        key = (round(zoom, 4), col, row)
+        with self.lock:
+            if key in self.tiles:
+                self.hits += 1
+                self.tiles.move_to_end(key)
+                return self.tiles[key]
+            self.misses += 1
+
+        width, height = self.zoomed_size(zoom)
+        x1, y1, x2, y2 = self.tile_rect(zoom, col, row)
+        scale, source = self._source_level(zoom)
+        # Map the tile back into the source level; resize only reads that region
+        fx = source.width / width
+        fy = source.height / height
+        box = (x1 * fx, y1 * fy, x2 * fx, y2 * fy)
+        tile = source.resize((x2 - x1, y2 - y1), Image.Resampling.LANCZOS, box=box)
+
+        with self.lock:
+            self.tiles[key] = tile
+            if len(self.tiles) > self.max_tiles:
+                self.tiles.popitem(last=False)
+        return tile
+
+    def render_tile(self, zoom, col, row, boxes, thickness):
+        """Tile with the bounding box overlay; boxes are pixel rectangles at this zoom"""
+        tile = self.tile(zoom, col, row)
+        x1, y1, x2, y2 = self.tile_rect(zoom, col, row)
+        if len(boxes):
+            # Keep only boxes whose outline reaches into this tile, in tile coordinates
+            grow = thickness - 1
+            hit = ((boxes[:, 2] + grow >= x1) & (boxes[:, 0] - grow < x2) &
+                   (boxes[:, 3] + grow >= y1) & (boxes[:, 1] - grow < y2))
+            boxes = boxes[hit] - np.array([x1, y1, x1, y1])
+        if not len(boxes):
+            return tile
+        return render_overlay(tile, boxes, thickness)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-frame zooming with viewport tiles")
+    parser.add_argument("image", help="Slide image (PNG)")
+    parser.add_argument("--zoom", type=float, default=3.0)
+    parser.add_argument("--viewport", default="960x640", help="Visible canvas size in pixels")
+    args = parser.parse_args()
+
+    image = Image.open(args.image).convert('RGB')
+    view_width, view_height = [int(v) for v in args.viewport.lower().split("x")]
+
+    start = time.perf_counter()
+    pyramid = ZoomPyramid(image)
+    build_ms = (time.perf_counter() - start) * 1000.0
+
+    start = time.perf_counter()
+    image.resize(pyramid.zoomed_size(args.zoom), Image.Resampling.LANCZOS)
+    full_ms = (time.perf_counter() - start) * 1000.0
+
+    start = time.perf_counter()
+    tiles = pyramid.visible_tiles(args.zoom, 0, 0, view_width, view_height)
+    for col, row in tiles:
+        pyramid.tile(args.zoom, col, row)
+    tiles_ms = (time.perf_counter() - start) * 1000.0
+
+    zoomed_width, zoomed_height = pyramid.zoomed_size(args.zoom)
+    print(f"{image.width}x{image.height} at {args.zoom:.0%} -> {zoomed_width}x{zoomed_height}, "
+          f"{len(pyramid.levels)} pyramid levels built in {build_ms:.1f} ms")
+    print(f"full-frame resize: {full_ms:.1f} ms")
+    print(f"{len(tiles)} viewport tiles ({view_width}x{view_height}): {tiles_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()